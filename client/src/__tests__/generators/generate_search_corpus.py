@@ -0,0 +1,360 @@
+"""
+generate_search_corpus.py
+
+Streams a large, seeded corpus of search-bar queries for benchmarking
+parseSearchQuery / buildSearchQuery (and the /api/beats endpoint) at
+production scale.
+
+It draws from the same grammar as the hand-written generators:
+ - keys:     roots A-G, accidentals (#, ♯, b, ♭, sharp, flat), qualities
+             (major, maj, M, minor, min, m), glued or spaced
+ - BPM:      single values and ranges, with/without "bpm", -, – and — dashes
+ - keywords: artist names, moods, genres
+ - noise:    punctuation, emoji, stray symbols
+
+Realistic queries follow a skewed (Zipf-like) popularity distribution;
+a configurable share of adversarial queries covers out-of-range numbers,
+inverted ranges, leading zeros, odd casing, unicode and very long inputs.
+
+Every record carries the expected parse, computed by reference_parse(),
+a line-for-line port of server/src/utils/searchParser.ts.
+
+Output: JSON Lines shards (optionally gzipped) plus a manifest.json.
+Each shard is seeded from (seed, shard index) independently, so shards can
+be generated in parallel or regenerated one at a time with --only-shard.
+
+Usage (from server/, like the other generators):
+    python3 ../client/src/__tests__/generators/generate_search_corpus.py \
+        --count 2000000 --shard-size 250000 --gzip
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+from typing import Dict, List, Optional, TypedDict
+
+
+class ExpectedParse(TypedDict):
+    bpmValues: List[int]
+    bpmRanges: List[List[int]]
+    keys: List[str]
+    queryTokens: List[str]
+
+
+class CorpusRecord(TypedDict):
+    id: int
+    source: str  # "realistic" | "adversarial"
+    queryClass: str  # "bpm-only" | "key-only" | "keyword" | "mixed" | "empty"
+    input: str
+    expected: ExpectedParse
+
+
+OUTPUT_DIR = "bench/search-corpus"
+DEFAULT_SEED = 1337
+DEFAULT_COUNT = 1_000_000
+DEFAULT_SHARD_SIZE = 250_000
+DEFAULT_ADVERSARIAL_RATIO = 0.05
+
+
+# ---------------------------------------------------------------------------
+# Reference parser (port of server/src/utils/searchParser.ts)
+# ---------------------------------------------------------------------------
+
+# JS \w and \d are ASCII-only, hence re.ASCII throughout.
+_TOKEN_SPLIT_RE = re.compile(r"[^\w#♯♭\-–—\.]+", re.ASCII)
+_RANGE_RE = re.compile(r"^(\d+)[\-–—](\d+)$", re.ASCII)
+_BPM_RE = re.compile(r"^(\d+)(?:bpm)?$", re.ASCII | re.IGNORECASE)
+_KEY_PATTERNS = [
+    re.compile(r"^[A-G][#♯b♭]?(?:maj|min|major|minor|m|M)$", re.ASCII | re.IGNORECASE),
+    re.compile(r"^[A-G][#♯b♭]?\s+(?:maj|min|major|minor)$", re.ASCII | re.IGNORECASE),
+    re.compile(r"^[A-G][#♯b♭]?\s+(?:sharp|flat)\s+(?:maj|min|major|minor)$", re.ASCII | re.IGNORECASE),
+]
+
+
+def _normalize_key(key: str) -> str:
+    normalized = re.sub(r"♯|sharp", "#", key, flags=re.IGNORECASE)
+    normalized = re.sub(r"♭|flat", "b", normalized, flags=re.IGNORECASE)
+    normalized = re.sub(r"major", "maj", normalized, flags=re.IGNORECASE)
+    normalized = re.sub(r"minor", "min", normalized, flags=re.IGNORECASE)
+    # uppercase M first so "CM" -> "cmaj" not "cmin"
+    normalized = re.sub(r"^([A-Ga-g][#b]?)\s*M$", r"\1maj", normalized)
+    normalized = re.sub(r"^([A-Ga-g][#b]?)\s*m$", r"\1min", normalized)
+    return re.sub(r"\s+", "", normalized).lower()
+
+
+def reference_parse(raw_query: str) -> ExpectedParse:
+    output: ExpectedParse = {"bpmValues": [], "bpmRanges": [], "keys": [], "queryTokens": []}
+    if not raw_query or raw_query.strip() == "":
+        return output
+
+    tokens = [t for t in re.split(r"\s+", _TOKEN_SPLIT_RE.sub(" ", raw_query)) if t]
+    used = set()
+
+    for i, token in enumerate(tokens):
+        m = _RANGE_RE.match(token)
+        if m:
+            lo, hi = int(m.group(1)), int(m.group(2))
+            if lo > 0 and hi > lo and hi < 300:
+                output["bpmRanges"].append([lo, hi])
+                used.add(i)
+                continue
+        m = _BPM_RE.match(token)
+        if m:
+            bpm = int(m.group(1))
+            if 0 < bpm < 300:
+                output["bpmValues"].append(bpm)
+                used.add(i)
+                continue
+
+    i = 0
+    while i < len(tokens):
+        if i in used:
+            i += 1
+            continue
+        token = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        nxt2 = tokens[i + 2] if i + 2 < len(tokens) else None
+        if _KEY_PATTERNS[0].match(token):
+            output["keys"].append(_normalize_key(token))
+            used.add(i)
+        elif nxt and _KEY_PATTERNS[1].match(f"{token} {nxt}"):
+            output["keys"].append(_normalize_key(f"{token} {nxt}"))
+            used.update((i, i + 1))
+            i += 1
+        elif nxt and nxt2 and _KEY_PATTERNS[2].match(f"{token} {nxt} {nxt2}"):
+            output["keys"].append(_normalize_key(f"{token} {nxt} {nxt2}"))
+            used.update((i, i + 1, i + 2))
+            i += 2
+        i += 1
+
+    output["queryTokens"] = [t for i, t in enumerate(tokens) if i not in used]
+    return output
+
+
+def classify(expected: ExpectedParse) -> str:
+    has_bpm = bool(expected["bpmValues"] or expected["bpmRanges"])
+    has_key = bool(expected["keys"])
+    has_kw = bool(expected["queryTokens"])
+    kinds = sum((has_bpm, has_key, has_kw))
+    if kinds == 0:
+        return "empty"
+    if kinds > 1:
+        return "mixed"
+    return "bpm-only" if has_bpm else "key-only" if has_key else "keyword"
+
+
+# ---------------------------------------------------------------------------
+# Grammar
+# ---------------------------------------------------------------------------
+
+Roots = ["A", "B", "C", "D", "E", "F", "G"]
+glued_accidentals: List[str] = ["#", "♯", "b", "♭"]
+word_accidentals: List[str] = ["sharp", "flat"]
+qualities: List[str] = ["major", "maj", "M", "minor", "min", "m"]
+word_qualities: List[str] = ["major", "maj", "minor", "min"]
+
+# Ordered roughly by popularity; sampled with Zipf weights.
+artists: List[str] = [
+    "pierre bourne", "yeat", "ken carson", "playboi carti", "gunna", "drake",
+    "lil tecca", "trippie redd", "internet money", "cochise", "tay-k",
+    "shoreline mafia", "mike sherm", "thouxanbanfauni", "lazer dim 700", "hoodtrap",
+]
+moods: List[str] = [
+    "dark", "happy", "sad", "melodic", "aggressive", "euphoric", "spacy",
+    "experimental", "rage", "bright", "chill", "jazzy", "ambient", "void",
+]
+genres: List[str] = [
+    "trap", "type beat", "lofi", "plugg", "pluggnb", "drill", "hyperpop",
+    "west coast", "synth", "bouncy", "glitchy", "kickless", "808",
+]
+noise_tokens: List[str] = [
+    "!", "?", "...", "(prod. muz)", "*free*", "[FREE]", "🔥", "💀", "&", "/", "+", "\"", "'",
+]
+
+# Popular tempos cluster around trap / half-time ranges.
+popular_bpms: List[int] = [140, 150, 160, 145, 155, 130, 165, 170, 120, 135, 90, 100, 180, 75, 85]
+
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+ARTIST_WEIGHTS = zipf_weights(len(artists))
+MOOD_WEIGHTS = zipf_weights(len(moods))
+GENRE_WEIGHTS = zipf_weights(len(genres))
+BPM_WEIGHTS = zipf_weights(len(popular_bpms), 0.8)
+
+
+def gen_key(rng: random.Random) -> str:
+    root = rng.choice(Roots)
+    if rng.random() < 0.1:
+        root = root.lower()
+    form = rng.choices(["XQ", "XAQ", "X Q", "X A Q"], weights=[40, 35, 15, 10])[0]
+    if form == "XQ":
+        return f"{root}{rng.choice(qualities)}"
+    if form == "XAQ":
+        return f"{root}{rng.choice(glued_accidentals)}{rng.choice(qualities)}"
+    if form == "X Q":
+        return f"{root} {rng.choice(word_qualities)}"
+    return f"{root} {rng.choice(word_accidentals)} {rng.choice(word_qualities)}"
+
+
+def gen_bpm(rng: random.Random) -> str:
+    if rng.random() < 0.7:
+        bpm = rng.choices(popular_bpms, weights=BPM_WEIGHTS)[0]
+    else:
+        bpm = rng.randint(70, 200)
+    if rng.random() < 0.2:
+        lo = max(60, bpm - rng.choice([5, 10, 15, 20]))
+        hi = min(220, bpm + rng.choice([5, 10, 15, 20]))
+        dash = rng.choices(["-", "–", "—"], weights=[90, 7, 3])[0]
+        suffix = rng.choices(["", "bpm"], weights=[80, 20])[0]
+        return f"{lo}{dash}{hi}{suffix}"
+    return rng.choices([f"{bpm}", f"{bpm}bpm", f"{bpm} bpm", f"{bpm}BPM"], weights=[60, 25, 10, 5])[0]
+
+
+def gen_keywords(rng: random.Random) -> str:
+    parts: List[str] = []
+    if rng.random() < 0.7:
+        parts.append(rng.choices(artists, weights=ARTIST_WEIGHTS)[0])
+    if rng.random() < 0.4:
+        parts.append(rng.choices(moods, weights=MOOD_WEIGHTS)[0])
+    if rng.random() < 0.3 or not parts:
+        parts.append(rng.choices(genres, weights=GENRE_WEIGHTS)[0])
+    return " ".join(parts)
+
+
+# Query shapes (which grammar parts appear) and how often users type them.
+realistic_shapes: List[List[str]] = [
+    ["keyword"], ["keyword", "bpm"], ["bpm"], ["key"], ["keyword", "key"], ["keyword", "bpm", "key"],
+]
+REALISTIC_SHAPE_WEIGHTS = [40, 15, 15, 10, 10, 10]
+PART_GENERATORS = {"keyword": gen_keywords, "bpm": gen_bpm, "key": gen_key}
+
+
+def gen_realistic(rng: random.Random) -> str:
+    shape = rng.choices(realistic_shapes, weights=REALISTIC_SHAPE_WEIGHTS)[0]
+    parts = [PART_GENERATORS[part](rng) for part in shape]
+    rng.shuffle(parts)
+    query = " ".join(parts)
+    if rng.random() < 0.05:
+        query = f"{query} {rng.choice(noise_tokens)}"
+    if rng.random() < 0.1:
+        query = query.lower()
+    return query
+
+
+def gen_adversarial(rng: random.Random) -> str:
+    kind = rng.randrange(10)
+    if kind == 0:  # out-of-range / zero / negative numbers
+        return " ".join(rng.choice(["0", "-1", "300", "999", "1000", "2001", "-130", "12"])
+                        for _ in range(rng.randint(1, 4)))
+    if kind == 1:  # inverted, degenerate and leading-zero ranges
+        lo = rng.randint(0, 320)
+        return rng.choice([f"{lo + 10}-{lo}", f"{lo}-{lo}", f"0{lo}-0{lo + 5}", f"-{lo}--{lo}", f"{lo} - {lo + 20}"])
+    if kind == 2:  # keys that almost parse
+        root = rng.choice(Roots + ["H", "X", "c"])
+        return rng.choice([root, f"{root} sharp", f"{root}##min", f"{root}mi", f"{root} m", f"{root}sharpminor"])
+    if kind == 3:  # very long queries
+        return " ".join(gen_realistic(rng) for _ in range(rng.randint(10, 40)))
+    if kind == 4:  # odd casing / separators
+        q = gen_realistic(rng)
+        q = "".join(c.upper() if rng.random() < 0.5 else c for c in q)
+        return rng.choice(["_", ".", "\t", "  ", ",", ";"]).join(q.split(" "))
+    if kind == 5:  # unicode noise
+        return " ".join(rng.choice(["♯", "♭", "é", "ß", "…", "🔥", " ", "\u200b", "日本", "—"])
+                        for _ in range(rng.randint(1, 8)))
+    if kind == 6:  # decimals and units
+        return rng.choice([f"{rng.randint(70, 200)}.{rng.randint(0, 9)}", f"{rng.randint(70, 200)}.5bpm",
+                           f"+{rng.randint(70, 200)}", f"bpm{rng.randint(70, 200)}"])
+    if kind == 7:  # whitespace only / empty
+        return rng.choice(["", " ", "   ", "\t", "\n"])
+    if kind == 8:  # injection-looking text
+        return rng.choice(["'; DROP TABLE beats; --", "%", "%%", "_", "\\", "<script>", "a%b_c", "' OR 1=1"])
+    # kind == 9: repeated tokens
+    return " ".join([gen_bpm(rng)] * rng.randint(2, 20))
+
+
+# ---------------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------------
+
+def shard_seed(seed: int, shard: int) -> int:
+    return seed * 1_000_003 + shard
+
+
+def generate_shard(seed: int, shard: int, start_id: int, count: int,
+                   adversarial_ratio: float, path: str, use_gzip: bool) -> Dict[str, int]:
+    """Write one shard; returns per-class counts."""
+    rng = random.Random(shard_seed(seed, shard))
+    counts: Dict[str, int] = {}
+    opener = gzip.open if use_gzip else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        for offset in range(count):
+            adversarial = rng.random() < adversarial_ratio
+            query = gen_adversarial(rng) if adversarial else gen_realistic(rng)
+            expected = reference_parse(query)
+            record: CorpusRecord = {
+                "id": start_id + offset,
+                "source": "adversarial" if adversarial else "realistic",
+                "queryClass": classify(expected),
+                "input": query,
+                "expected": expected,
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            counts[record["queryClass"]] = counts.get(record["queryClass"], 0) + 1
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Generate a seeded search-query corpus (JSONL shards).")
+    ap.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Total queries to generate.")
+    ap.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Queries per shard file.")
+    ap.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    ap.add_argument("--adversarial-ratio", type=float, default=DEFAULT_ADVERSARIAL_RATIO)
+    ap.add_argument("--out", default=OUTPUT_DIR, help=f"Output directory (default: {OUTPUT_DIR}).")
+    ap.add_argument("--gzip", action="store_true", help="Write .jsonl.gz shards.")
+    ap.add_argument("--only-shard", type=int, default=None, help="Generate just this shard index.")
+    args = ap.parse_args(argv)
+
+    shard_size = max(1, args.shard_size)
+    num_shards = (args.count + shard_size - 1) // shard_size
+    ext = ".jsonl.gz" if args.gzip else ".jsonl"
+    os.makedirs(args.out, exist_ok=True)
+
+    print(f"✅ Generating {args.count} queries in {num_shards} shard(s) (seed={args.seed})...")
+    shards = []
+    totals: Dict[str, int] = {}
+    for shard in range(num_shards):
+        start = shard * shard_size
+        count = min(shard_size, args.count - start)
+        name = f"search_corpus-{shard:05d}{ext}"
+        if args.only_shard is not None and shard != args.only_shard:
+            continue
+        counts = generate_shard(args.seed, shard, start, count, args.adversarial_ratio,
+                                os.path.join(args.out, name), args.gzip)
+        shards.append({"file": name, "shard": shard, "firstId": start, "count": count, "classes": counts})
+        for k, v in counts.items():
+            totals[k] = totals.get(k, 0) + v
+        print(f"   📁 {name}: {count} queries")
+
+    manifest_path = os.path.join(args.out, "manifest.json")
+    if args.only_shard is None:
+        manifest = {
+            "seed": args.seed,
+            "count": args.count,
+            "shardSize": shard_size,
+            "adversarialRatio": args.adversarial_ratio,
+            "classes": totals,
+            "shards": shards,
+        }
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+        print(f"📊 Classes: {json.dumps(totals)}")
+        print(f"📁 Manifest: {os.path.abspath(manifest_path)}")
+
+
+if __name__ == "__main__":
+    main()
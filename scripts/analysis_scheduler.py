@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Memory-aware worker scheduler for audio analysis (used by process_new_beats.py).
+
+librosa's peak memory grows with track length, so a fixed worker count either
+under-uses a big machine or gets OOM-killed on a small one. This runs jobs on
+a pool of long-lived worker processes, but only admits a job while the memory
+budget allows:
+
+- each job's cost is estimated up front from its WAV header
+  (duration x channels x sample rate), before any audio is decoded
+- each worker's RSS is sampled while it runs, so running jobs are charged the
+  larger of their estimate and what they actually use
+- the estimate -> observed ratio is learned as jobs finish, so the next
+  admissions get more accurate
+- concurrency scales between 1 and max_workers: workers are spawned while
+  there is headroom, and idle workers holding memory are retired when the
+  next job would not fit
+
+A job is always admitted when nothing else is running, so one oversized track
+still makes progress. A worker that dies (e.g. OOM-killed) fails only its job
+and is replaced.
+
+RSS comes from psutil when installed, else /proc (Linux); without either the
+scheduler falls back to estimates alone.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import struct
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from pipeline_trace import counter
+
+try:
+    import psutil  # type: ignore
+except ImportError:
+    psutil = None
+
+
+MB = 1024 * 1024
+
+# Resident size of an idle worker once numpy/librosa are imported (refined at runtime).
+DEFAULT_WORKER_BASE_BYTES = 250 * MB
+# Peak analysis memory per byte of decoded float32 PCM (refined at runtime).
+DEFAULT_COST_RATIO = 3.0
+COST_RATIO_SMOOTHING = 0.3
+MIN_COST_RATIO = 0.5
+# Default budget when --memory-budget is not given: this share of available RAM.
+DEFAULT_BUDGET_SHARE = 0.75
+FALLBACK_BUDGET_BYTES = 4096 * MB
+POLL_INTERVAL = 0.2
+# Retire an idle worker whose RSS exceeds this multiple of the baseline when memory is tight.
+RETIRE_BLOAT_FACTOR = 1.5
+
+
+def wav_header_info(path: Path) -> Optional[Tuple[int, int, float]]:
+    """
+    (channels, sample_rate, duration_seconds) read from the RIFF header only.
+    Handles PCM, float and WAVE_FORMAT_EXTENSIBLE; None if the file isn't a WAV.
+    """
+    try:
+        with open(path, "rb") as f:
+            riff = f.read(12)
+            if len(riff) < 12 or riff[:4] not in (b"RIFF", b"RF64") or riff[8:12] != b"WAVE":
+                return None
+            channels = rate = block_align = 0
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                chunk_id, size = header[:4], struct.unpack("<I", header[4:])[0]
+                if chunk_id == b"fmt ":
+                    fmt = f.read(size)
+                    channels, rate = struct.unpack("<HI", fmt[2:8])
+                    block_align = struct.unpack("<H", fmt[12:14])[0]
+                    f.seek(size % 2, 1)
+                elif chunk_id == b"data":
+                    if not (channels and rate and block_align):
+                        return None
+                    if size == 0xFFFFFFFF:  # RF64 / streaming writers: use the file size
+                        size = path.stat().st_size - f.tell()
+                    return channels, rate, size / block_align / rate
+                else:
+                    f.seek(size + size % 2, 1)
+    except (OSError, struct.error):
+        return None
+
+
+def estimate_job_bytes(path: Path) -> int:
+    """Decoded float32 size of the whole file; falls back to the on-disk size."""
+    info = wav_header_info(path)
+    if info is None:
+        try:
+            return path.stat().st_size * 2
+        except OSError:
+            return 0
+    channels, rate, duration = info
+    return int(duration * rate * channels * 4)
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """Current resident set size of a process in bytes (None if unavailable)."""
+    if psutil is not None:
+        try:
+            return int(psutil.Process(pid).memory_info().rss)
+        except Exception:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def default_memory_budget() -> int:
+    """DEFAULT_BUDGET_SHARE of currently available memory."""
+    available = None
+    if psutil is not None:
+        available = psutil.virtual_memory().available
+    else:
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        available = int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+    if not available:
+        return FALLBACK_BUDGET_BYTES
+    return int(available * DEFAULT_BUDGET_SHARE)
+
+
+@dataclass
+class Job:
+    key: str
+    args: Tuple[Any, ...]
+    estimate: int
+
+
+@dataclass
+class SchedulerStats:
+    budget: int = 0
+    max_concurrency: int = 0
+    spawned: int = 0
+    retired: int = 0
+    worker_deaths: int = 0
+    peak_committed: int = 0
+    cost_ratio: float = DEFAULT_COST_RATIO
+    worker_base: int = DEFAULT_WORKER_BASE_BYTES
+
+
+def _worker_main(conn, fn: Callable[..., Any]) -> None:
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        key, args = msg
+        try:
+            conn.send((key, fn(*args), None))
+        except Exception as e:
+            conn.send((key, None, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+    job: Optional[Job] = None
+    peak_rss: int = 0
+    idle_rss: int = 0
+    results: int = 0
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+
+class MemoryAwareScheduler:
+    """Run fn(*job.args) for every job within a memory budget (see module docstring)."""
+
+    def __init__(self, fn: Callable[..., Any], max_workers: int = 0, memory_budget: int = 0):
+        self.fn = fn
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.budget = memory_budget or default_memory_budget()
+        self.ctx = multiprocessing.get_context()
+        self.workers: List[_Worker] = []
+        self.stats = SchedulerStats(budget=self.budget)
+        self._base_measured = False
+
+    # -- cost model -------------------------------------------------------
+
+    def job_cost(self, job: Job) -> int:
+        return int(job.estimate * self.stats.cost_ratio)
+
+    def _learn(self, worker: _Worker, job: Job) -> None:
+        if worker.peak_rss <= 0 or job.estimate <= 0:
+            return
+        observed = max(0, worker.peak_rss - self.stats.worker_base) / job.estimate
+        ratio = (1 - COST_RATIO_SMOOTHING) * self.stats.cost_ratio + COST_RATIO_SMOOTHING * observed
+        self.stats.cost_ratio = max(MIN_COST_RATIO, ratio)
+
+    def _learn_base(self, idle_rss: int) -> None:
+        """Idle RSS after a worker's first job (imports done) is the per-worker baseline."""
+        if not self._base_measured:
+            self.stats.worker_base = idle_rss
+            self._base_measured = True
+        else:
+            self.stats.worker_base = min(self.stats.worker_base, idle_rss)
+
+    def committed(self) -> int:
+        """Memory currently spoken for: live RSS of every worker, or estimates for busy ones if larger."""
+        total = 0
+        for w in self.workers:
+            rss = process_rss(w.pid) or 0
+            if w.job is not None:
+                w.peak_rss = max(w.peak_rss, rss)
+                total += max(rss, self.stats.worker_base + self.job_cost(w.job))
+            else:
+                total += max(rss, w.idle_rss) or self.stats.worker_base
+        return total
+
+    # -- worker lifecycle -------------------------------------------------
+
+    def _spawn(self) -> _Worker:
+        parent, child = self.ctx.Pipe()
+        process = self.ctx.Process(target=_worker_main, args=(child, self.fn), daemon=True)
+        process.start()
+        child.close()
+        worker = _Worker(process=process, conn=parent)
+        self.workers.append(worker)
+        self.stats.spawned += 1
+        return worker
+
+    def _retire(self, worker: _Worker) -> None:
+        try:
+            worker.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        worker.process.join(timeout=5)
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.conn.close()
+        self.workers.remove(worker)
+
+    def _assign(self, worker: _Worker, job: Job) -> None:
+        worker.job = job
+        worker.peak_rss = process_rss(worker.pid) or 0
+        worker.conn.send((job.key, job.args))
+
+    # -- main loop --------------------------------------------------------
+
+    def _next_fitting(self, pending: Deque[Job], headroom: int, anything_running: bool) -> Optional[Job]:
+        """Largest pending job that fits (first-fit over a largest-first queue)."""
+        for job in pending:
+            if not anything_running or self.job_cost(job) <= headroom:
+                pending.remove(job)
+                return job
+        return None
+
+    def run(
+        self,
+        jobs: List[Job],
+        on_result: Optional[Callable[[str, Any, Optional[str]], None]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Returns ({key: result}, {key: error}); on_result is called as each job finishes."""
+        pending: Deque[Job] = deque(sorted(jobs, key=lambda j: -j.estimate))
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+
+        def finish(key: str, result: Any, error: Optional[str]) -> None:
+            if error is None:
+                results[key] = result
+            else:
+                errors[key] = error
+            if on_result is not None:
+                on_result(key, result, error)
+
+        try:
+            while pending or any(w.job for w in self.workers):
+                self._admit(pending)
+                busy = [w for w in self.workers if w.job is not None]
+                self.stats.max_concurrency = max(self.stats.max_concurrency, len(busy))
+                counter("analysis.pending", len(pending))
+                counter("analysis.running", len(busy))
+                ready = wait([w.conn for w in busy], timeout=POLL_INTERVAL)
+                self.committed()  # sample RSS peaks of running jobs
+                for worker in busy:
+                    if worker.conn not in ready:
+                        continue
+                    job = worker.job
+                    try:
+                        key, result, error = worker.conn.recv()
+                    except (EOFError, OSError):
+                        # Worker died mid-job (most likely OOM-killed): fail the job, replace the worker.
+                        self.stats.worker_deaths += 1
+                        worker.job = None
+                        self.workers.remove(worker)
+                        worker.process.join(timeout=1)
+                        finish(job.key, None, f"worker exited (code {worker.process.exitcode}) while analyzing")
+                        continue
+                    self._learn(worker, job)
+                    worker.job = None
+                    worker.results += 1
+                    worker.idle_rss = process_rss(worker.pid) or 0
+                    if worker.results == 1 and worker.idle_rss:
+                        self._learn_base(worker.idle_rss)
+                    finish(key, result, error)
+        finally:
+            for worker in list(self.workers):
+                self._retire(worker)
+        return results, errors
+
+    def _admit(self, pending: Deque[Job]) -> None:
+        while pending:
+            running = any(w.job for w in self.workers)
+            committed = self.committed()
+            self.stats.peak_committed = max(self.stats.peak_committed, committed)
+            idle = [w for w in self.workers if w.job is None]
+            # A new worker also costs its baseline.
+            spawn_cost = 0 if idle else self.stats.worker_base
+            if not idle and len(self.workers) >= self.max_workers:
+                return
+            job = self._next_fitting(pending, self.budget - committed - spawn_cost, running)
+            if job is None:
+                # Nothing fits: free memory still held by an idle worker after a big
+                # job (allocators rarely hand it back); a fresh worker starts at baseline.
+                bloated = [w for w in idle if w.idle_rss > self.stats.worker_base * RETIRE_BLOAT_FACTOR]
+                if bloated and running:
+                    self._retire(max(bloated, key=lambda w: w.idle_rss))
+                    self.stats.retired += 1
+                    continue
+                return
+            worker = idle[0] if idle else self._spawn()
+            self._assign(worker, job)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+"Similar beats" nearest-neighbor table built from the audio analysis features.
+
+analyze_audio() (process_new_beats.py) keeps a compact per-beat descriptor
+(layout in FEATURE_NAMES): the normalized chroma mean, tempo, and a few
+energy / spectral shape statistics. They are stored column-wise as fixed-width
+float32 memmaps under .cache/beat-features/:
+
+    features.f32        n x FEATURE_DIM     per-beat descriptors
+    neighbors_idx.i32   n x K               row ordinals of the K nearest beats
+    neighbors_sim.f32   n x K               their similarity (cosine, higher = closer)
+    index.json          row -> audio_path, normalization stats, k
+
+Neighbors are exact: descriptors are z-scored with stats frozen at the last
+full rebuild, weighted so harmony, tempo and timbre count equally, then
+compared by cosine in row blocks (numpy matmul + argpartition). Adding beats
+only scores the new rows against everything and merges them into the
+existing lists (rows that listed a re-analyzed beat are recomputed), so
+--apply stays cheap however big the catalog gets.
+
+The result is exported as server/public/assets/similar/neighbors.json
+(audio_path joins to beats.audio_path like the search shards), so a
+"similar beats" shelf is a single lookup instead of a query.
+
+Entry points (all via process_new_beats.py):
+  --apply              upsert the new beats and merge them into the table
+  --backfill-similar   analyze all of beats/wav (cached) and rebuild from scratch
+  --reconcile          renamed beats keep their row under the new audio_path
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+STORE_DIR = Path(".cache/beat-features")
+EXPORT_DIR = Path("server/public/assets/similar")
+EXPORT_FILE = "neighbors.json"
+STORE_VERSION = 1
+
+DEFAULT_K = 12
+BLOCK_ROWS = 2048
+
+CONTRAST_BANDS = 7
+FEATURE_NAMES = (
+    [f"chroma_{i}" for i in range(12)]
+    + ["log2_bpm", "onset_mean", "rms_mean", "rms_std", "centroid_mean", "centroid_std",
+       "bandwidth_mean", "rolloff_mean", "zcr_mean"]
+    + [f"contrast_{i}" for i in range(CONTRAST_BANDS)]
+)
+FEATURE_DIM = len(FEATURE_NAMES)
+
+# Each group gets the same total weight regardless of how many columns it has.
+FEATURE_GROUPS = {
+    "harmony": [n for n in FEATURE_NAMES if n.startswith("chroma_")],
+    "tempo": ["log2_bpm", "onset_mean"],
+    "timbre": [n for n in FEATURE_NAMES if not n.startswith("chroma_") and n not in ("log2_bpm", "onset_mean")],
+}
+
+
+def audio_path_for(basename: str) -> str:
+    """beats.audio_path for an output basename (artist__beat_key_bpm)."""
+    return f"/assets/beats/mp3/{basename}.mp3"
+
+
+def column_weights():
+    import numpy as np  # type: ignore
+
+    weights = np.zeros(FEATURE_DIM, dtype=np.float32)
+    for names in FEATURE_GROUPS.values():
+        for name in names:
+            weights[FEATURE_NAMES.index(name)] = 1.0 / np.sqrt(len(names))
+    return weights
+
+
+class FeatureStore:
+    """Append/overwrite rows of fixed-width float32 columns backed by memmaps."""
+
+    def __init__(self, path: Path = STORE_DIR, k: int = DEFAULT_K):
+        self.path = Path(path)
+        self.index_path = self.path / "index.json"
+        meta = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+        self.rows: List[str] = meta.get("rows", [])
+        self.k: int = meta.get("k", k)
+        self.stats: Optional[Dict[str, List[float]]] = meta.get("stats")
+        self.by_path = {p: i for i, p in enumerate(self.rows)}
+        if meta and (meta.get("version") != STORE_VERSION or meta.get("dim") != FEATURE_DIM):
+            self.reset(k)  # layout changed: start over (backfill repopulates)
+
+    def reset(self, k: int = DEFAULT_K) -> None:
+        """Drop every row and the neighbor table."""
+        for name in ("features.f32", "neighbors_idx.i32", "neighbors_sim.f32"):
+            (self.path / name).unlink(missing_ok=True)
+        self.rows, self.by_path, self.stats, self.k = [], {}, None, k
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _memmap(self, name: str, dtype: str, width: int, mode: str = "r"):
+        import numpy as np  # type: ignore
+
+        return np.memmap(self.path / name, dtype=dtype, mode=mode, shape=(len(self.rows), width))
+
+    def features(self):
+        return self._memmap("features.f32", "float32", FEATURE_DIM)
+
+    def neighbors(self):
+        """(idx, sim) arrays, or (None, None) if the table hasn't been built for every row."""
+        idx_path = self.path / "neighbors_idx.i32"
+        expected = len(self.rows) * self.k * 4
+        if not self.rows or not idx_path.exists() or idx_path.stat().st_size != expected:
+            return None, None
+        return (self._memmap("neighbors_idx.i32", "int32", self.k),
+                self._memmap("neighbors_sim.f32", "float32", self.k))
+
+    def upsert(self, items: Iterable[Tuple[str, Sequence[float]]]) -> List[int]:
+        """Write descriptor rows (overwriting existing audio_paths). Returns the touched row ordinals."""
+        import numpy as np  # type: ignore
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        touched: List[int] = []
+        overwrites: Dict[int, np.ndarray] = {}
+        new_paths: List[str] = []
+        appended: List[np.ndarray] = []
+        for audio_path, vector in items:
+            row = np.asarray(vector, dtype=np.float32)
+            if row.shape != (FEATURE_DIM,):
+                raise ValueError(f"{audio_path}: expected {FEATURE_DIM} features, got {row.shape}")
+            if audio_path in self.by_path:
+                i = self.by_path[audio_path]
+                if i < len(self.rows):
+                    overwrites[i] = row
+                else:
+                    appended[i - len(self.rows)] = row
+            else:
+                i = len(self.rows) + len(appended)
+                self.by_path[audio_path] = i
+                new_paths.append(audio_path)
+                appended.append(row)
+            touched.append(i)
+        if overwrites:
+            mm = self._memmap("features.f32", "float32", FEATURE_DIM, mode="r+")
+            for i, row in overwrites.items():
+                mm[i] = row
+            mm.flush()
+            del mm
+        if appended:
+            with open(self.path / "features.f32", "ab") as f:
+                f.write(np.stack(appended).tobytes())
+            self.rows.extend(new_paths)
+        return touched
+
+    def rename(self, old_path: str, new_path: str) -> bool:
+        """Point a row at a new audio_path (the beat's file was renamed; features unchanged)."""
+        i = self.by_path.pop(old_path, None)
+        if i is None or new_path in self.by_path:
+            if i is not None:
+                self.by_path[old_path] = i
+            return False
+        self.rows[i] = new_path
+        self.by_path[new_path] = i
+        return True
+
+    def save(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.index_path.write_text(json.dumps({
+            "version": STORE_VERSION,
+            "dim": FEATURE_DIM,
+            "names": FEATURE_NAMES,
+            "k": self.k,
+            "stats": self.stats,
+            "rows": self.rows,
+        }))
+
+    # -- neighbors ---------------------------------------------------------
+
+    def _embedding(self, refresh_stats: bool):
+        """Weighted, z-scored, L2-normalized descriptors (n x FEATURE_DIM, in RAM)."""
+        import numpy as np  # type: ignore
+
+        x = np.asarray(self.features(), dtype=np.float32)
+        if refresh_stats or self.stats is None:
+            std = x.std(axis=0)
+            self.stats = {"mean": x.mean(axis=0).tolist(), "std": np.where(std > 1e-6, std, 1.0).tolist()}
+        z = (x - np.asarray(self.stats["mean"], dtype=np.float32)) / np.asarray(self.stats["std"], dtype=np.float32)
+        z *= column_weights()
+        z /= np.linalg.norm(z, axis=1, keepdims=True) + 1e-9
+        return z
+
+    def _write_neighbors(self, idx, sim) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        idx.astype("int32").tofile(self.path / "neighbors_idx.i32")
+        sim.astype("float32").tofile(self.path / "neighbors_sim.f32")
+
+    def rebuild_neighbors(self) -> None:
+        """Exact k-NN for every row from scratch (and refreshed normalization stats)."""
+        import numpy as np  # type: ignore
+
+        n = len(self.rows)
+        z = self._embedding(refresh_stats=True)
+        k = min(self.k, max(n - 1, 0))
+        idx = np.full((n, self.k), -1, dtype=np.int32)
+        sim = np.full((n, self.k), -np.inf, dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, n)
+            block = z[start:stop] @ z.T
+            block[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # no self matches
+            top_idx, top_sim = _top_k(block, k)
+            idx[start:stop, :k] = top_idx
+            sim[start:stop, :k] = top_sim
+        self._write_neighbors(idx, sim)
+
+    def update_neighbors(self, touched: Sequence[int]) -> None:
+        """
+        Merge new/changed rows into the existing table: score them against every
+        row, and offer them to every other row's list. Rows that listed a touched
+        row lose that entry, so they are recomputed in full instead of merged;
+        everything is scored in BLOCK_ROWS chunks. Falls back to a full rebuild
+        when there is no table yet.
+        """
+        import numpy as np  # type: ignore
+
+        old_idx, old_sim = self.neighbors()
+        n_old = old_idx.shape[0] if old_idx is not None else 0
+        if old_idx is None:
+            # The table covers fewer rows than the store (rows were appended).
+            old_idx, old_sim = self._grow_neighbors()
+            n_old = old_idx.shape[0] if old_idx is not None else 0
+        if old_idx is None or self.stats is None:
+            self.rebuild_neighbors()
+            return
+
+        n = len(self.rows)
+        touched_arr = np.asarray(sorted(set(touched)), dtype=np.int32)
+        z = self._embedding(refresh_stats=False)
+        k = min(self.k, max(n - 1, 0))
+
+        idx = np.full((n, self.k), -1, dtype=np.int32)
+        sim = np.full((n, self.k), -np.inf, dtype=np.float32)
+        idx[:n_old] = old_idx
+        sim[:n_old] = old_sim
+
+        # Touched rows, and rows whose old list pointed at one (an entry that may
+        # no longer belong there; the next-best candidate isn't in the list).
+        stale = np.zeros(n, dtype=bool)
+        stale[touched_arr] = True
+        stale[:n_old] |= np.isin(old_idx, touched_arr).any(axis=1)
+        recompute = np.flatnonzero(stale).astype(np.int32)
+        for start in range(0, len(recompute), BLOCK_ROWS):
+            rows = recompute[start:start + BLOCK_ROWS]
+            block = z[rows] @ z.T
+            block[np.arange(len(rows)), rows] = -np.inf  # no self matches
+            top_idx, top_sim = _top_k(block, k)
+            idx[rows] = -1
+            sim[rows] = -np.inf
+            idx[rows, :k] = top_idx
+            sim[rows, :k] = top_sim
+
+        # Every other row keeps its list and is offered the touched rows' fresh scores.
+        others = np.flatnonzero(~stale).astype(np.int32)
+        for start in range(0, len(others), BLOCK_ROWS):
+            rows = others[start:start + BLOCK_ROWS]
+            row_idx, row_sim = idx[rows], sim[rows]
+            for col_start in range(0, len(touched_arr), BLOCK_ROWS):
+                cols = touched_arr[col_start:col_start + BLOCK_ROWS]
+                cand_sim = np.concatenate([row_sim, z[rows] @ z[cols].T], axis=1)
+                cand_idx = np.concatenate([row_idx, np.broadcast_to(cols, (len(rows), len(cols)))], axis=1)
+                order = np.argsort(-cand_sim, axis=1, kind="stable")[:, :self.k]
+                row_idx = np.take_along_axis(cand_idx, order, axis=1)
+                row_sim = np.take_along_axis(cand_sim, order, axis=1)
+            idx[rows], sim[rows] = row_idx, row_sim
+        idx[~np.isfinite(sim)] = -1
+        self._write_neighbors(idx, sim)
+
+    def _grow_neighbors(self):
+        """Existing table rows (fewer than the store now has), or (None, None)."""
+        import numpy as np  # type: ignore
+
+        idx_path = self.path / "neighbors_idx.i32"
+        if not idx_path.exists():
+            return None, None
+        n_old = idx_path.stat().st_size // (4 * self.k)
+        if n_old == 0 or n_old > len(self.rows):
+            return None, None
+        idx = np.fromfile(idx_path, dtype=np.int32).reshape(n_old, self.k)
+        sim = np.fromfile(self.path / "neighbors_sim.f32", dtype=np.float32).reshape(n_old, self.k)
+        return idx, sim
+
+    def export(self, export_dir: Path = EXPORT_DIR) -> Path:
+        """Public neighbors table: {paths, neighbors: [[ordinal, ...]], scores: [[sim, ...]]}."""
+        idx, sim = self.neighbors()
+        neighbors: List[List[int]] = []
+        scores: List[List[float]] = []
+        for i in range(len(self.rows)):
+            keep = [(int(j), float(s)) for j, s in zip(idx[i], sim[i]) if j >= 0] if idx is not None else []
+            neighbors.append([j for j, _ in keep])
+            scores.append([round(s, 4) for _, s in keep])
+        export_dir.mkdir(parents=True, exist_ok=True)
+        out = export_dir / EXPORT_FILE
+        tmp = out.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({
+            "format": STORE_VERSION,
+            "k": self.k,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "paths": self.rows,
+            "neighbors": neighbors,
+            "scores": scores,
+        }, separators=(",", ":")))
+        os.replace(tmp, out)
+        return out
+
+
+def _top_k(scores, k: int):
+    """Row-wise top-k (indices, values), sorted best first."""
+    import numpy as np  # type: ignore
+
+    if k <= 0:
+        empty = np.zeros((scores.shape[0], 0))
+        return empty.astype(np.int32), empty.astype(np.float32)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1).astype(np.int32), np.take_along_axis(part_scores, order, axis=1)
+
+
+def update_similar(items: Iterable[Tuple[str, Sequence[float]]], store_dir: Path = STORE_DIR,
+                   export_dir: Path = EXPORT_DIR) -> Dict[str, object]:
+    """Upsert descriptors, merge them into the neighbor table, and re-export (used by --apply)."""
+    store = FeatureStore(store_dir)
+    touched = store.upsert(items)
+    if touched:
+        store.update_neighbors(touched)
+    store.save()
+    out = store.export(export_dir)
+    return {"rows": len(store), "updated": len(touched), "export": str(out)}
+
+
+def rename_similar(renames: Iterable[Tuple[str, str]], store_dir: Path = STORE_DIR,
+                   export_dir: Path = EXPORT_DIR) -> Dict[str, object]:
+    """Re-key renamed beats (old audio_path -> new) without touching the neighbor table."""
+    store = FeatureStore(store_dir)
+    renamed = sum(store.rename(old, new) for old, new in renames)
+    if renamed:
+        store.save()
+        store.export(export_dir)
+    return {"rows": len(store), "renamed": renamed}
+
+
+def rebuild_similar(items: Iterable[Tuple[str, Sequence[float]]], store_dir: Path = STORE_DIR,
+                    export_dir: Path = EXPORT_DIR, k: int = DEFAULT_K) -> Dict[str, object]:
+    """Replace the store with these descriptors and rebuild the whole table (used by --backfill-similar)."""
+    store = FeatureStore(store_dir, k=k)
+    store.reset(k)  # drops beats that left the catalog
+    touched = store.upsert(items)
+    store.rebuild_neighbors()
+    store.save()
+    out = store.export(export_dir)
+    return {"rows": len(store), "updated": len(touched), "export": str(out)}
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Export the beat catalog into compact, versioned static search shards that can
+be served from the CDN and intersected client-side (or at the edge), so the
+common store filters never reach Postgres.
+
+Source of truth is the same filename convention the DB import uses
+(server/src/db/import-beats-from-filenames.ts):
+
+    server/public/assets/beats/mp3/<artist>__<beat_slug>_<KeySlug>_<bpm>.mp3
+
+Shards (all JSON, content-hashed filenames, listed in manifest.json):
+- docs:   ordinal -> {audio_path, title, key, bpm}; audio_path joins to beats.audio_path
+- keys:   normalized key ("c#min") -> posting list that already includes the
+          enharmonic/relative equivalents buildSearchQuery would match
+- bpm:    BPM bucket (BPM_BUCKET wide) -> bitmap over doc ordinals (base64, LSB-first)
+- tokens: lowercase title token -> posting list; AND across tokens like the API,
+          but whole-token matches only (the API's LIKE '%tok%' is a superset)
+
+Posting lists are sorted ordinals, delta-encoded ([first, gap, gap, ...]).
+
+Ordinals are stable: new beats are appended and removed ones tombstoned, so
+an incremental update (process_new_beats.py --apply calls update_index())
+only rewrites the shards whose content changed; unchanged shards keep their
+hashed filename and stay cached at the edge.
+
+manifest.json itself is not content-hashed, so a client (or edge cache) can
+still hold an older manifest for a while. Shards stay on disk until
+SHARD_GRACE_VERSIONS newer index versions have been written, so an old
+manifest never points at a 404.
+
+Usage:
+  python3 scripts/build_search_index.py            # full rebuild from beats/mp3
+  python3 scripts/build_search_index.py --update   # append new mp3s only
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+MP3_DIR = Path("server/public/assets/beats/mp3")
+INDEX_DIR = Path("server/public/assets/search-index")
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+# Shards referenced by this many previous manifests are kept for clients still on them.
+SHARD_GRACE_VERSIONS = 3
+SHARD_FILE_RE = re.compile(r"^[a-z]+\.[0-9a-f]{12}\.json$")
+
+BPM_BUCKET = 5
+
+FILENAME_RE = re.compile(r"^(?P<artist>.+?)__(?P<beat>.+)_(?P<key>[A-G](?:s|b)?(?:maj|min))_(?P<bpm>\d+)$")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Same table as server/src/utils/keyUtils.ts (ENHARMONIC_MAP).
+ENHARMONIC_MAP: Dict[str, List[str]] = {
+    "cmaj": ["b#maj", "amin"], "b#maj": ["cmaj", "amin"], "amin": ["cmaj", "b#maj"],
+    "gmaj": ["emin"], "emin": ["gmaj"],
+    "dmaj": ["bmin"], "bmin": ["dmaj"],
+    "amaj": ["f#min", "gbmin"], "f#min": ["amaj", "gbmin"], "gbmin": ["amaj", "f#min"],
+    "emaj": ["c#min", "dbmin"], "c#min": ["emaj", "dbmin"], "dbmin": ["emaj", "c#min"],
+    "bmaj": ["g#min", "abmin"], "g#min": ["bmaj", "abmin"], "abmin": ["bmaj", "g#min"],
+    "f#maj": ["ebmin", "d#min"], "d#min": ["f#maj", "ebmin"], "ebmin": ["f#maj", "d#min"],
+    "dbmaj": ["bbmin", "a#min"], "bbmin": ["dbmaj", "a#min"], "a#min": ["dbmaj", "bbmin"],
+    "abmaj": ["fmin"], "fmin": ["abmaj"],
+    "ebmaj": ["cmin"], "cmin": ["ebmaj"],
+    "bbmaj": ["gmin", "a#maj"], "gmin": ["bbmaj", "a#maj"], "a#maj": ["bbmaj", "gmin"],
+    "fmaj": ["dmin"], "dmin": ["fmaj"],
+}
+
+
+def key_slug_to_normalized(key_slug: str) -> str:
+    """'Dsmin' -> 'd#min', 'Abmaj' -> 'abmaj' (the canonical beats.key form)."""
+    m = re.match(r"^([A-G])(s|b)?(maj|min)$", key_slug)
+    if not m:
+        return "unknown"
+    accidental = "#" if m.group(2) == "s" else (m.group(2) or "")
+    return f"{m.group(1).lower()}{accidental}{m.group(3)}"
+
+
+def parse_beat_filename(name: str) -> Optional[Dict[str, object]]:
+    """Parse an mp3 filename into a doc record (None if it doesn't follow the convention)."""
+    if not name.lower().endswith(".mp3"):
+        return None
+    m = FILENAME_RE.match(name[:-4])
+    if not m:
+        return None
+    bpm = int(m.group("bpm"))
+    if not 0 < bpm < 300:
+        return None
+    artist = " ".join(w.capitalize() for w in m.group("artist").split("_"))
+    beat = " ".join(w.capitalize() for w in m.group("beat").split("_") if w)
+    return {
+        "audio_path": f"/assets/beats/mp3/{name}",
+        "title": f'{artist} Type Beat - "{beat}"',
+        "key": key_slug_to_normalized(m.group("key")),
+        "bpm": bpm,
+    }
+
+
+def title_tokens(title: str) -> List[str]:
+    return sorted(set(TOKEN_RE.findall(title.lower())))
+
+
+def delta_encode(ordinals: Iterable[int]) -> List[int]:
+    out: List[int] = []
+    prev = 0
+    for i, n in enumerate(sorted(ordinals)):
+        out.append(n if i == 0 else n - prev)
+        prev = n
+    return out
+
+
+def bitmap_b64(ordinals: Iterable[int], size: int) -> str:
+    bits = bytearray((size + 7) // 8)
+    for n in ordinals:
+        bits[n >> 3] |= 1 << (n & 7)
+    return base64.b64encode(bytes(bits)).decode("ascii")
+
+
+class SearchIndex:
+    """Ordinal-stable doc table plus the postings derived from it."""
+
+    def __init__(self, docs: Optional[List[Optional[Dict[str, object]]]] = None):
+        # None entries are tombstones for removed beats (ordinals are never reused).
+        self.docs: List[Optional[Dict[str, object]]] = docs or []
+        self.by_path = {d["audio_path"]: i for i, d in enumerate(self.docs) if d}
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "SearchIndex":
+        """Resume from the docs shard the current manifest points at."""
+        manifest_path = index_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            return cls()
+        docs_file = json.loads(manifest_path.read_text())["shards"]["docs"]
+        return cls(json.loads((index_dir / docs_file).read_text(encoding="utf-8"))["docs"])
+
+    def add(self, doc: Dict[str, object]) -> bool:
+        if doc["audio_path"] in self.by_path:
+            return False
+        self.by_path[doc["audio_path"]] = len(self.docs)
+        self.docs.append(doc)
+        return True
+
+    def remove_missing(self, present_paths: set) -> int:
+        removed = 0
+        for path, ordinal in list(self.by_path.items()):
+            if path not in present_paths:
+                self.docs[ordinal] = None
+                del self.by_path[path]
+                removed += 1
+        return removed
+
+    def shards(self) -> Dict[str, object]:
+        keys: Dict[str, set] = {}
+        buckets: Dict[int, List[int]] = {}
+        tokens: Dict[str, List[int]] = {}
+        for ordinal, doc in enumerate(self.docs):
+            if doc is None:
+                continue
+            keys.setdefault(str(doc["key"]), set()).add(ordinal)
+            buckets.setdefault(int(doc["bpm"]) // BPM_BUCKET * BPM_BUCKET, []).append(ordinal)
+            for token in title_tokens(str(doc["title"])):
+                tokens.setdefault(token, []).append(ordinal)
+
+        # Fold equivalents in so a client needs one lookup per searched key.
+        expanded = {}
+        for key in set(keys) | set(ENHARMONIC_MAP):
+            members = set(keys.get(key, ()))
+            for equivalent in ENHARMONIC_MAP.get(key, []):
+                members |= keys.get(equivalent, set())
+            if members:
+                expanded[key] = delta_encode(members)
+
+        size = len(self.docs)
+        return {
+            "docs": {"docs": self.docs},
+            "keys": {"postings": dict(sorted(expanded.items()))},
+            "bpm": {
+                "bucket": BPM_BUCKET,
+                "size": size,
+                "bitmaps": {str(b): bitmap_b64(ords, size) for b, ords in sorted(buckets.items())},
+            },
+            "tokens": {"postings": {t: delta_encode(ords) for t, ords in sorted(tokens.items())}},
+        }
+
+
+def write_index(index: SearchIndex, index_dir: Path) -> Dict[str, object]:
+    """
+    Write content-hashed shards + manifest. Shards whose content is unchanged
+    keep their existing filename (and CDN cache entry); superseded ones are
+    deleted only once SHARD_GRACE_VERSIONS newer versions reference them no more.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = index_dir / MANIFEST_FILE
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    files: Dict[str, str] = {}
+    changed: List[str] = []
+    for name, payload in index.shards().items():
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        filename = f"{name}.{hashlib.sha256(body).hexdigest()[:12]}.json"
+        if not (index_dir / filename).exists():
+            (index_dir / filename).write_bytes(body)
+            changed.append(name)
+        files[name] = filename
+
+    # Shard sets of the previous versions, newest first, kept for clients on an older manifest.
+    history: List[Dict[str, str]] = previous.get("previous_shards", [])
+    if changed and previous.get("shards"):
+        history = [previous["shards"]] + history
+    history = history[:SHARD_GRACE_VERSIONS]
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": int(previous.get("version", 0)) + (1 if changed else 0),
+        "built_at": datetime.now(timezone.utc).isoformat() if changed else previous.get("built_at"),
+        "doc_count": sum(1 for d in index.docs if d),
+        "bpm_bucket": BPM_BUCKET,
+        "shards": files,
+        "previous_shards": history,
+    }
+    tmp = manifest_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, manifest_path)
+
+    # Only now that the new manifest is live: drop shards no retained version references.
+    referenced = set(files.values())
+    for shards in history:
+        referenced.update(shards.values())
+    for path in index_dir.iterdir():
+        if SHARD_FILE_RE.match(path.name) and path.name not in referenced:
+            path.unlink()
+    return {"manifest": manifest, "changed": changed}
+
+
+def update_index(mp3_paths: Iterable[Path], index_dir: Path = INDEX_DIR) -> Dict[str, object]:
+    """Append the given mp3s to the index (used by process_new_beats.py --apply)."""
+    index = SearchIndex.load(index_dir)
+    added = 0
+    for path in mp3_paths:
+        doc = parse_beat_filename(Path(path).name)
+        if doc and index.add(doc):
+            added += 1
+    result = write_index(index, index_dir)
+    result["added"] = added
+    return result
+
+
+def rebuild_index(mp3_dir: Path = MP3_DIR, index_dir: Path = INDEX_DIR) -> Dict[str, object]:
+    """Sync the index with everything in mp3_dir (keeps existing ordinals)."""
+    index = SearchIndex.load(index_dir)
+    present = set()
+    added = 0
+    for path in sorted(mp3_dir.glob("*.mp3")):
+        doc = parse_beat_filename(path.name)
+        if doc is None:
+            continue
+        present.add(doc["audio_path"])
+        added += index.add(doc)
+    removed = index.remove_missing(present)
+    result = write_index(index, index_dir)
+    result.update(added=added, removed=removed)
+    return result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build static search facet shards for the CDN.")
+    ap.add_argument("--mp3-dir", type=Path, default=MP3_DIR)
+    ap.add_argument("--out", type=Path, default=INDEX_DIR)
+    ap.add_argument("--update", action="store_true", help="Only append mp3s not yet indexed (no removals).")
+    args = ap.parse_args()
+
+    if not args.mp3_dir.exists():
+        raise SystemExit(f"Missing directory: {args.mp3_dir}")
+
+    if args.update:
+        result = update_index(sorted(args.mp3_dir.glob("*.mp3")), args.out)
+    else:
+        result = rebuild_index(args.mp3_dir, args.out)
+
+    manifest = result["manifest"]
+    print(f"Indexed beats: {manifest['doc_count']} (added {result.get('added', 0)}, removed {result.get('removed', 0)})")
+    print(f"Index version: {manifest['version']} -> {args.out / MANIFEST_FILE}")
+    print(f"Changed shards: {', '.join(result['changed']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic beats catalog (plus orders / order_items) for database
+and search benchmarking at 100k-1M+ beats.
+
+Rows follow the same conventions as the real pipeline:
+- artist slugs and beat slugs as produced by process_new_beats.py
+- audio_path = /assets/beats/mp3/<artist>__<beat>_<KeySlug>_<bpm>.mp3 (key_to_slug style)
+- beats.key in the canonical normalized form the search layer matches ("c#min")
+- bpm in 70-200, clustered around common trap tempos
+
+Skew is controllable: artist popularity, tempo clustering and beat
+popularity in orders are all Zipf-like with tunable exponents.
+
+Output is PostgreSQL COPY text format (one file per table) plus a load.sql,
+streamed row by row so memory stays flat apart from beat ids/prices.
+
+Usage:
+  python3 scripts/generate_synthetic_catalog.py --beats 500000 --orders 200000
+  createdb muzbeats_bench
+  psql muzbeats_bench -f server/src/db/schema.sql
+  psql muzbeats_bench -f server/bench/catalog/load.sql
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import itertools
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, TextIO
+
+from process_new_beats import PITCH_CLASSES, key_to_slug, slugify_beat_name
+
+
+OUT_DIR = Path("server/bench/catalog")
+
+ARTIST_SLUGS = [
+    "pierre_bourne", "yeat", "ken_carson", "playboi_carti", "gunna", "lil_tecca",
+    "trippie_redd", "internet_money", "cochise", "tay-k", "shoreline_mafia",
+    "mike_sherm", "thouxanbanfauni", "lazer_dim_700", "hoodtrap", "drake",
+]
+
+TITLE_WORDS = [
+    "midnight", "ghost", "velvet", "neon", "static", "orbit", "ember", "frost",
+    "mirage", "halo", "venom", "saturn", "glass", "riot", "echo", "lucid",
+    "phantom", "drift", "solace", "crimson", "nova", "cascade", "pulse", "zenith",
+    "no. 9", "a&b", "déjà vu", "paradox", "bloom", "siren", "vortex", "ivory",
+]
+
+# Popular tempos first; sampled with Zipf weights, the rest uniform in range.
+POPULAR_BPMS = [140, 150, 160, 145, 155, 130, 165, 170, 120, 135, 90, 100, 180, 75, 85]
+BPM_MIN, BPM_MAX = 70, 200
+
+PRICES = [19.99, 24.99, 29.99, 34.99, 49.99]
+PRICE_WEIGHTS = [60, 15, 15, 5, 5]
+
+ORDER_STATUSES = ["completed", "pending", "failed", "refunded"]
+ORDER_STATUS_WEIGHTS = [85, 8, 5, 2]
+
+BEAT_COLUMNS = ["id", "title", "key", "bpm", "price", "audio_path", "cover_path", "created_at", "updated_at"]
+ORDER_COLUMNS = ["id", "customer_email", "total_amount", "status", "paypal_order_id",
+                 "download_email_sent_at", "created_at", "updated_at"]
+ORDER_ITEM_COLUMNS = ["id", "order_id", "beat_id", "price_at_purchase", "quantity", "created_at"]
+
+
+def zipf_cum_weights(n: int, s: float) -> List[float]:
+    """Cumulative Zipf weights for rank 1..n (s = 0 is uniform)."""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def pick(rng: random.Random, cum_weights: Sequence[float]) -> int:
+    """Index drawn from cumulative weights (bisect; O(log n) per draw)."""
+    return bisect.bisect_right(cum_weights, rng.random() * cum_weights[-1])
+
+
+def copy_escape(value: object) -> str:
+    """Encode one value for COPY ... FROM (FORMAT text)."""
+    if value is None:
+        return "\\N"
+    s = str(value)
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def write_row(f: TextIO, values: Iterable[object]) -> None:
+    f.write("\t".join(copy_escape(v) for v in values) + "\n")
+
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def artist_display(slug: str) -> str:
+    return " ".join(w.capitalize() for w in slug.split("_"))
+
+
+def random_key(rng: random.Random, minor_share: float) -> tuple[str, str]:
+    """Returns (key_slug like 'Csmin', normalized db key like 'c#min')."""
+    root = rng.choice(PITCH_CLASSES)
+    mode = "min" if rng.random() < minor_share else "maj"
+    return key_to_slug(f"{root} {mode}"), f"{root.lower()}{mode}"
+
+
+def random_bpm(rng: random.Random, popular_cum: Sequence[float], popular_share: float) -> int:
+    if rng.random() < popular_share:
+        return POPULAR_BPMS[pick(rng, popular_cum)]
+    return rng.randint(BPM_MIN, BPM_MAX)
+
+
+def generate_beats(f: TextIO, args: argparse.Namespace, rng: random.Random,
+                   start: datetime) -> tuple[List[str], List[float]]:
+    artist_cum = zipf_cum_weights(len(ARTIST_SLUGS), args.artist_skew)
+    bpm_cum = zipf_cum_weights(len(POPULAR_BPMS), args.bpm_skew)
+    price_cum = list(itertools.accumulate(PRICE_WEIGHTS))
+    span_seconds = int(args.years * 365 * 86400)
+
+    ids: List[str] = []
+    prices: List[float] = []
+    seen_basenames = set()
+    for _ in range(args.beats):
+        artist = ARTIST_SLUGS[pick(rng, artist_cum)]
+        words = rng.sample(TITLE_WORDS, rng.choice([1, 1, 2, 2, 3]))
+        display = " ".join(words).title()
+        beat_slug = slugify_beat_name(display)
+        key_slug, db_key = random_key(rng, args.minor_share)
+        bpm = random_bpm(rng, bpm_cum, args.popular_bpm_share)
+
+        out_base = f"{artist}__{beat_slug}_{key_slug}_{bpm}"
+        if out_base in seen_basenames:
+            # Same as a real collision; disambiguate the slug the way a human would
+            for n in itertools.count(2):
+                candidate = f"{artist}__{beat_slug}_{n}_{key_slug}_{bpm}"
+                if candidate not in seen_basenames:
+                    display, out_base = f"{display} {n}", candidate
+                    break
+        seen_basenames.add(out_base)
+
+        beat_id = seeded_uuid(rng)
+        price = PRICES[pick(rng, price_cum)]
+        created = start + timedelta(seconds=rng.randrange(span_seconds))
+        title = f'{artist_display(artist)} Type Beat - "{display}"'
+        write_row(f, [
+            beat_id, title, db_key, bpm, f"{price:.2f}",
+            f"/assets/beats/mp3/{out_base}.mp3",
+            f"/assets/images/covers/{beat_id}.webp",
+            created.isoformat(), created.isoformat(),
+        ])
+        ids.append(beat_id)
+        prices.append(price)
+    return ids, prices
+
+
+def generate_orders(orders_f: TextIO, items_f: TextIO, args: argparse.Namespace, rng: random.Random,
+                    beat_ids: List[str], beat_prices: List[float], start: datetime) -> int:
+    # Beat popularity: a random permutation so popular beats aren't just the oldest rows
+    popularity = list(range(len(beat_ids)))
+    rng.shuffle(popularity)
+    beat_cum = zipf_cum_weights(len(beat_ids), args.popularity_skew)
+    status_cum = list(itertools.accumulate(ORDER_STATUS_WEIGHTS))
+    span_seconds = int(args.years * 365 * 86400)
+
+    items_written = 0
+    for n in range(args.orders):
+        order_id = seeded_uuid(rng)
+        created = start + timedelta(seconds=rng.randrange(span_seconds))
+        status = ORDER_STATUSES[pick(rng, status_cum)]
+        num_items = rng.choices([1, 2, 3, 4], weights=[70, 20, 7, 3])[0]
+        chosen = {popularity[pick(rng, beat_cum)] for _ in range(num_items)}
+
+        total = 0.0
+        for idx in chosen:
+            total += beat_prices[idx]
+            write_row(items_f, [seeded_uuid(rng), order_id, beat_ids[idx],
+                                f"{beat_prices[idx]:.2f}", 1, created.isoformat()])
+            items_written += 1
+
+        sent = (created + timedelta(minutes=1)).isoformat() if status == "completed" else None
+        paypal_id = f"SYNTH{n:012d}" if status != "pending" else None
+        write_row(orders_f, [order_id, f"buyer{rng.randrange(args.orders * 2)}@example.com",
+                             f"{total:.2f}", status, paypal_id, sent,
+                             created.isoformat(), created.isoformat()])
+    return items_written
+
+
+def write_load_sql(out_dir: Path) -> Path:
+    path = out_dir / "load.sql"
+    base = out_dir.resolve()
+    lines = [
+        "-- Bulk load for the synthetic catalog (run against a scratch database",
+        "-- that already has server/src/db/schema.sql applied).",
+        "BEGIN;",
+        "TRUNCATE order_items, downloads, orders, beats;",
+        f"\\copy beats ({', '.join(BEAT_COLUMNS)}) FROM '{base / 'beats.copy'}'",
+        f"\\copy orders ({', '.join(ORDER_COLUMNS)}) FROM '{base / 'orders.copy'}'",
+        f"\\copy order_items ({', '.join(ORDER_ITEM_COLUMNS)}) FROM '{base / 'order_items.copy'}'",
+        "COMMIT;",
+        "ANALYZE beats;",
+        "ANALYZE orders;",
+        "ANALYZE order_items;",
+        "",
+    ]
+    path.write_text("\n".join(lines))
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Generate a synthetic catalog as PostgreSQL COPY files.")
+    ap.add_argument("--beats", type=int, default=100_000, help="Number of beats rows.")
+    ap.add_argument("--orders", type=int, default=50_000, help="Number of orders rows.")
+    ap.add_argument("--seed", type=int, default=1337)
+    ap.add_argument("--out", type=Path, default=OUT_DIR, help=f"Output directory (default: {OUT_DIR}).")
+    ap.add_argument("--years", type=float, default=3.0, help="Spread created_at over this many years.")
+    ap.add_argument("--artist-skew", type=float, default=1.1, help="Zipf exponent for artist popularity (0 = uniform).")
+    ap.add_argument("--bpm-skew", type=float, default=0.8, help="Zipf exponent across popular tempos.")
+    ap.add_argument("--popular-bpm-share", type=float, default=0.7,
+                    help="Share of beats drawn from popular tempos (rest uniform in 70-200).")
+    ap.add_argument("--minor-share", type=float, default=0.75, help="Share of beats in minor keys.")
+    ap.add_argument("--popularity-skew", type=float, default=1.0,
+                    help="Zipf exponent for which beats get purchased (0 = uniform).")
+    args = ap.parse_args(argv)
+
+    if args.beats <= 0:
+        raise SystemExit("--beats must be positive")
+
+    rng = random.Random(args.seed)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    with open(args.out / "beats.copy", "w", encoding="utf-8") as f:
+        beat_ids, beat_prices = generate_beats(f, args, rng, start)
+    print(f"Wrote beats: {len(beat_ids)} -> {args.out / 'beats.copy'}")
+
+    with open(args.out / "orders.copy", "w", encoding="utf-8") as orders_f, \
+            open(args.out / "order_items.copy", "w", encoding="utf-8") as items_f:
+        items = generate_orders(orders_f, items_f, args, rng, beat_ids, beat_prices, start)
+    print(f"Wrote orders: {args.orders}, order_items: {items}")
+
+    load_sql = write_load_sql(args.out)
+    print(f"Wrote loader: {load_sql}")
+    print(f"Load with: psql <scratch_db> -f server/src/db/schema.sql && psql <scratch_db> -f {load_sql}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Replay search-query corpora against GET /api/beats under concurrent load.
+
+Reads the JSON Lines shards written by
+client/src/__tests__/generators/generate_search_corpus.py (each record has
+"input" and "queryClass") and sends them as /api/beats?q=<input> over a pool
+of persistent HTTP/1.1 keep-alive connections (stdlib asyncio, no extra deps).
+
+Modes:
+- closed: --concurrency workers each send the next query as soon as the
+  previous response arrives (measures capacity).
+- open:   requests are issued at a fixed --rate (req/s) regardless of how
+  fast the server answers; latency is measured from each request's scheduled
+  send time, so queueing delay is not hidden (no coordinated omission).
+
+Reports p50/p95/p99/max latency, throughput and error rate overall and per
+query class (bpm-only, key-only, keyword, mixed, empty), and optionally
+writes the summary as JSON. A request that gets no complete response within
+--timeout seconds counts as an error (and as a timeout); its connection is
+dropped rather than reused, so one stalled response can't hang the run.
+
+Typical local run (server + scratch DB loaded via generate_synthetic_catalog.py):
+  cd server && DATABASE_URL=postgresql://localhost/muzbeats_bench npm run dev
+  python3 scripts/load_test_search.py server/bench/search-corpus --mode closed --concurrency 64 --duration 60
+  python3 scripts/load_test_search.py server/bench/search-corpus --mode open --rate 500 --duration 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import itertools
+import json
+import math
+import socket
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+
+DEFAULT_BASE_URL = "http://localhost:3000"
+SEARCH_PATH = "/api/beats"
+DEFAULT_TIMEOUT_S = 10.0
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def corpus_files(path: Path) -> List[Path]:
+    if path.is_dir():
+        files = sorted(list(path.glob("*.jsonl")) + list(path.glob("*.jsonl.gz")))
+    else:
+        files = [path]
+    if not files:
+        raise SystemExit(f"No .jsonl/.jsonl.gz corpus files under {path}")
+    return files
+
+
+def load_queries(path: Path, limit: int) -> List[Tuple[str, str]]:
+    """(queryClass, input) pairs, read up front so disk I/O stays out of the timed loop."""
+    queries: List[Tuple[str, str]] = []
+    for file in corpus_files(path):
+        opener = gzip.open if file.suffix == ".gz" else open
+        with opener(file, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                queries.append((record.get("queryClass", "unknown"), record["input"]))
+                if limit and len(queries) >= limit:
+                    return queries
+    return queries
+
+
+# ---------------------------------------------------------------------------
+# Minimal keep-alive HTTP/1.1 client
+# ---------------------------------------------------------------------------
+
+class HttpError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def ensure_open(self) -> None:
+        if self.writer is None or self.writer.is_closing():
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            sock = self.writer.get_extra_info("socket")
+            if sock is not None:
+                # Requests are tiny; don't let Nagle + delayed ACK add ~40ms per round trip.
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def get(self, target: str) -> int:
+        """Send one GET and drain the response body; returns the status code."""
+        await self.ensure_open()
+        assert self.reader is not None and self.writer is not None
+        self.writer.write(
+            f"GET {target} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Accept: application/json\r\nConnection: keep-alive\r\n\r\n".encode("ascii")
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HttpError("connection closed by server")
+        parts = status_line.split(b" ", 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise HttpError(f"bad status line: {status_line!r}")
+        status = int(parts[1])
+
+        headers: Dict[bytes, bytes] = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get(b"transfer-encoding", b"").lower() == b"chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)  # chunk + CRLF
+                if size == 0:
+                    break
+        elif b"content-length" in headers:
+            await self.reader.readexactly(int(headers[b"content-length"]))
+        else:
+            await self.reader.read()  # body delimited by close
+            self.close()
+            return status
+
+        if headers.get(b"connection", b"").lower() == b"close":
+            self.close()
+        return status
+
+
+class ConnectionPool:
+    def __init__(self, host: str, port: int, size: int, timeout: float = DEFAULT_TIMEOUT_S):
+        self.timeout = timeout
+        self.queue: asyncio.Queue[Connection] = asyncio.Queue()
+        for _ in range(size):
+            self.queue.put_nowait(Connection(host, port))
+
+    async def get(self, target: str) -> int:
+        """One request on a pooled connection; raises asyncio.TimeoutError after `timeout` seconds."""
+        conn = await self.queue.get()
+        try:
+            return await asyncio.wait_for(conn.get(target), self.timeout)
+        except Exception:
+            # Reconnect lazily on next use; after a timeout the stalled
+            # response may still arrive, so the stream can't be reused.
+            conn.close()
+            raise
+        finally:
+            self.queue.put_nowait(conn)
+
+    def close(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait().close()
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ClassStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    timeouts: int = 0
+    statuses: Dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, latency_ms: float, status: Optional[int], timed_out: bool = False) -> None:
+        if status is None or status >= 400:
+            self.errors += 1
+        if timed_out:
+            self.timeouts += 1
+        if status is not None:
+            self.statuses[status] += 1
+        self.latencies_ms.append(latency_ms)
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list (None when empty, null in the JSON)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(stats: ClassStats, elapsed_s: float) -> Dict[str, object]:
+    lat = sorted(stats.latencies_ms)
+    n = len(lat)
+    return {
+        "requests": n,
+        "errors": stats.errors,
+        "timeouts": stats.timeouts,
+        "error_rate": stats.errors / n if n else 0.0,
+        "throughput_rps": n / elapsed_s if elapsed_s > 0 else 0.0,
+        "p50_ms": percentile(lat, 50),
+        "p95_ms": percentile(lat, 95),
+        "p99_ms": percentile(lat, 99),
+        "max_ms": lat[-1] if lat else None,
+        "mean_ms": sum(lat) / n if n else None,
+        "statuses": dict(stats.statuses),
+    }
+
+
+class Recorder:
+    def __init__(self, warmup_until: float):
+        self.warmup_until = warmup_until
+        self.by_class: Dict[str, ClassStats] = defaultdict(ClassStats)
+        self.overall = ClassStats()
+
+    def record(self, query_class: str, start: float, status: Optional[int], timed_out: bool = False) -> None:
+        if start < self.warmup_until:
+            return
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        self.by_class[query_class].record(latency_ms, status, timed_out)
+        self.overall.record(latency_ms, status, timed_out)
+
+
+async def timed_request(pool: ConnectionPool, recorder: Recorder, query_class: str,
+                        query: str, scheduled: float) -> None:
+    target = f"{SEARCH_PATH}?q={quote(query, safe='')}"
+    timed_out = False
+    try:
+        status: Optional[int] = await pool.get(target)
+    except asyncio.TimeoutError:
+        status, timed_out = None, True
+    except (OSError, HttpError, asyncio.IncompleteReadError, ValueError):
+        status = None
+    recorder.record(query_class, scheduled, status, timed_out)
+
+
+async def run_closed(pool: ConnectionPool, recorder: Recorder, queries: Iterator[Tuple[str, str]],
+                     concurrency: int, deadline: float, max_requests: int) -> None:
+    sent = itertools.count()
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            if max_requests and next(sent) >= max_requests:
+                return
+            query_class, query = next(queries)
+            await timed_request(pool, recorder, query_class, query, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_open(pool: ConnectionPool, recorder: Recorder, queries: Iterator[Tuple[str, str]],
+                   rate: float, deadline: float, max_requests: int) -> None:
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    in_flight = set()
+    for n in itertools.count():
+        scheduled = start + n * interval
+        if scheduled >= deadline or (max_requests and n >= max_requests):
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        query_class, query = next(queries)
+        task = asyncio.create_task(timed_request(pool, recorder, query_class, query, scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def print_report(summary: Dict[str, Dict[str, object]]) -> None:
+    header = (f"{'class':<12} {'reqs':>9} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+              f"{'err%':>7} {'timeouts':>8}")
+    print(header)
+    print("-" * len(header))
+    for name, s in summary.items():
+        print(f"{name:<12} {s['requests']:>9} {s['throughput_rps']:>9.1f} {_ms(s['p50_ms'])} "
+              f"{_ms(s['p95_ms'])} {_ms(s['p99_ms'])} {_ms(s['max_ms'])} {100 * s['error_rate']:>6.2f}% "
+              f"{s['timeouts']:>8}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    url = urlsplit(args.base_url)
+    if url.scheme != "http":
+        raise SystemExit("Only plain http:// targets are supported (run against a local server).")
+    host, port = url.hostname or "localhost", url.port or 80
+
+    queries = load_queries(args.corpus, args.limit)
+    if not queries:
+        raise SystemExit("Corpus is empty.")
+    print(f"Loaded {len(queries)} queries from {args.corpus}")
+    print(f"Target: {args.base_url}{SEARCH_PATH} | mode={args.mode} | connections={args.connections}")
+
+    pool = ConnectionPool(host, port, args.connections, args.timeout)
+    begin = time.perf_counter()
+    recorder = Recorder(warmup_until=begin + args.warmup)
+    deadline = begin + args.warmup + args.duration
+    cycle = itertools.cycle(queries)
+    try:
+        if args.mode == "closed":
+            await run_closed(pool, recorder, cycle, args.concurrency, deadline, args.requests)
+        else:
+            await run_open(pool, recorder, cycle, args.rate, deadline, args.requests)
+    finally:
+        pool.close()
+    elapsed = max(time.perf_counter() - (begin + args.warmup), 1e-9)
+
+    summary = {"overall": summarize(recorder.overall, elapsed)}
+    for name in sorted(recorder.by_class):
+        summary[name] = summarize(recorder.by_class[name], elapsed)
+    return {
+        "base_url": args.base_url,
+        "mode": args.mode,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "rate": args.rate if args.mode == "open" else None,
+        "connections": args.connections,
+        "duration_s": elapsed,
+        "warmup_s": args.warmup,
+        "timeout_s": args.timeout,
+        "results": summary,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Async load driver for GET /api/beats search.")
+    ap.add_argument("corpus", type=Path, help="Corpus .jsonl(.gz) file or directory of shards.")
+    ap.add_argument("--base-url", default=DEFAULT_BASE_URL, help=f"Server base URL (default: {DEFAULT_BASE_URL}).")
+    ap.add_argument("--mode", choices=["closed", "open"], default="closed")
+    ap.add_argument("--concurrency", type=int, default=32, help="Closed loop: concurrent workers.")
+    ap.add_argument("--rate", type=float, default=200.0, help="Open loop: requests per second.")
+    ap.add_argument("--connections", type=int, default=0,
+                    help="Keep-alive connections in the pool (0 = concurrency for closed, 64 for open).")
+    ap.add_argument("--duration", type=float, default=30.0, help="Measured seconds (after warmup).")
+    ap.add_argument("--warmup", type=float, default=5.0, help="Seconds of load excluded from results.")
+    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_S,
+                    help=f"Seconds before a request counts as a timeout error (default: {DEFAULT_TIMEOUT_S:g}).")
+    ap.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only).")
+    ap.add_argument("--limit", type=int, default=0, help="Load at most this many corpus queries (0 = all).")
+    ap.add_argument("--out", type=Path, default=None, help="Write the summary JSON here.")
+    args = ap.parse_args()
+
+    if args.connections <= 0:
+        args.connections = args.concurrency if args.mode == "closed" else 64
+    if args.mode == "open" and args.rate <= 0:
+        raise SystemExit("--rate must be positive")
+    if args.timeout <= 0:
+        raise SystemExit("--timeout must be positive")
+
+    report = asyncio.run(run(args))
+    print()
+    print_report(report["results"])
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2, allow_nan=False))
+        print(f"\nWrote: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+EBU R128 loudness measurement in NumPy (used by process_new_beats.py).
+
+analyze_audio() decodes each WAV once at its native rate and channel count,
+measures it here, and only then downmixes/resamples for librosa, so previews
+(and, on request, full MP3s) can be gain-normalized in the single ffmpeg
+encode pass instead of running a two-pass `loudnorm` that decodes twice more.
+
+- integrated loudness (LUFS): ITU-R BS.1770-4 K-weighting, 400 ms blocks with
+  75% overlap, -70 LUFS absolute gate and -10 LU relative gate
+- loudness range (LU): EBU Tech 3342, 3 s short-term blocks, -70 LUFS absolute
+  and -20 LU relative gate, 95th minus 10th percentile
+- true peak (dBTP): 4x oversampling with a windowed-sinc polyphase FIR
+
+The K-weighting biquads are applied as one FFT convolution (overlap-add) with
+their combined impulse response, and block energies come from a cumulative
+sum of squares, so nothing loops per sample in Python.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+# Reported for silence / clips shorter than one gating block.
+LOUDNESS_FLOOR = -70.0
+
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+LRA_RELATIVE_GATE = -20.0
+MOMENTARY_SECONDS = 0.4
+SHORT_TERM_SECONDS = 3.0
+BLOCK_HOP_SECONDS = 0.1
+
+TRUE_PEAK_OVERSAMPLE = 4
+TRUE_PEAK_TAPS = 48
+
+# K-weighting filter parameters (libebur128), re-derived for any sample rate.
+SHELF_F0, SHELF_GAIN_DB, SHELF_Q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+HIGHPASS_F0, HIGHPASS_Q = 38.13547087602444, 0.5003270373238773
+IMPULSE_SECONDS = 0.35
+FFT_BLOCK = 1 << 18
+
+
+@dataclass
+class LoudnessStats:
+    integrated: float  # LUFS
+    loudness_range: float  # LU
+    true_peak: float  # dBTP
+
+
+def k_weighting_coefficients(rate: int):
+    """((b, a) high shelf, (b, a) high pass) for BS.1770 K-weighting at `rate`."""
+    k = math.tan(math.pi * SHELF_F0 / rate)
+    vh = 10 ** (SHELF_GAIN_DB / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / SHELF_Q + k * k
+    shelf = (
+        [(vh + vb * k / SHELF_Q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / SHELF_Q + k * k) / a0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / SHELF_Q + k * k) / a0],
+    )
+    k = math.tan(math.pi * HIGHPASS_F0 / rate)
+    a0 = 1 + k / HIGHPASS_Q + k * k
+    highpass = ([1.0, -2.0, 1.0], [1.0, 2 * (k * k - 1) / a0, (1 - k / HIGHPASS_Q + k * k) / a0])
+    return shelf, highpass
+
+
+def k_weighting_impulse(rate: int):
+    """Impulse response of both K-weighting stages, from their frequency response."""
+    import numpy as np  # type: ignore
+
+    length = int(rate * IMPULSE_SECONDS)
+    n_fft = 1 << (4 * length - 1).bit_length()  # long grid so the periodic response doesn't alias
+    z = np.exp(-1j * np.pi * np.arange(n_fft // 2 + 1) / (n_fft // 2))
+    response = np.ones_like(z)
+    for b, a in k_weighting_coefficients(rate):
+        response *= np.polyval(b[::-1], z) / np.polyval(a[::-1], z)
+    return np.fft.irfft(response, n_fft)[:length]
+
+
+def fft_filter(x, h, block: int = FFT_BLOCK):
+    """Linear convolution of x (..., n) with h, truncated to n samples (overlap-add)."""
+    import numpy as np  # type: ignore
+
+    n = x.shape[-1]
+    n_fft = 1 << (block + len(h) - 2).bit_length()
+    H = np.fft.rfft(h, n_fft)
+    out = np.zeros(x.shape[:-1] + (n + len(h) - 1,), dtype=np.float64)
+    for start in range(0, n, block):
+        seg = x[..., start:start + block]
+        y = np.fft.irfft(np.fft.rfft(seg, n_fft) * H, n_fft)[..., :seg.shape[-1] + len(h) - 1]
+        out[..., start:start + y.shape[-1]] += y
+    return out[..., :n]
+
+
+def block_powers(weighted, rate: int, block_seconds: float, hop_seconds: float = BLOCK_HOP_SECONDS):
+    """Channel-summed mean square of every gating block (BS.1770 z_ij summed over i)."""
+    import numpy as np  # type: ignore
+
+    n = weighted.shape[-1]
+    length = int(round(block_seconds * rate))
+    hop = int(round(hop_seconds * rate))
+    if n < length:
+        return np.zeros(0)
+    cs = np.zeros(weighted.shape[:-1] + (n + 1,), dtype=np.float64)
+    np.cumsum(weighted * weighted, axis=-1, out=cs[..., 1:])
+    starts = np.arange(0, n - length + 1, hop)
+    # Channel weights are 1.0 for L/R/C; the catalog is mono/stereo.
+    return ((cs[..., starts + length] - cs[..., starts]) / length).sum(axis=0)
+
+
+def _lufs(power):
+    import numpy as np  # type: ignore
+
+    return -0.691 + 10 * np.log10(np.maximum(power, 1e-20))
+
+
+def integrated_loudness(momentary_powers) -> float:
+    powers = momentary_powers[_lufs(momentary_powers) > ABSOLUTE_GATE]
+    if powers.size == 0:
+        return LOUDNESS_FLOOR
+    relative = float(_lufs(powers.mean())) + RELATIVE_GATE
+    gated = powers[_lufs(powers) > relative]
+    return float(_lufs(gated.mean())) if gated.size else LOUDNESS_FLOOR
+
+
+def loudness_range(short_term_powers) -> float:
+    import numpy as np  # type: ignore
+
+    levels = _lufs(short_term_powers)
+    levels = levels[levels > ABSOLUTE_GATE]
+    if levels.size == 0:
+        return 0.0
+    relative = float(_lufs(10 ** ((levels + 0.691) / 10).mean())) + LRA_RELATIVE_GATE
+    levels = levels[levels > relative]
+    if levels.size == 0:
+        return 0.0
+    low, high = np.percentile(levels, [10, 95])
+    return float(high - low)
+
+
+def true_peak(samples, rate: int) -> float:
+    """Max |sample| of the 4x oversampled signal, in dBTP."""
+    import numpy as np  # type: ignore
+
+    if samples.shape[-1] == 0:
+        return LOUDNESS_FLOOR
+    peak = float(np.abs(samples).max())
+    if rate < 4 * 44100:  # already oversampled enough otherwise
+        n = np.arange(TRUE_PEAK_TAPS) - (TRUE_PEAK_TAPS - 1) / 2
+        prototype = np.sinc(n / TRUE_PEAK_OVERSAMPLE) * np.kaiser(TRUE_PEAK_TAPS, 8.0)
+        for phase in range(TRUE_PEAK_OVERSAMPLE):
+            taps = prototype[phase::TRUE_PEAK_OVERSAMPLE]
+            taps = taps / taps.sum()
+            for channel in samples:
+                peak = max(peak, float(np.abs(np.convolve(channel, taps, mode="same")).max()))
+    return 20 * math.log10(peak) if peak > 0 else LOUDNESS_FLOOR
+
+
+def measure_loudness(samples, rate: int) -> LoudnessStats:
+    """
+    samples: (channels, n) or (n,) float array at the file's native rate
+    (librosa.load(..., sr=None, mono=False)).
+    """
+    import numpy as np  # type: ignore
+
+    samples = np.atleast_2d(np.asarray(samples, dtype=np.float32))
+    if samples.shape[-1] == 0:
+        # Empty or truncated file: report it like silence (normalization_gain gives 0 dB).
+        return LoudnessStats(integrated=LOUDNESS_FLOOR, loudness_range=0.0, true_peak=LOUDNESS_FLOOR)
+    weighted = fft_filter(samples, k_weighting_impulse(rate))
+    integrated = integrated_loudness(block_powers(weighted, rate, MOMENTARY_SECONDS))
+    lra = loudness_range(block_powers(weighted, rate, SHORT_TERM_SECONDS))
+    return LoudnessStats(
+        integrated=round(integrated, 2),
+        loudness_range=round(lra, 2),
+        true_peak=round(true_peak(samples, rate), 2),
+    )
+
+
+def normalization_gain(integrated: float, true_peak_dbtp: float, target_lufs: float, ceiling_dbtp: float) -> float:
+    """Gain (dB) that brings integrated loudness to the target without pushing true peak over the ceiling."""
+    if integrated <= LOUDNESS_FLOOR:
+        return 0.0
+    return round(min(target_lufs - integrated, ceiling_dbtp - true_peak_dbtp), 2)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest of local media and a diff against the R2 buckets.
+
+check-r2-vs-local.sh / find-missing-covers.* compare names only and re-list
+everything on every run. This instead:
+
+- hashes server/public/assets/{beats/wav, beats/mp3, images/covers} in a thread
+  pool (mmap + hashlib, which releases the GIL while hashing), reusing the
+  previous manifest's hash for every file whose (path, size, mtime) is unchanged,
+  so a re-run only reads new or modified files
+- lists each bucket prefix once (boto3) and caches the listing in .cache/, so
+  repeated diffs don't hit the API (--refresh-remote to re-list)
+- reports, per source, objects that are
+    missing:  local file not in the bucket
+    stale:    in both, but content differs (MD5 vs single-part ETag, else size)
+    orphaned: in the bucket with no local file
+
+Local -> remote key mapping follows the server (utils/r2.ts, downloadService.ts):
+    beats/wav/<f>.wav           -> private bucket   wav/<f>.wav
+    beats/mp3/<f>.mp3           -> public bucket    beats/mp3/<f>.mp3
+    images/covers/<...>.webp    -> public bucket    images/covers/<...>.webp  (unused*/ skipped)
+
+Any S3-compatible endpoint works (--endpoint-url, default $R2_ENDPOINT), so a
+local stand-in like MinIO or `moto_server` can be used for testing.
+
+Usage:
+  python3 scripts/media_manifest.py                      # manifest only
+  python3 scripts/media_manifest.py --diff               # + diff vs cached/fresh listings
+  python3 scripts/media_manifest.py --diff --refresh-remote --endpoint-url http://localhost:9000
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+ASSETS_DIR = Path("server/public/assets")
+CACHE_DIR = Path(".cache")
+MANIFEST_PATH = CACHE_DIR / "media-manifest.json"
+REPORT_PATH = Path("docs/audits/media-diff.json")
+MANIFEST_VERSION = 1
+
+PUBLIC_BUCKET = os.environ.get("R2_PUBLIC_BUCKET_NAME", "muzbeats-media-public")
+PRIVATE_BUCKET = os.environ.get("R2_PRIVATE_BUCKET_NAME", "")
+
+DEFAULT_REMOTE_MAX_AGE = 3600
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    local_dir: Path  # relative to ASSETS_DIR
+    bucket: str
+    prefix: str  # remote key prefix for local_dir
+    suffix: str
+    recursive: bool = False
+    skip_dirs: Tuple[str, ...] = ()
+
+
+SOURCES = [
+    Source("wav", Path("beats/wav"), PRIVATE_BUCKET, "wav/", ".wav"),
+    Source("mp3", Path("beats/mp3"), PUBLIC_BUCKET, "beats/mp3/", ".mp3"),
+    Source("covers", Path("images/covers"), PUBLIC_BUCKET, "images/covers/", ".webp",
+           recursive=True, skip_dirs=("unused", "unused_copy")),
+]
+
+
+def iter_source_files(source: Source, assets_dir: Path = ASSETS_DIR) -> Iterator[Tuple[str, os.stat_result]]:
+    """(key relative to the source dir, stat) for every matching local file."""
+    root = assets_dir / source.local_dir
+    if not root.exists():
+        return
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if source.recursive and entry.name not in source.skip_dirs:
+                        stack.append(Path(entry.path))
+                elif entry.name.lower().endswith(source.suffix) and entry.is_file():
+                    yield Path(entry.path).relative_to(root).as_posix(), entry.stat()
+
+
+def md5_file(path: Path) -> str:
+    """MD5 (what S3/R2 report as the ETag of a single-part upload) via mmap."""
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h.update(mm)
+    return h.hexdigest()
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict[str, Dict[str, Dict[str, object]]]:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text())
+    return data.get("sources", {}) if data.get("version") == MANIFEST_VERSION else {}
+
+
+def build_manifest(workers: int = 0, assets_dir: Path = ASSETS_DIR,
+                   manifest_path: Path = MANIFEST_PATH) -> Tuple[Dict[str, Dict[str, Dict[str, object]]], Dict[str, int]]:
+    """
+    {source: {key: {size, mtime_ns, md5}}}, hashing only files whose
+    (size, mtime) changed since the previous manifest. Returns (manifest, stats).
+    """
+    previous = load_manifest(manifest_path)
+    manifest: Dict[str, Dict[str, Dict[str, object]]] = {}
+    todo: List[Tuple[str, str, Path, os.stat_result]] = []
+    stats = {"files": 0, "hashed": 0, "reused": 0, "bytes_hashed": 0}
+
+    for source in SOURCES:
+        entries: Dict[str, Dict[str, object]] = {}
+        old = previous.get(source.name, {})
+        for key, st in iter_source_files(source, assets_dir):
+            stats["files"] += 1
+            cached = old.get(key)
+            if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+                entries[key] = cached
+                stats["reused"] += 1
+            else:
+                todo.append((source.name, key, assets_dir / source.local_dir / key, st))
+        manifest[source.name] = entries
+
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (source_name, key, path, st), digest in zip(todo, executor.map(lambda t: md5_file(t[2]), todo)):
+            manifest[source_name][key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "md5": digest}
+            stats["hashed"] += 1
+            stats["bytes_hashed"] += st.st_size
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({
+        "version": MANIFEST_VERSION,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "sources": {name: dict(sorted(entries.items())) for name, entries in manifest.items()},
+    }))
+    os.replace(tmp, manifest_path)
+    return manifest, stats
+
+
+# ---------------------------------------------------------------------------
+# Remote listings
+# ---------------------------------------------------------------------------
+
+def remote_cache_path(source: Source) -> Path:
+    return CACHE_DIR / f"media-remote-{source.bucket}-{source.name}.json"
+
+
+def list_remote(source: Source, endpoint_url: Optional[str]) -> Dict[str, Dict[str, object]]:
+    """{key relative to the source prefix: {size, etag}} straight from the bucket."""
+    try:
+        import boto3  # type: ignore
+    except ImportError as e:
+        raise SystemExit("boto3 is required to list buckets (pip3 install boto3), "
+                         "or run without --refresh-remote to use the cached listing.") from e
+
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        aws_access_key_id=os.environ.get("R2_ACCESS_KEY_ID") or None,
+        aws_secret_access_key=os.environ.get("R2_SECRET_ACCESS_KEY") or None,
+        region_name=os.environ.get("AWS_REGION", "auto"),
+    )
+    objects: Dict[str, Dict[str, object]] = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=source.bucket, Prefix=source.prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"][len(source.prefix):]
+            if not key.lower().endswith(source.suffix):
+                continue
+            if source.recursive and key.split("/", 1)[0] in source.skip_dirs:
+                continue
+            if not source.recursive and "/" in key:
+                continue
+            objects[key] = {"size": obj["Size"], "etag": obj["ETag"].strip('"')}
+    return objects
+
+
+def remote_listing(source: Source, endpoint_url: Optional[str], refresh: bool,
+                   max_age: int = DEFAULT_REMOTE_MAX_AGE) -> Tuple[Dict[str, Dict[str, object]], float]:
+    """Cached listing unless it's older than max_age (or refresh). Returns (objects, age seconds)."""
+    path = remote_cache_path(source)
+    if not refresh and path.exists():
+        cached = json.loads(path.read_text())
+        age = time.time() - cached["fetched_at"]
+        if age <= max_age or not endpoint_url:
+            return cached["objects"], age
+    if not endpoint_url:
+        raise SystemExit(f"No cached listing for {source.bucket}/{source.prefix}; "
+                         "set R2_ENDPOINT or pass --endpoint-url.")
+    objects = list_remote(source, endpoint_url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"fetched_at": time.time(), "bucket": source.bucket,
+                                "prefix": source.prefix, "objects": objects}))
+    return objects, 0.0
+
+
+def diff_source(local: Dict[str, Dict[str, object]], remote: Dict[str, Dict[str, object]]) -> Dict[str, List[str]]:
+    missing = sorted(set(local) - set(remote))
+    orphaned = sorted(set(remote) - set(local))
+    stale = []
+    for key in sorted(set(local) & set(remote)):
+        etag = str(remote[key].get("etag", ""))
+        if "-" in etag or not etag:
+            # Multipart upload: the ETag isn't an MD5 of the content, so compare sizes.
+            if remote[key]["size"] != local[key]["size"]:
+                stale.append(key)
+        elif etag != local[key]["md5"]:
+            stale.append(key)
+    return {"missing": missing, "stale": stale, "orphaned": orphaned}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Hash local media and diff it against the R2 buckets.")
+    ap.add_argument("--workers", "-j", type=int, default=0, help="Hashing threads (0 = 4 per CPU, max 32).")
+    ap.add_argument("--diff", action="store_true", help="Diff the manifest against the remote listings.")
+    ap.add_argument("--refresh-remote", action="store_true", help="Re-list buckets instead of using the cache.")
+    ap.add_argument("--max-remote-age", type=int, default=DEFAULT_REMOTE_MAX_AGE,
+                    help="Re-list when the cached listing is older than this many seconds.")
+    ap.add_argument("--endpoint-url", default=os.environ.get("R2_ENDPOINT"),
+                    help="S3-compatible endpoint (default: $R2_ENDPOINT).")
+    ap.add_argument("--source", action="append", choices=[s.name for s in SOURCES],
+                    help="Only diff these sources (repeatable; default: all).")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    manifest, stats = build_manifest(args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"Manifest: {stats['files']} files ({stats['reused']} unchanged, {stats['hashed']} hashed, "
+          f"{stats['bytes_hashed'] / 1024 / 1024:.1f} MB read) in {elapsed:.2f}s -> {MANIFEST_PATH}")
+
+    if not args.diff:
+        return
+
+    report: Dict[str, object] = {"generated_at": datetime.now(timezone.utc).isoformat(), "sources": {}}
+    for source in SOURCES:
+        if args.source and source.name not in args.source:
+            continue
+        if not source.bucket:
+            print(f"{source.name}: skipped (set R2_PRIVATE_BUCKET_NAME to diff the private bucket)")
+            continue
+        remote, age = remote_listing(source, args.endpoint_url, args.refresh_remote, args.max_remote_age)
+        diff = diff_source(manifest.get(source.name, {}), remote)
+        report["sources"][source.name] = {
+            "bucket": source.bucket, "prefix": source.prefix,
+            "local": len(manifest.get(source.name, {})), "remote": len(remote),
+            "listing_age_seconds": round(age, 1), **diff,
+        }
+        print(f"{source.name}: {len(manifest.get(source.name, {}))} local / {len(remote)} remote "
+              f"(s3://{source.bucket}/{source.prefix}, listing {age:.0f}s old) -> "
+              f"missing {len(diff['missing'])}, stale {len(diff['stale'])}, orphaned {len(diff['orphaned'])}")
+        for kind in ("missing", "stale", "orphaned"):
+            for key in diff[kind][:5]:
+                print(f"  {kind}: {key}")
+
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REPORT_PATH.write_text(json.dumps(report, indent=2))
+    print(f"Wrote diff: {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
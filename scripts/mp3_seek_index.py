@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Time -> byte-offset seek index sidecars for the beat MP3s.
+
+Scrubbing the WaveSurfer waveform on a 320k MP3 makes the browser estimate
+byte offsets (or read ahead) unless it knows where each second starts. This
+walks the MPEG frame headers once (no decoding) and writes, per MP3,
+
+    server/public/assets/beats/seek/<basename>.seek.json
+
+with the byte offset of the first frame at or after every INTERVAL seconds,
+so the player or a range-request proxy can turn a seek into one small
+Range: bytes=<offset>- request.
+
+Sidecar fields:
+- interval:    seconds between entries (1.0 by default)
+- offsets:     delta-encoded byte offsets ([first, gap, gap, ...]); entry k is t = k * interval
+- audio_start: offset of the first audio frame (after ID3v2 and the Xing/Info frame)
+- duration, sample_rate, bytes, frames
+- xing:        whether the file carries a Xing/Info header with a TOC (wav_to_mp3
+               asks ffmpeg for one; the sidecar is the finer-grained index)
+
+process_new_beats.py --apply writes the sidecar for every new MP3. Run this
+script directly to backfill the existing catalog.
+
+Usage:
+  python3 scripts/mp3_seek_index.py                  # every mp3 in beats/mp3 missing a sidecar
+  python3 scripts/mp3_seek_index.py --force          # rebuild all
+  python3 scripts/mp3_seek_index.py path/to/file.mp3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+MP3_DIR = Path("server/public/assets/beats/mp3")
+SEEK_DIR = Path("server/public/assets/beats/seek")
+SEEK_SUFFIX = ".seek.json"
+FORMAT_VERSION = 1
+DEFAULT_INTERVAL = 1.0
+
+# kbps by [version is MPEG1][layer]; index 0 is "free", 15 is invalid.
+BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by version bits (0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1).
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+XING_TOC_FLAG = 0x4
+
+
+def parse_frame_header(data: bytes, pos: int) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (frame_length, samples_per_frame, sample_rate, side_info_len) for a frame at pos,
+    or None if there is no valid header there.
+    """
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version_bits = (b1 >> 3) & 3
+    layer = 4 - ((b1 >> 1) & 3)  # 1, 2 or 3 (bits 00 -> 4 = reserved)
+    bitrate_idx = b2 >> 4
+    rate_idx = (b2 >> 2) & 3
+    if version_bits == 1 or layer == 4 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    mpeg1 = version_bits == 3
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_idx] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][rate_idx]
+    padding = (b2 >> 1) & 1
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, 0
+    if layer == 2:
+        return 144 * bitrate // sample_rate + padding, 1152, sample_rate, 0
+    mono = (b3 >> 6) == 3
+    if mpeg1:
+        return 144 * bitrate // sample_rate + padding, 1152, sample_rate, 17 if mono else 32
+    return 72 * bitrate // sample_rate + padding, 576, sample_rate, 9 if mono else 17
+
+
+def id3v2_size(data: bytes) -> int:
+    """Length of a leading ID3v2 tag (0 if none)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def read_xing(data: bytes, pos: int, side_info_len: int) -> Optional[Dict[str, object]]:
+    """Xing/Info tag in the frame at pos: {'frames', 'toc'} or None."""
+    tag = pos + 4 + side_info_len
+    if data[tag:tag + 4] not in (b"Xing", b"Info"):
+        return None
+    flags = struct.unpack(">I", data[tag + 4:tag + 8])[0]
+    frames = struct.unpack(">I", data[tag + 8:tag + 12])[0] if flags & 0x1 else None
+    return {"frames": frames, "toc": bool(flags & XING_TOC_FLAG)}
+
+
+def build_seek_index(data: bytes, interval: float = DEFAULT_INTERVAL) -> Dict[str, object]:
+    """Walk the frame headers of an MP3 held in memory and build its sidecar dict."""
+    pos = id3v2_size(data)
+    offsets: List[int] = []
+    xing: Optional[Dict[str, object]] = None
+    audio_start: Optional[int] = None
+    samples = 0
+    sample_rate = 0
+    frames = 0
+    next_mark = 0.0
+
+    while pos + 4 <= len(data):
+        header = parse_frame_header(data, pos)
+        if header is None:
+            # Resync: junk between frames, or a trailing ID3v1/APE tag.
+            pos = data.find(b"\xff", pos + 1)
+            if pos < 0:
+                break
+            continue
+        length, spf, rate, side_info_len = header
+        if audio_start is None:
+            audio_start = pos
+            xing = read_xing(data, pos, side_info_len)
+            if xing is not None:
+                # The Info frame holds no audio; the stream starts after it.
+                pos += length
+                audio_start = pos
+                continue
+        sample_rate = rate
+        t = samples / rate
+        while t >= next_mark:
+            offsets.append(pos)
+            next_mark = len(offsets) * interval
+        samples += spf
+        frames += 1
+        pos += length
+
+    deltas = [o if i == 0 else o - offsets[i - 1] for i, o in enumerate(offsets)]
+    return {
+        "format": FORMAT_VERSION,
+        "interval": interval,
+        "duration": round(samples / sample_rate, 3) if sample_rate else 0.0,
+        "sample_rate": sample_rate,
+        "bytes": len(data),
+        "frames": frames,
+        "audio_start": audio_start or 0,
+        "xing": {"present": xing is not None, "toc": bool(xing and xing["toc"])},
+        "offsets": deltas,
+    }
+
+
+def seek_path_for(mp3_path: Path, seek_dir: Path = SEEK_DIR) -> Path:
+    return seek_dir / f"{mp3_path.stem}{SEEK_SUFFIX}"
+
+
+def write_seek_index(mp3_path: Path, seek_dir: Path = SEEK_DIR, interval: float = DEFAULT_INTERVAL) -> Dict[str, object]:
+    index = build_seek_index(mp3_path.read_bytes(), interval)
+    index["mp3"] = mp3_path.name
+    seek_dir.mkdir(parents=True, exist_ok=True)
+    seek_path_for(mp3_path, seek_dir).write_text(json.dumps(index, separators=(",", ":")))
+    return index
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Write time->byte seek index sidecars for beat MP3s.")
+    ap.add_argument("mp3s", nargs="*", type=Path, help=f"MP3 files (default: every mp3 in {MP3_DIR}).")
+    ap.add_argument("--out", type=Path, default=SEEK_DIR)
+    ap.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between index entries.")
+    ap.add_argument("--force", action="store_true", help="Rebuild sidecars that already exist.")
+    args = ap.parse_args()
+
+    mp3s = args.mp3s or sorted(MP3_DIR.glob("*.mp3"))
+    written = skipped = no_toc = 0
+    for mp3 in mp3s:
+        if not args.force and seek_path_for(mp3, args.out).exists():
+            skipped += 1
+            continue
+        index = write_seek_index(mp3, args.out, args.interval)
+        written += 1
+        if not index["xing"]["toc"]:
+            no_toc += 1
+    print(f"Seek indexes: {written} written, {skipped} up to date -> {args.out}")
+    if no_toc:
+        print(f"WARNING: {no_toc} MP3s have no Xing/Info TOC; re-encode with process_new_beats.py for browser seeking")
+
+
+if __name__ == "__main__":
+    main()
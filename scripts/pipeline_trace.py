@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Span / counter telemetry for the beat and cover pipelines (--trace).
+
+Per-file timings say how long each file took, not where a concurrent run is
+starved. With tracing enabled, every stage of every item records a span
+(stage, item, worker, start, end) and the schedulers sample their queue
+depths as counters. At the end of the run this produces:
+
+- a Chrome trace (chrome://tracing or https://ui.perfetto.dev): one track per
+  worker process/thread, with the queue depths drawn as counter tracks
+- a summary (<trace>.summary.json and printed): per-worker busy / idle time
+  and utilization, per-stage totals and how much of the wall clock each stage
+  was active, queue depth stats, and the critical path: the chain of spans
+  (linked by item, by worker, or across a stage barrier) that ends last,
+  attributed to stages. The stage with the largest share of the critical
+  path is the one limiting throughput on this machine.
+
+Tracing is off unless enable() is called. The setting travels to worker
+processes through PIPELINE_TRACE_DIR; each process appends to its own
+events-<host>-<pid>.jsonl there, so nothing is sent between processes and a
+disabled span() costs one environment lookup. Timestamps are wall clock
+(time.time()), so files from several processes line up on one timeline.
+
+Used by process_new_beats.py and server/src/db/find-{artist-mismatches,
+near-duplicates}.py; those import it from scripts/.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ENV_VAR = "PIPELINE_TRACE_DIR"
+WAIT_STAGE = "(wait)"
+
+_local: Dict[str, Any] = {"pid": None, "file": None, "lock": threading.Lock()}
+
+
+def enable(trace_path: Path) -> Path:
+    """Start a fresh event directory next to trace_path and turn tracing on (inherited by child processes)."""
+    events_dir = events_dir_for(trace_path)
+    if events_dir.exists():
+        shutil.rmtree(events_dir)
+    events_dir.mkdir(parents=True)
+    os.environ[ENV_VAR] = str(events_dir.resolve())
+    return events_dir
+
+
+def events_dir_for(trace_path: Path) -> Path:
+    return Path(trace_path).with_suffix(".events")
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(ENV_VAR))
+
+
+def _worker() -> Tuple[int, int, str]:
+    thread = threading.current_thread()
+    label = f"{socket.gethostname()}:{os.getpid()}"
+    if thread is not threading.main_thread():
+        label += f"/{thread.name}"
+    return os.getpid(), threading.get_native_id(), label
+
+
+def _emit(event: Dict[str, Any]) -> None:
+    events_dir = os.environ.get(ENV_VAR)
+    if not events_dir:
+        return
+    with _local["lock"]:
+        # Reopen after fork: the parent's handle must not be shared.
+        if _local["pid"] != os.getpid():
+            path = Path(events_dir) / f"events-{socket.gethostname()}-{os.getpid()}.jsonl"
+            _local["file"] = open(path, "a", buffering=1)
+            _local["pid"] = os.getpid()
+        _local["file"].write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+@contextmanager
+def span(stage: str, item: str = "", **args: Any) -> Iterator[None]:
+    """Record [start, end) of one stage for one item on the current worker."""
+    if not enabled():
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        record(stage, start, time.time(), item, **args)
+
+
+def record(stage: str, start: float, end: float, item: str = "", **args: Any) -> None:
+    if not enabled():
+        return
+    pid, tid, label = _worker()
+    event = {"ph": "X", "name": stage, "item": item, "ts": start, "dur": end - start,
+             "pid": pid, "tid": tid, "worker": label}
+    if args:
+        event["args"] = args
+    _emit(event)
+
+
+def counter(name: str, value: float) -> None:
+    """Sample a gauge such as a queue depth."""
+    if not enabled():
+        return
+    pid, _tid, _label = _worker()
+    _emit({"ph": "C", "name": name, "ts": time.time(), "value": value, "pid": pid})
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def load_events(events_dir: Path) -> List[Dict[str, Any]]:
+    events = []
+    for path in sorted(Path(events_dir).glob("events-*.jsonl")):
+        with open(path) as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    events.sort(key=lambda e: e["ts"])
+    return events
+
+
+def to_chrome(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Chrome trace event format: microseconds since the first event."""
+    t0 = events[0]["ts"] if events else 0.0
+    out: List[Dict[str, Any]] = []
+    named = set()
+    for e in events:
+        ts = round((e["ts"] - t0) * 1e6, 1)
+        if e["ph"] == "X":
+            if (e["pid"], e["tid"]) not in named:
+                named.add((e["pid"], e["tid"]))
+                out.append({"ph": "M", "name": "thread_name", "pid": e["pid"], "tid": e["tid"],
+                            "args": {"name": e["worker"]}})
+            out.append({"ph": "X", "name": e["name"], "cat": "stage", "ts": ts,
+                        "dur": round(e["dur"] * 1e6, 1), "pid": e["pid"], "tid": e["tid"],
+                        "args": {"item": e["item"], **e.get("args", {})}})
+        elif e["ph"] == "C":
+            out.append({"ph": "C", "name": e["name"], "ts": ts, "pid": e["pid"],
+                        "args": {e["name"]: e["value"]}})
+    return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+
+def _union(intervals: List[Tuple[float, float]]) -> float:
+    total = 0.0
+    end = float("-inf")
+    for s, e in sorted(intervals):
+        if e <= end:
+            continue
+        total += e - max(s, end)
+        end = e
+    return total
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> Tuple[float, Dict[str, float]]:
+    """
+    Walk back from the span that ends last, each step to the latest-ending span
+    that had to finish first: the previous stage of the same item, or the
+    previous span on the same worker. If that leaves a gap, the span was
+    waiting on something else (e.g. a stage barrier), so the walk continues
+    from whatever span finished last before it started. Time when nothing at
+    all was running becomes WAIT_STAGE.
+    """
+    if not spans:
+        return 0.0, {}
+    t0 = min(s["ts"] for s in spans)
+    # Per item / per worker: spans sorted by end time, for bisecting.
+    chains: Dict[Tuple[str, str], Tuple[List[float], List[Dict[str, Any]]]] = {}
+    for s in sorted(spans, key=lambda s: s["ts"] + s["dur"]):
+        for key in (("item", s["item"]), ("worker", s["worker"]), ("all", "*")):
+            if key[1] == "":
+                continue
+            ends, members = chains.setdefault(key, ([], []))
+            ends.append(s["ts"] + s["dur"])
+            members.append(s)
+
+    by_stage: Dict[str, float] = {}
+    cur = max(spans, key=lambda s: s["ts"] + s["dur"])
+    length = cur["ts"] + cur["dur"] - t0
+    eps = 1e-6
+    while cur is not None:
+        by_stage[cur["name"]] = by_stage.get(cur["name"], 0.0) + cur["dur"]
+        pred = None
+        for key in (("item", cur["item"]), ("worker", cur["worker"]), ("all", "*")):
+            if key not in chains or (key[0] == "all" and pred is not None
+                                     and cur["ts"] - (pred["ts"] + pred["dur"]) <= eps):
+                continue
+            ends, members = chains[key]
+            i = bisect.bisect_right(ends, cur["ts"] + eps) - 1
+            while i >= 0 and members[i] is cur:
+                i -= 1
+            if i >= 0 and (pred is None or ends[i] > pred["ts"] + pred["dur"]):
+                pred = members[i]
+        gap_start = pred["ts"] + pred["dur"] if pred is not None else t0
+        gap = max(0.0, cur["ts"] - gap_start)
+        if gap > eps:
+            by_stage[WAIT_STAGE] = by_stage.get(WAIT_STAGE, 0.0) + gap
+        cur = pred
+    return length, by_stage
+
+
+def summarize(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    spans = [e for e in events if e["ph"] == "X"]
+    if not spans:
+        return {"wall_seconds": 0.0, "workers": {}, "stages": {}, "counters": {}, "critical_path": {}}
+    t0 = min(s["ts"] for s in spans)
+    wall = max(s["ts"] + s["dur"] for s in spans) - t0
+
+    workers: Dict[str, Dict[str, Any]] = {}
+    for label in sorted({s["worker"] for s in spans}):
+        mine = [s for s in spans if s["worker"] == label]
+        busy = _union([(s["ts"], s["ts"] + s["dur"]) for s in mine])
+        workers[label] = {
+            "spans": len(mine),
+            "busy_seconds": round(busy, 3),
+            "idle_seconds": round(wall - busy, 3),
+            "utilization": round(busy / wall, 3) if wall else 0.0,
+        }
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    for name in sorted({s["name"] for s in spans}):
+        mine = [s for s in spans if s["name"] == name]
+        durs = sorted(s["dur"] for s in mine)
+        active = _union([(s["ts"], s["ts"] + s["dur"]) for s in mine])
+        stages[name] = {
+            "count": len(mine),
+            "total_seconds": round(sum(durs), 3),
+            "mean_seconds": round(sum(durs) / len(durs), 4),
+            "max_seconds": round(durs[-1], 4),
+            "active_share": round(active / wall, 3) if wall else 0.0,
+        }
+
+    counters: Dict[str, Dict[str, Any]] = {}
+    for name in sorted({e["name"] for e in events if e["ph"] == "C"}):
+        values = [e["value"] for e in events if e["ph"] == "C" and e["name"] == name]
+        counters[name] = {"samples": len(values), "max": max(values), "mean": round(sum(values) / len(values), 2)}
+
+    length, by_stage = critical_path(spans)
+    stage_only = {k: v for k, v in by_stage.items() if k != WAIT_STAGE}
+    return {
+        "wall_seconds": round(wall, 3),
+        "workers": workers,
+        "mean_utilization": round(sum(w["utilization"] for w in workers.values()) / len(workers), 3),
+        "stages": stages,
+        "counters": counters,
+        "critical_path": {
+            "seconds": round(length, 3),
+            "by_stage": {k: round(v, 3) for k, v in sorted(by_stage.items(), key=lambda kv: -kv[1])},
+            "bottleneck": max(stage_only, key=stage_only.get) if stage_only else None,
+        },
+    }
+
+
+def finish(trace_path: Path, keep_events: bool = False) -> Optional[Dict[str, Any]]:
+    """Write the Chrome trace + summary for an enable()d run, print the summary, return it."""
+    events_dir = events_dir_for(trace_path)
+    if not events_dir.exists():
+        return None
+    events = load_events(events_dir)
+    trace_path = Path(trace_path)
+    trace_path.parent.mkdir(parents=True, exist_ok=True)
+    trace_path.write_text(json.dumps(to_chrome(events), separators=(",", ":")))
+    summary = summarize(events)
+    summary_path = trace_path.with_suffix(".summary.json")
+    summary_path.write_text(json.dumps(summary, indent=2))
+    if not keep_events:
+        shutil.rmtree(events_dir)
+    os.environ.pop(ENV_VAR, None)
+
+    print(f"Trace: {trace_path} (open in https://ui.perfetto.dev) | summary: {summary_path}")
+    print(f"  wall {summary['wall_seconds']:.2f}s, {len(summary['workers'])} workers, "
+          f"mean utilization {summary.get('mean_utilization', 0.0):.0%}")
+    for name, st in summary["stages"].items():
+        print(f"  {name:<16} {st['count']:>5}x  total {st['total_seconds']:>8.2f}s  "
+              f"mean {st['mean_seconds']:.3f}s  active {st['active_share']:.0%} of wall")
+    for name, st in summary["counters"].items():
+        print(f"  {name:<16} depth max {st['max']:g}, mean {st['mean']:g}")
+    cp = summary["critical_path"]
+    if cp:
+        parts = ", ".join(f"{k} {v:.2f}s" for k, v in cp["by_stage"].items())
+        print(f"  critical path {cp['seconds']:.2f}s: {parts}")
+        print(f"  bottleneck: {cp['bottleneck']}")
+    return summary
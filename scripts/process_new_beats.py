@@ -3,9 +3,42 @@
 Process beat masters in server/public/assets/beats/new:
 
 - Detect BPM (approx) + musical key (approx) from WAV audio
-- Convert WAV -> MP3 (320k)
+- Convert WAV -> MP3 (320k, Xing/Info header with seek TOC) and write a
+  time -> byte offset seek sidecar per MP3 (mp3_seek_index.py)
+- Pick a representative bar-aligned "hook" segment and render a short,
+  faded, low-bitrate preview MP3 next to the full one
+- Measure EBU R128 loudness / true peak in the same decode (loudness.py) and
+  encode previews with a precomputed gain to a common loudness
+  (--normalize-mp3 does the same for the full MP3s)
 - Propose standardized filenames: artist__beatname_key_bpm.{wav,mp3}
 - Optionally apply: write into server/public/assets/beats/{wav,mp3}
+  and append the new beats to the static search index (build_search_index.py)
+- --audit: re-analyze the existing beats/wav catalog and rank files whose
+  filename key/BPM disagree with detection (docs/audits/catalog_audit.json)
+
+Analysis runs on a memory-aware worker pool (analysis_scheduler.py): up to
+--workers processes, admitted only while --memory-budget allows, judged from
+each WAV header and live worker RSS. Results are cached by WAV content hash in
+.cache/beat-analysis.sqlite, so a dry run followed by --apply, or a repeated
+audit, only analyzes new or changed audio.
+
+New beats are also merged into the "similar beats" neighbor table
+(beat_similarity.py); --backfill-similar rebuilds it for the whole catalog.
+
+--reconcile / --reconcile-catalog match plans against the catalog by content
+hash and rename existing assets instead of re-encoding them when only the
+derived name changed (reconcile_assets.py).
+
+--trace PATH records every stage (hash, decode, loudness, analysis, encode,
+...) per file and worker, plus queue depths, and writes a Chrome/Perfetto
+trace with a utilization / critical-path summary (pipeline_trace.py).
+
+--queue PATH lets several processes or hosts (run from the repo root on a
+shared volume) drain beats/new together through a SQLite claim queue
+(work_queue.py). The last worker to finish merges every result of the round
+into a single plan, runs the collision check and, with --apply, writes the
+files. Rerunning against the same queue file starts a new round that reuses
+the results of files already analyzed (e.g. a dry run, then --apply).
 
 Notes:
 - Key/BPM detection is heuristic; review the dry-run report before applying.
@@ -14,21 +47,61 @@ Notes:
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import math
 import os
 import re
 import shutil
+import sqlite3
 import subprocess
+import time
 import unicodedata
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+from analysis_scheduler import MB, Job, MemoryAwareScheduler, estimate_job_bytes
+from beat_similarity import CONTRAST_BANDS, FEATURE_DIM, audio_path_for, rebuild_similar, rename_similar, update_similar
+from build_search_index import FILENAME_RE, INDEX_DIR, rebuild_index, update_index
+from loudness import measure_loudness, normalization_gain
+from media_manifest import build_manifest
+from mp3_seek_index import seek_path_for, write_seek_index
+from pipeline_trace import counter, span
+from pipeline_trace import enable as enable_trace, enabled as trace_enabled, finish as finish_trace
+from reconcile_assets import PLAN_PATH, R2_SCRIPT_PATH, SQL_PATH, Reconciliation, reconcile, rename_local, write_reports
+from work_queue import CLAIMED, PENDING, Heartbeat, WorkQueue, default_worker_id
+
 
 NEW_DIR = Path("server/public/assets/beats/new")
 OUT_WAV_DIR = Path("server/public/assets/beats/wav")
 OUT_MP3_DIR = Path("server/public/assets/beats/mp3")
+OUT_PREVIEW_DIR = Path("server/public/assets/beats/preview")
+
+# Preview clips: ~25s snapped to whole 4-bar phrases, faded, low bitrate.
+PREVIEW_TARGET_SECONDS = 25.0
+PREVIEW_FADE_IN_SECONDS = 0.5
+PREVIEW_FADE_OUT_SECONDS = 2.0
+PREVIEW_BITRATE = "96k"
+BEATS_PER_BAR = 4
+
+# Loudness normalization (EBU R128 measured in analyze_audio, applied as a plain
+# gain at encode time): previews always, full MP3s with --normalize-mp3.
+LOUDNESS_TARGET_LUFS = -14.0
+TRUE_PEAK_CEILING_DBTP = -1.0
+
+ANALYSIS_CACHE_PATH = Path(".cache/beat-analysis.sqlite")
+# Bump whenever analyze_audio() output changes so stale cache rows are ignored.
+ANALYSIS_VERSION = 3
+
+# Audit tolerances: BPM within this many beats counts as a match (also at
+# half/double time); a relative major/minor swap is reported but ranked low.
+AUDIT_BPM_TOLERANCE = 2
+AUDIT_RELATIVE_KEY_PENALTY = 0.25
+AUDIT_HALF_DOUBLE_PENALTY = 0.25
+
+# --queue: how often an idle worker re-checks for expired leases / finished peers.
+QUEUE_POLL_SECONDS = 5
 
 
 def _strip_accents(s: str) -> str:
@@ -174,20 +247,129 @@ def _require_ffmpeg() -> None:
         raise SystemExit("ffmpeg not found. Install ffmpeg (brew install ffmpeg) and retry.") from e
 
 
-def detect_bpm_and_key(wav_path: Path) -> Tuple[int, str]:
+@dataclass
+class AudioAnalysis:
+    bpm: int
+    key: str
+    duration: float
+    # Representative segment for the preview clip, in seconds of the source file.
+    preview_start: float
+    preview_duration: float
+    # EBU R128 integrated loudness (LUFS), loudness range (LU) and true peak (dBTP).
+    loudness_lufs: float
+    loudness_range_lu: float
+    true_peak_dbtp: float
+    # Similarity descriptor, laid out as beat_similarity.FEATURE_NAMES.
+    features: List[float] = field(default_factory=list)
+
+
+def select_preview_window(
+    onset_env,
+    rms,
+    chroma,
+    bpm: int,
+    frame_seconds: float,
+    offset_seconds: float,
+    duration: float,
+    target_seconds: float = PREVIEW_TARGET_SECONDS,
+) -> Tuple[float, float]:
+    """
+    Choose the most representative ~target_seconds window, snapped to bars.
+
+    Candidates start on every bar line of a grid anchored at the strongest
+    onset of the first bar (a cheap downbeat guess). Each is scored on
+    loudness (RMS), rhythmic activity (onset strength) and how close its
+    chroma is to the whole track's; the three are z-scored and summed, so the
+    window that is loud, busy and harmonically typical (the hook) wins.
+    Window means come from cumulative sums, so scoring every bar is O(frames).
+
+    Returns (start, length) in seconds of the source file.
+    """
+    import numpy as np  # type: ignore
+
+    n = min(len(onset_env), len(rms), chroma.shape[1])
+    if n == 0 or bpm <= 0:
+        length = min(target_seconds, duration)
+        return 0.0, length
+
+    bar = BEATS_PER_BAR * 60.0 / bpm
+    phrase_bars = BEATS_PER_BAR * max(1, int(round(target_seconds / bar / BEATS_PER_BAR)))
+    length = phrase_bars * bar
+    analysed = n * frame_seconds
+    if length >= analysed:
+        return offset_seconds, min(length, duration - offset_seconds)
+
+    first_bar = max(1, int(bar / frame_seconds))
+    anchor = int(np.argmax(onset_env[:first_bar])) * frame_seconds
+    starts = np.arange(anchor, analysed - length + 1e-9, bar)
+    if starts.size == 0:
+        return offset_seconds, length
+
+    lo = np.clip((starts / frame_seconds).astype(int), 0, n - 1)
+    hi = np.clip(((starts + length) / frame_seconds).astype(int), lo + 1, n)
+    count = (hi - lo)
+
+    def window_means(x):
+        c = np.concatenate([[0.0], np.cumsum(x[:n], dtype=np.float64)])
+        return (c[hi] - c[lo]) / count
+
+    energy = window_means(rms)
+    activity = window_means(onset_env)
+
+    ch = chroma[:, :n].astype(np.float64)
+    cc = np.concatenate([np.zeros((ch.shape[0], 1)), np.cumsum(ch, axis=1)], axis=1)
+    win_chroma = (cc[:, hi] - cc[:, lo]) / count
+    track_chroma = ch.mean(axis=1)
+    typicality = (track_chroma @ win_chroma) / (
+        np.linalg.norm(win_chroma, axis=0) * np.linalg.norm(track_chroma) + 1e-9
+    )
+
+    def z(x):
+        return (x - x.mean()) / (x.std() + 1e-9)
+
+    best = int(np.argmax(z(energy) + z(activity) + z(typicality)))
+    return float(offset_seconds + starts[best]), float(length)
+
+
+def analyze_audio(wav_path: Path) -> AudioAnalysis:
     """
     Heuristic analysis:
     - BPM via librosa.beat.tempo (median)
     - Key via chroma profile correlation (Krumhansl-Schmuckler)
+    - Loudness / loudness range / true peak (loudness.py) from the native-rate
+      samples, before they are downmixed for everything else
+    - Preview window from the same onset / chroma frames plus RMS energy
+    - Similarity descriptor (beat_similarity.py) from the same frames plus
+      spectral shape statistics
     """
+    import librosa  # type: ignore
+
+    # One decode at the native rate/channels: loudness needs it as-is, the rest
+    # works on a 22.05 kHz mono copy (lighter + consistent).
+    with span("decode", wav_path.name):
+        native, native_sr = librosa.load(str(wav_path), sr=None, mono=False)
+    with span("loudness", wav_path.name):
+        loudness = measure_loudness(native, native_sr)
+    with span("resample", wav_path.name):
+        sr = 22050
+        y = librosa.resample(librosa.to_mono(native), orig_sr=native_sr, target_sr=sr)
+    del native
+    with span("analysis", wav_path.name):
+        return _analyze_mono(wav_path, y, sr, loudness)
+
+
+def _analyze_mono(wav_path: Path, y, sr: int, loudness) -> AudioAnalysis:
+    """Tempo, key, preview window and similarity features from the 22.05 kHz mono signal."""
     import numpy as np  # type: ignore
     import librosa  # type: ignore
 
-    y, sr = librosa.load(str(wav_path), sr=22050, mono=True)  # lighter + consistent
+    duration = float(y.size) / sr
     # trim silence to reduce tempo confusion
-    yt, _ = librosa.effects.trim(y, top_db=30)
+    yt, trim_index = librosa.effects.trim(y, top_db=30)
+    offset_seconds = float(trim_index[0]) / sr
     if yt.size < sr * 5:
         yt = y  # fallback
+        offset_seconds = 0.0
 
     # BPM
     onset_env = librosa.onset.onset_strength(y=yt, sr=sr)
@@ -245,12 +427,165 @@ def detect_bpm_and_key(wav_path: Path) -> Tuple[int, str]:
     else:
         key_str = "Unknown"
 
-    return bpm, key_str
+    # Preview window (onset_strength / rms / chroma_cqt share the default 512 hop)
+    hop = 512
+    rms = librosa.feature.rms(y=yt, hop_length=hop)[0]
+    preview_start, preview_duration = select_preview_window(
+        onset_env, rms, chroma, bpm, hop / sr, offset_seconds, duration
+    )
+
+    # Similarity descriptor: one magnitude STFT feeds all the spectral statistics.
+    S = np.abs(librosa.stft(yt, hop_length=hop))
+    centroid = librosa.feature.spectral_centroid(S=S, sr=sr)[0]
+    bandwidth = librosa.feature.spectral_bandwidth(S=S, sr=sr)[0]
+    rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr)[0]
+    contrast = librosa.feature.spectral_contrast(S=S, sr=sr, n_bands=CONTRAST_BANDS - 1)
+    zcr = librosa.feature.zero_crossing_rate(yt, hop_length=hop)[0]
+    features = np.concatenate([
+        chroma_mean,
+        [
+            math.log2(bpm) if bpm > 0 else 0.0,
+            float(onset_env.mean()),
+            float(rms.mean()),
+            float(rms.std()),
+            float(centroid.mean()) / sr,
+            float(centroid.std()) / sr,
+            float(bandwidth.mean()) / sr,
+            float(rolloff.mean()) / sr,
+            float(zcr.mean()),
+        ],
+        contrast.mean(axis=1),
+    ])
+
+    return AudioAnalysis(
+        bpm=bpm,
+        key=key_str,
+        duration=duration,
+        preview_start=preview_start,
+        preview_duration=preview_duration,
+        loudness_lufs=loudness.integrated,
+        loudness_range_lu=loudness.loudness_range,
+        true_peak_dbtp=loudness.true_peak,
+        features=[round(float(v), 6) for v in features],
+    )
+
+
+def detect_bpm_and_key(wav_path: Path) -> Tuple[int, str]:
+    analysis = analyze_audio(wav_path)
+    return analysis.bpm, analysis.key
+
+
+def file_sha1(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
 
-def wav_to_mp3(wav_path: Path, mp3_path: Path) -> None:
+class AnalysisCache:
+    """
+    SQLite cache of AudioAnalysis keyed by WAV content hash, so renamed or
+    copied masters (beats/new -> beats/wav) are never analyzed twice.
+    """
+
+    def __init__(self, path: Path = ANALYSIS_CACHE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=30)
+        # Rollback journal rather than WAL: --queue workers on other hosts may
+        # share this file over a network volume, where WAL's -shm index breaks.
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis ("
+            " content_hash TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[AudioAnalysis]:
+        row = self.conn.execute(
+            "SELECT data FROM analysis WHERE content_hash = ? AND version = ?", (key, ANALYSIS_VERSION)
+        ).fetchone()
+        return AudioAnalysis(**json.loads(row[0])) if row else None
+
+    def put(self, key: str, analysis: AudioAnalysis) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analysis (content_hash, version, data) VALUES (?, ?, ?)",
+            (key, ANALYSIS_VERSION, json.dumps(asdict(analysis))),
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def analyze_cached(wav_path: str, cache_path: Optional[str], key: str) -> AudioAnalysis:
+    """Scheduler worker: analyze one WAV and store the result under its content hash."""
+    analysis = analyze_audio(Path(wav_path))
+    if cache_path:
+        cache = AnalysisCache(Path(cache_path))
+        try:
+            cache.put(key, analysis)
+        finally:
+            cache.close()
+    return analysis
+
+
+def run_analysis(
+    wavs: List[Path], workers: int = 0, use_cache: bool = True, memory_budget_mb: int = 0
+) -> Tuple[Dict[str, AudioAnalysis], Dict[str, str]]:
+    """
+    Analyze WAVs in parallel. Returns ({path: analysis}, {path: error}).
+
+    Cache hits are resolved up front; misses run on the memory-aware scheduler
+    (analysis_scheduler.py), which sizes concurrency to --memory-budget.
+    """
+    results: Dict[str, AudioAnalysis] = {}
+    errors: Dict[str, str] = {}
+    jobs: List[Job] = []
+    cache = AnalysisCache(ANALYSIS_CACHE_PATH) if use_cache else None
+    try:
+        for p in wavs:
+            with span("hash", p.name):
+                key = file_sha1(p) if cache else ""
+            analysis = cache.get(key) if cache else None
+            if analysis is not None:
+                results[str(p)] = analysis
+            else:
+                jobs.append(Job(key=str(p), args=(str(p), str(ANALYSIS_CACHE_PATH) if cache else None, key),
+                                estimate=estimate_job_bytes(p)))
+    finally:
+        if cache:
+            cache.close()
+    if not jobs:
+        return results, errors
+
+    print(f"Analyzing {len(jobs)} WAVs ({len(results)} cached)")
+    scheduler = MemoryAwareScheduler(analyze_cached, max_workers=workers, memory_budget=memory_budget_mb * MB)
+    done = 0
+
+    def progress(key: str, result: object, error: Optional[str]) -> None:
+        nonlocal done
+        done += 1
+        if done % 25 == 0 or done == len(jobs):
+            print(f"Analyzed {done}/{len(jobs)}")
+
+    fresh, errors = scheduler.run(jobs, on_result=progress)
+    results.update(fresh)
+    st = scheduler.stats
+    print(
+        f"Scheduler: budget {st.budget // MB} MB, peak committed {st.peak_committed // MB} MB, "
+        f"max concurrency {st.max_concurrency}/{scheduler.max_workers}, "
+        f"workers spawned {st.spawned} (retired {st.retired}, died {st.worker_deaths})"
+    )
+    return results, errors
+
+
+def wav_to_mp3(wav_path: Path, mp3_path: Path, gain_db: float = 0.0) -> None:
     _require_ffmpeg()
     mp3_path.parent.mkdir(parents=True, exist_ok=True)
+    gain = ["-af", f"volume={gain_db:.2f}dB"] if gain_db else []
     subprocess.run(
         [
             "ffmpeg",
@@ -258,6 +593,7 @@ def wav_to_mp3(wav_path: Path, mp3_path: Path) -> None:
             "-i",
             str(wav_path),
             "-vn",
+            *gain,
             "-ac",
             "2",
             "-ar",
@@ -266,6 +602,9 @@ def wav_to_mp3(wav_path: Path, mp3_path: Path) -> None:
             "libmp3lame",
             "-b:a",
             "320k",
+            # Xing/Info header with a seek TOC so browsers can map time -> byte offset.
+            "-write_xing",
+            "1",
             str(mp3_path),
         ],
         check=True,
@@ -274,6 +613,42 @@ def wav_to_mp3(wav_path: Path, mp3_path: Path) -> None:
     )
 
 
+def render_preview(wav_path: Path, preview_path: Path, start: float, length: float, gain_db: float = 0.0) -> None:
+    """Cut [start, start + length) from the WAV, apply gain, fade in/out, encode a small MP3."""
+    _require_ffmpeg()
+    preview_path.parent.mkdir(parents=True, exist_ok=True)
+    fade_out_start = max(0.0, length - PREVIEW_FADE_OUT_SECONDS)
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-ss",
+            f"{start:.3f}",
+            "-t",
+            f"{length:.3f}",
+            "-i",
+            str(wav_path),
+            "-vn",
+            "-af",
+            f"volume={gain_db:.2f}dB,"
+            f"afade=t=in:st=0:d={PREVIEW_FADE_IN_SECONDS},"
+            f"afade=t=out:st={fade_out_start:.3f}:d={PREVIEW_FADE_OUT_SECONDS}",
+            "-ac",
+            "2",
+            "-ar",
+            "44100",
+            "-codec:a",
+            "libmp3lame",
+            "-b:a",
+            PREVIEW_BITRATE,
+            str(preview_path),
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
 @dataclass
 class BeatPlan:
     source_wav: str
@@ -286,14 +661,30 @@ class BeatPlan:
     out_basename: str
     out_wav: str
     out_mp3: str
+    out_preview: str = ""
+    preview_start: float = 0.0
+    preview_duration: float = 0.0
+    loudness_lufs: float = 0.0
+    loudness_range_lu: float = 0.0
+    true_peak_dbtp: float = 0.0
+    # Gain to LOUDNESS_TARGET_LUFS, capped at TRUE_PEAK_CEILING_DBTP.
+    gain_db: float = 0.0
 
 
-def build_plan(wav_path: Path) -> BeatPlan:
+def build_plan(wav_path: Path, analysis: Optional[AudioAnalysis] = None) -> BeatPlan:
     stem = wav_path.stem
-    artist = infer_artist_slug(stem)
-    beat_display = extract_beat_display_name(stem)
-    beat_slug = slugify_beat_name(beat_display)
-    bpm, key = detect_bpm_and_key(wav_path)
+    m = FILENAME_RE.match(stem)
+    if m:
+        # Already a catalog name (--reconcile-catalog): keep artist/beat, re-derive key/BPM.
+        artist, beat_slug = m.group("artist"), m.group("beat")
+        beat_display = beat_slug.replace("_", " ").title()
+    else:
+        artist = infer_artist_slug(stem)
+        beat_display = extract_beat_display_name(stem)
+        beat_slug = slugify_beat_name(beat_display)
+    if analysis is None:
+        analysis = analyze_audio(wav_path)
+    bpm, key = analysis.bpm, analysis.key
     key_slug = key_to_slug(key)
     # bpm: if detection failed, keep 0 so it's obvious
     bpm_str = str(bpm if bpm > 0 else 0)
@@ -309,15 +700,327 @@ def build_plan(wav_path: Path) -> BeatPlan:
         out_basename=out_base,
         out_wav=str(OUT_WAV_DIR / f"{out_base}.wav"),
         out_mp3=str(OUT_MP3_DIR / f"{out_base}.mp3"),
+        out_preview=str(OUT_PREVIEW_DIR / f"{out_base}.mp3"),
+        preview_start=round(analysis.preview_start, 3),
+        preview_duration=round(analysis.preview_duration, 3),
+        loudness_lufs=analysis.loudness_lufs,
+        loudness_range_lu=analysis.loudness_range_lu,
+        true_peak_dbtp=analysis.true_peak_dbtp,
+        gain_db=normalization_gain(
+            analysis.loudness_lufs, analysis.true_peak_dbtp, LOUDNESS_TARGET_LUFS, TRUE_PEAK_CEILING_DBTP
+        ),
     )
 
 
+def key_pitch_class(key: str) -> Optional[Tuple[int, str]]:
+    """'C#min' / 'Csmin' / 'Dbmin' -> (1, 'min'); None if unparseable."""
+    m = re.match(r"^([A-G])(#|s|b)?\s*(maj|min)$", key.strip(), flags=re.IGNORECASE)
+    if not m:
+        return None
+    pc = PITCH_CLASSES.index(m.group(1).upper())
+    accidental = (m.group(2) or "").lower()
+    pc += 1 if accidental in ("#", "s") else (-1 if accidental == "b" else 0)
+    return pc % 12, m.group(3).lower()
+
+
+def compare_key(encoded: str, detected: str) -> str:
+    """'match', 'relative' (e.g. Amin vs Cmaj), 'mismatch' or 'unknown'."""
+    a, b = key_pitch_class(encoded), key_pitch_class(detected)
+    if a is None or b is None:
+        return "unknown"
+    if a == b:
+        return "match"
+    if a[1] != b[1]:
+        major, minor = (a, b) if a[1] == "maj" else (b, a)
+        if (minor[0] + 3) % 12 == major[0]:
+            return "relative"
+    return "mismatch"
+
+
+def compare_bpm(encoded: int, detected: int, tolerance: int = AUDIT_BPM_TOLERANCE) -> Tuple[str, float]:
+    """
+    ('match' | 'half_double' | 'mismatch' | 'unknown', relative error).
+    Half/double time is checked both ways since detection folds into 70-200.
+    """
+    if encoded <= 0 or detected <= 0:
+        return "unknown", 0.0
+    if abs(encoded - detected) <= tolerance:
+        return "match", abs(encoded - detected) / encoded
+    for candidate in (detected * 2, detected / 2):
+        if abs(encoded - candidate) <= tolerance:
+            return "half_double", abs(encoded - candidate) / encoded
+    err = min(abs(encoded - c) for c in (detected, detected * 2, detected / 2)) / encoded
+    return "mismatch", err
+
+
+def audit_entry(wav_path: Path, analysis: AudioAnalysis) -> Optional[Dict[str, object]]:
+    """Compare a catalog WAV's filename metadata with detection (None if the name doesn't parse)."""
+    m = FILENAME_RE.match(wav_path.stem)
+    if not m:
+        return None
+    encoded_bpm = int(m.group("bpm"))
+    key_status = compare_key(m.group("key"), analysis.key)
+    bpm_status, bpm_error = compare_bpm(encoded_bpm, analysis.bpm)
+
+    score = 0.0
+    if key_status == "mismatch":
+        score += 1.0
+    elif key_status == "relative":
+        score += AUDIT_RELATIVE_KEY_PENALTY
+    if bpm_status == "mismatch":
+        score += min(1.0, 0.25 + bpm_error * 5)
+    elif bpm_status == "half_double":
+        score += AUDIT_HALF_DOUBLE_PENALTY
+
+    return {
+        "file": str(wav_path),
+        "artist": m.group("artist"),
+        "encoded_key": m.group("key"),
+        "detected_key": key_to_slug(analysis.key),
+        "key_status": key_status,
+        "encoded_bpm": encoded_bpm,
+        "detected_bpm": analysis.bpm,
+        "bpm_status": bpm_status,
+        "score": round(score, 4),
+    }
+
+
+def run_audit(args: argparse.Namespace) -> None:
+    if not OUT_WAV_DIR.exists():
+        raise SystemExit(f"Missing directory: {OUT_WAV_DIR}")
+    wavs = sorted(p for p in OUT_WAV_DIR.iterdir() if p.is_file() and p.suffix.lower() == ".wav")
+    if args.limit and args.limit > 0:
+        wavs = wavs[: args.limit]
+
+    # No point analyzing files whose name carries no key/BPM to compare against.
+    unparsed = [str(p) for p in wavs if not FILENAME_RE.match(p.stem)]
+    wavs = [p for p in wavs if FILENAME_RE.match(p.stem)]
+
+    results, errors = run_analysis(wavs, args.workers, use_cache=not args.no_cache, memory_budget_mb=args.memory_budget)
+
+    entries = []
+    for p in wavs:
+        analysis = results.get(str(p))
+        if analysis is not None:
+            entries.append(audit_entry(p, analysis))
+    entries.sort(key=lambda e: (-e["score"], e["file"]))
+    flagged = [e for e in entries if e["score"] > 0]
+
+    def count(field: str, status: str) -> int:
+        return sum(1 for e in entries if e[field] == status)
+
+    summary = {
+        "audited": len(entries),
+        "flagged": len(flagged),
+        "key": {s: count("key_status", s) for s in ("match", "relative", "mismatch", "unknown")},
+        "bpm": {s: count("bpm_status", s) for s in ("match", "half_double", "mismatch", "unknown")},
+        "unparsed_filenames": unparsed,
+        "analysis_errors": errors,
+    }
+
+    report_dir = Path("docs/audits")
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_dir / "catalog_audit.json"
+    report_path.write_text(json.dumps({"summary": summary, "mismatches": flagged}, indent=2, ensure_ascii=False))
+
+    print(f"Audited WAVs: {len(entries)} (unparsed names: {len(unparsed)}, analysis errors: {len(errors)})")
+    print(f"Key: {summary['key']}")
+    print(f"BPM: {summary['bpm']}")
+    print(f"Flagged: {len(flagged)} -> {report_path}")
+    for e in flagged[:20]:
+        print(
+            f"- {Path(str(e['file'])).name}: key {e['encoded_key']} vs {e['detected_key']} ({e['key_status']}), "
+            f"bpm {e['encoded_bpm']} vs {e['detected_bpm']} ({e['bpm_status']}), score {e['score']}"
+        )
+
+
+def drain_queue(args: argparse.Namespace, wavs: List[Path]) -> Optional[Tuple[Dict[str, AudioAnalysis], Dict[str, str]]]:
+    """
+    Enqueue `wavs`, then claim and analyze batches until the queue is drained.
+    Returns the merged ({path: analysis}, {path: dead-letter error}) for the one
+    worker that wins finalize, None for every other worker.
+    """
+    queue = WorkQueue(Path(args.queue), lease_seconds=args.lease, max_attempts=args.max_attempts)
+    owner = default_worker_id()
+    try:
+        added = queue.enqueue(str(p) for p in wavs)
+        print(f"Queue {args.queue}: round {queue.round}, +{added} jobs (worker {owner})")
+        batch = args.workers or os.cpu_count() or 1
+
+        while True:
+            ids = queue.claim(owner, batch)
+            if trace_enabled():
+                counter("queue.pending", queue.counts()[PENDING])
+            if not ids:
+                counts = queue.counts()
+                if counts[PENDING] or counts[CLAIMED]:
+                    # Others still hold leases; wait in case one expires and needs redoing.
+                    time.sleep(QUEUE_POLL_SECONDS)
+                    continue
+                break
+
+            with Heartbeat(queue, owner, ids):
+                results, errors = run_analysis(
+                    [Path(i) for i in ids], args.workers, use_cache=not args.no_cache,
+                    memory_budget_mb=args.memory_budget,
+                )
+            for job_id in ids:
+                if job_id in results:
+                    if not queue.complete(owner, job_id, asdict(results[job_id])):
+                        print(f"WARNING: lease lost for {job_id}; result discarded")
+                else:
+                    status = queue.fail(owner, job_id, errors.get(job_id, "no result"))
+                    print(f"WARNING: analysis failed for {job_id} ({status}): {errors.get(job_id)}")
+
+        counts = queue.counts()
+        print(f"Queue drained: {counts}")
+        if not queue.finalize(owner):
+            print("Another worker is merging the results; nothing left to do here.")
+            return None
+        merged = {job_id: AudioAnalysis(**r) for job_id, r in queue.results().items()}
+        return merged, queue.dead_letters()
+    finally:
+        queue.close()
+
+
+def run_backfill_similar(args: argparse.Namespace) -> None:
+    if not OUT_WAV_DIR.exists():
+        raise SystemExit(f"Missing directory: {OUT_WAV_DIR}")
+    # Only catalog-named files have a beats.audio_path to point at.
+    wavs = sorted(
+        p for p in OUT_WAV_DIR.iterdir()
+        if p.is_file() and p.suffix.lower() == ".wav" and FILENAME_RE.match(p.stem)
+    )
+    if args.limit and args.limit > 0:
+        wavs = wavs[: args.limit]
+
+    results, errors = run_analysis(wavs, args.workers, use_cache=not args.no_cache, memory_budget_mb=args.memory_budget)
+    for path, error in errors.items():
+        print(f"WARNING: analysis failed for {path}: {error}")
+
+    result = rebuild_similar(
+        (audio_path_for(p.stem), results[str(p)].features) for p in wavs if str(p) in results
+    )
+    print(f"Similar beats: rebuilt {result['rows']} rows -> {result['export']}")
+
+
+def reconcile_plans(plans: List[BeatPlan]) -> Reconciliation:
+    """Match plans against the catalog WAVs by content (media manifest MD5s, rehashing only changed files)."""
+    manifest, stats = build_manifest()
+    print(f"Media manifest: {stats['files']} files ({stats['hashed']} hashed)")
+    return reconcile(((pl.source_wav, pl.out_basename) for pl in plans), manifest.get("wav", {}))
+
+
+def apply_reconciliation(result: Reconciliation, apply: bool) -> None:
+    plan = write_reports(result, applied=apply)
+    print(
+        f"Reconcile: {len(result.renames)} renames, {len(result.unchanged)} unchanged, "
+        f"{len(result.new)} new, {len(result.conflicts)} conflicts -> {PLAN_PATH}"
+    )
+    for r in result.renames[:20]:
+        print(f"- {r.old_basename} -> {r.new_basename}")
+    for c in result.conflicts[:20]:
+        print(f"WARNING: not renaming {c['source_wav']} -> {c['new_basename']}: {c['reason']}")
+    if result.renames and plan["r2_not_managed"]:
+        print(f"NOTE: no R2 moves for {', '.join(plan['r2_not_managed'])} (not uploaded by these scripts); "
+              "if you uploaded them by hand, move them too or they stay under the old names.")
+    if not apply or not result.renames:
+        return
+
+    # Same bytes, new name: move the derived files instead of re-copying / re-encoding.
+    for r in result.renames:
+        rename_local(r)
+    rename_similar((audio_path_for(r.old_basename), audio_path_for(r.new_basename)) for r in result.renames)
+    index = rebuild_index(OUT_MP3_DIR, INDEX_DIR)
+    print(f"Renamed {len(result.renames)} beats locally (search index: -{index['removed']} +{index['added']})")
+    print(f"Next: {R2_SCRIPT_PATH} ({len(plan['r2_moves'])} R2 moves), then {SQL_PATH}")
+
+
+def run_reconcile_catalog(args: argparse.Namespace) -> None:
+    if not OUT_WAV_DIR.exists():
+        raise SystemExit(f"Missing directory: {OUT_WAV_DIR}")
+    wavs = sorted(
+        p for p in OUT_WAV_DIR.iterdir()
+        if p.is_file() and p.suffix.lower() == ".wav" and FILENAME_RE.match(p.stem)
+    )
+    if args.limit and args.limit > 0:
+        wavs = wavs[: args.limit]
+
+    results, errors = run_analysis(wavs, args.workers, use_cache=not args.no_cache, memory_budget_mb=args.memory_budget)
+    for path, error in errors.items():
+        print(f"WARNING: analysis failed for {path}: {error}")
+
+    plans = [build_plan(p, results[str(p)]) for p in wavs if str(p) in results]
+    apply_reconciliation(reconcile_plans(plans), args.apply)
+    if not args.apply:
+        print("Dry run only. Re-run with --apply to rename local files.")
+
+
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--apply", action="store_true", help="Actually write/copy files into beats/wav and beats/mp3.")
     ap.add_argument("--limit", type=int, default=0, help="Limit number of WAVs processed (0 = all).")
+    ap.add_argument("--audit", action="store_true", help="Audit existing beats/wav filenames against fresh detection.")
+    ap.add_argument("--workers", "-j", type=int, default=0, help="Max parallel analysis processes (0 = one per CPU).")
+    ap.add_argument(
+        "--memory-budget",
+        type=int,
+        default=0,
+        help="Memory budget for analysis workers in MB (0 = 75%% of available RAM).",
+    )
+    ap.add_argument("--no-cache", action="store_true", help=f"Ignore the analysis cache ({ANALYSIS_CACHE_PATH}).")
+    ap.add_argument("--queue", default="", help="Shared SQLite queue file; drain beats/new together with other workers.")
+    ap.add_argument("--lease", type=int, default=300, help="--queue: lease seconds before an unrenewed claim is retried.")
+    ap.add_argument("--max-attempts", type=int, default=3, help="--queue: attempts before a job is dead-lettered.")
+    ap.add_argument(
+        "--normalize-mp3",
+        action="store_true",
+        help=f"Also gain-normalize full MP3s to {LOUDNESS_TARGET_LUFS:g} LUFS (previews always are).",
+    )
+    ap.add_argument(
+        "--backfill-similar",
+        action="store_true",
+        help="Analyze all of beats/wav (cached) and rebuild the similar-beats table from scratch.",
+    )
+    ap.add_argument(
+        "--trace",
+        default="",
+        help="Write a Chrome/Perfetto trace of every stage to this JSON file (+ .summary.json).",
+    )
+    ap.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Rename catalog assets whose audio matches a new WAV instead of re-copying / re-encoding it.",
+    )
+    ap.add_argument(
+        "--reconcile-catalog",
+        action="store_true",
+        help="Re-derive names for all of beats/wav (cached analysis) and rename assets whose name changed.",
+    )
     args = ap.parse_args()
 
+    if args.trace:
+        enable_trace(Path(args.trace))
+    try:
+        run(args)
+    finally:
+        if args.trace:
+            finish_trace(Path(args.trace))
+
+
+def run(args: argparse.Namespace) -> None:
+    if args.audit:
+        run_audit(args)
+        return
+
+    if args.backfill_similar:
+        run_backfill_similar(args)
+        return
+
+    if args.reconcile_catalog:
+        run_reconcile_catalog(args)
+        return
+
     if not NEW_DIR.exists():
         raise SystemExit(f"Missing directory: {NEW_DIR}")
 
@@ -325,9 +1028,24 @@ def main() -> None:
     if args.limit and args.limit > 0:
         wavs = wavs[: args.limit]
 
+    if args.queue:
+        drained = drain_queue(args, wavs)
+        if drained is None:
+            return
+        results, errors = drained
+        # Merge every worker's results, including files this worker never saw.
+        wavs = sorted(Path(p) for p in results)
+    else:
+        results, errors = run_analysis(
+            wavs, args.workers, use_cache=not args.no_cache, memory_budget_mb=args.memory_budget
+        )
+    for path, error in errors.items():
+        print(f"WARNING: analysis failed for {path}: {error}")
+
     plans: List[BeatPlan] = []
     for p in wavs:
-        plans.append(build_plan(p))
+        if str(p) in results:
+            plans.append(build_plan(p, results[str(p)]))
 
     # detect collisions
     seen = {}
@@ -351,6 +1069,13 @@ def main() -> None:
             print(f"- {base}: {a} AND {b}")
         print("Resolve collisions before applying.")
 
+    if args.reconcile and not collisions:
+        result = reconcile_plans(plans)
+        apply_reconciliation(result, args.apply)
+        # Only audio the catalog doesn't have yet is copied and encoded.
+        new = set(result.new)
+        plans = [pl for pl in plans if pl.source_wav in new]
+
     if not args.apply:
         print("Dry run only. Re-run with --apply to write files.")
         return
@@ -360,6 +1085,7 @@ def main() -> None:
 
     OUT_WAV_DIR.mkdir(parents=True, exist_ok=True)
     OUT_MP3_DIR.mkdir(parents=True, exist_ok=True)
+    OUT_PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
 
     applied = 0
     for pl in plans:
@@ -369,15 +1095,47 @@ def main() -> None:
 
         # copy WAV (keep original in /new)
         if not out_wav.exists():
-            shutil.copy2(src, out_wav)
+            with span("copy_wav", pl.out_basename):
+                shutil.copy2(src, out_wav)
 
         # convert to MP3
         if not out_mp3.exists():
-            wav_to_mp3(out_wav, out_mp3)
+            with span("encode_mp3", pl.out_basename):
+                wav_to_mp3(out_wav, out_mp3, pl.gain_db if args.normalize_mp3 else 0.0)
+
+        # time -> byte offset sidecar for range-request seeking
+        if not seek_path_for(out_mp3).exists():
+            with span("seek_index", pl.out_basename):
+                seek = write_seek_index(out_mp3)
+            if not seek["xing"]["toc"]:
+                print(f"WARNING: {out_mp3} has no Xing/Info TOC (ffmpeg too old?)")
+
+        # short hook preview for store playback
+        out_preview = Path(pl.out_preview)
+        if pl.preview_duration > 0 and not out_preview.exists():
+            with span("preview", pl.out_basename):
+                render_preview(out_wav, out_preview, pl.preview_start, pl.preview_duration, pl.gain_db)
 
         applied += 1
 
-    print(f"Applied: {applied} beats (copied WAV + created MP3 as needed)")
+    print(f"Applied: {applied} beats (copied WAV + created MP3 + seek index + preview as needed)")
+
+    # Keep the CDN search shards in sync; only shards whose content changed are rewritten.
+    with span("search_index"):
+        result = update_index([Path(pl.out_mp3) for pl in plans], INDEX_DIR)
+    print(
+        f"Search index: +{result['added']} beats -> version {result['manifest']['version']} "
+        f"(changed shards: {', '.join(result['changed']) or 'none'})"
+    )
+
+    # Merge the new beats into the similar-beats table (only their rows are scored).
+    with span("similar"):
+        similar = update_similar(
+            (audio_path_for(pl.out_basename), results[pl.source_wav].features)
+            for pl in plans
+            if len(results[pl.source_wav].features) == FEATURE_DIM
+        )
+    print(f"Similar beats: {similar['updated']} updated, {similar['rows']} total -> {similar['export']}")
 
 
 if __name__ == "__main__":
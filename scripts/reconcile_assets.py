@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Rename-instead-of-reprocess reconciliation (process_new_beats.py --reconcile,
+--reconcile-catalog).
+
+The output basename artist__beat_key_bpm bakes detected key/BPM into every
+derived asset. When detection improves or a title is corrected, the audio
+itself hasn't changed, so instead of copying, re-encoding and re-uploading,
+plans are matched against the catalog WAVs by content hash (the MD5s in the
+media manifest, media_manifest.py) and turned into renames:
+
+- local: beats/wav, beats/mp3, beats/preview and the seek sidecar are renamed
+  in place (--apply); nothing is decoded or encoded
+- R2: `aws s3 mv` between keys of the same bucket (server-side copy + delete,
+  no re-transfer) in docs/audits/reconcile_r2.sh, for the WAV and MP3 objects.
+  Previews and seek sidecars have no bucket copy in media_manifest.SOURCES
+  (nothing here uploads them), so no moves are generated for them; the plan
+  and the script say so, in case they were uploaded by hand
+- DB: UPDATE beats SET audio_path ... in docs/audits/reconcile_audio_paths.sql
+
+Remote and DB operations are written out for review rather than executed,
+like the other R2 scripts in this directory. When a cached bucket listing
+exists (media_manifest.py --diff), moves are limited to objects that are
+actually uploaded; the rest are listed as not uploaded in the plan.
+
+A plan is
+    unchanged  its bytes are already in the catalog under the planned name
+    rename     its bytes are in the catalog under another name
+    new        no catalog WAV has its bytes (process normally)
+    conflict   the planned name is taken by different audio, or two plans want it
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shlex
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from media_manifest import ASSETS_DIR, SOURCES, md5_file, remote_cache_path, remote_listing
+from mp3_seek_index import SEEK_DIR, SEEK_SUFFIX
+
+
+REPORT_DIR = Path("docs/audits")
+PLAN_PATH = REPORT_DIR / "reconcile_plan.json"
+R2_SCRIPT_PATH = REPORT_DIR / "reconcile_r2.sh"
+SQL_PATH = REPORT_DIR / "reconcile_audio_paths.sql"
+
+WAV_DIR = ASSETS_DIR / "beats/wav"
+
+# Every local file derived from one beat: (directory, suffix after the basename).
+LOCAL_LAYOUT: List[Tuple[Path, str]] = [
+    (WAV_DIR, ".wav"),
+    (ASSETS_DIR / "beats/mp3", ".mp3"),
+    (ASSETS_DIR / "beats/preview", ".mp3"),
+    (SEEK_DIR, SEEK_SUFFIX),
+]
+
+# Bucket-side copies of the same assets (media_manifest.SOURCES naming).
+REMOTE_SOURCES = ("wav", "mp3")
+
+
+@dataclass
+class Rename:
+    source_wav: str
+    old_basename: str
+    new_basename: str
+    md5: str
+
+
+@dataclass
+class Reconciliation:
+    renames: List[Rename] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    new: List[str] = field(default_factory=list)
+    conflicts: List[Dict[str, str]] = field(default_factory=list)
+
+
+def catalog_by_hash(wav_manifest: Dict[str, Dict[str, object]]) -> Dict[str, List[str]]:
+    """md5 -> catalog WAV basenames with those bytes (usually one)."""
+    out: Dict[str, List[str]] = {}
+    for key, entry in sorted(wav_manifest.items()):
+        out.setdefault(str(entry["md5"]), []).append(Path(key).stem)
+    return out
+
+
+def reconcile(targets: Iterable[Tuple[str, str]], wav_manifest: Dict[str, Dict[str, object]],
+              wav_dir: Path = WAV_DIR) -> Reconciliation:
+    """
+    targets: (source_wav, planned out_basename). Catalog WAVs are looked up in the
+    manifest; anything else (beats/new) is hashed here.
+    """
+    by_hash = catalog_by_hash(wav_manifest)
+    md5_of = {Path(key).stem: str(entry["md5"]) for key, entry in wav_manifest.items()}
+    result = Reconciliation()
+    claimed: Dict[str, str] = {}
+
+    for source_wav, new_basename in targets:
+        source = Path(source_wav)
+        in_catalog = source.parent.resolve() == wav_dir.resolve() and source.stem in md5_of
+        digest = md5_of[source.stem] if in_catalog else md5_file(source)
+        current = by_hash.get(digest, [])
+        if not current:
+            result.new.append(source_wav)
+            continue
+        if new_basename in current:
+            result.unchanged.append(source_wav)
+            continue
+        if new_basename in md5_of or new_basename in claimed:
+            result.conflicts.append({
+                "source_wav": source_wav,
+                "new_basename": new_basename,
+                "reason": "taken by different audio" if new_basename in md5_of
+                else f"also planned for {claimed[new_basename]}",
+            })
+            continue
+        old_basename = source.stem if in_catalog else current[0]
+        claimed[new_basename] = source_wav
+        result.renames.append(Rename(source_wav, old_basename, new_basename, digest))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Local renames
+# ---------------------------------------------------------------------------
+
+def rename_local(rename: Rename) -> List[str]:
+    """Rename every derived file that exists. Returns the new paths (idempotent)."""
+    moved = []
+    for directory, suffix in LOCAL_LAYOUT:
+        old = directory / f"{rename.old_basename}{suffix}"
+        new = directory / f"{rename.new_basename}{suffix}"
+        if not old.exists() or new.exists():
+            continue
+        os.rename(old, new)
+        if suffix == SEEK_SUFFIX:
+            sidecar = json.loads(new.read_text())
+            sidecar["mp3"] = f"{rename.new_basename}.mp3"
+            new.write_text(json.dumps(sidecar, separators=(",", ":")))
+        moved.append(str(new))
+    return moved
+
+
+# ---------------------------------------------------------------------------
+# Remote + DB operations
+# ---------------------------------------------------------------------------
+
+def audio_path(basename: str) -> str:
+    return f"/assets/beats/mp3/{basename}.mp3"
+
+
+def _cached_listing(source) -> Optional[Dict[str, Dict[str, object]]]:
+    if not source.bucket or not remote_cache_path(source).exists():
+        return None
+    objects, _age = remote_listing(source, None, refresh=False)
+    return objects
+
+
+def remote_moves(renames: List[Rename]) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """([{bucket, from, to}], [not uploaded]) for every remote copy of the renamed beats."""
+    moves: List[Dict[str, str]] = []
+    skipped: List[Dict[str, str]] = []
+    for source in SOURCES:
+        if source.name not in REMOTE_SOURCES:
+            continue
+        # Without a bucket name (private bucket), the script reads it from the env.
+        bucket = source.bucket or "${R2_PRIVATE_BUCKET_NAME:?set R2_PRIVATE_BUCKET_NAME}"
+        listing = _cached_listing(source)
+        for r in renames:
+            old_key = f"{r.old_basename}{source.suffix}"
+            op = {"bucket": bucket, "from": source.prefix + old_key, "to": f"{source.prefix}{r.new_basename}{source.suffix}"}
+            if listing is not None and old_key not in listing:
+                skipped.append(op)
+            else:
+                moves.append(op)
+    return moves, skipped
+
+
+def local_only_dirs() -> List[str]:
+    """LOCAL_LAYOUT directories without a bucket copy in media_manifest.SOURCES (renamed locally only)."""
+    synced = {ASSETS_DIR / source.local_dir for source in SOURCES if source.name in REMOTE_SOURCES}
+    return [str(directory) for directory, _suffix in LOCAL_LAYOUT if directory not in synced]
+
+
+def _s3_url(bucket: str, key: str) -> str:
+    # Keep ${VAR} bucket placeholders expandable; quote the key.
+    return f'"s3://{bucket}/"{shlex.quote(key)}'
+
+
+def write_r2_script(moves: List[Dict[str, str]], path: Path = R2_SCRIPT_PATH) -> None:
+    lines = [
+        "#!/bin/bash",
+        "# Generated by process_new_beats.py --reconcile: rename R2 objects whose beat was renamed.",
+        "# aws s3 mv within a bucket is a server-side copy + delete; no audio is re-uploaded.",
+        "",
+        "set -e",
+        "",
+        ': "${R2_ENDPOINT:?set R2_ENDPOINT (https://<account>.r2.cloudflarestorage.com)}"',
+        "",
+    ]
+    local_only = local_only_dirs()
+    if local_only:
+        lines[3:3] = [f"# Not moved (no R2 copy managed by these scripts): {', '.join(local_only)}.",
+                      "# If you uploaded those by hand, move them too or they stay under the old names."]
+    for m in moves:
+        lines.append(f'aws s3 mv {_s3_url(m["bucket"], m["from"])} {_s3_url(m["bucket"], m["to"])} '
+                     f'--endpoint-url "$R2_ENDPOINT"')
+    lines += ["", f'echo "✅ Moved {len(moves)} objects"', ""]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines))
+    path.chmod(0o755)
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def write_sql(renames: List[Rename], path: Path = SQL_PATH) -> None:
+    lines = [
+        "-- Generated by process_new_beats.py --reconcile: point renamed beats at their new files.",
+        '-- Apply after the local and R2 renames: psql "$DATABASE_URL" -f ' + str(path),
+        "BEGIN;",
+    ]
+    for r in renames:
+        lines.append(f"UPDATE beats SET audio_path = {_sql_literal(audio_path(r.new_basename))} "
+                     f"WHERE audio_path = {_sql_literal(audio_path(r.old_basename))};")
+    lines += ["COMMIT;", ""]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines))
+
+
+def write_reports(result: Reconciliation, applied: bool) -> Dict[str, object]:
+    """Plan JSON + R2 script + SQL; returns the plan dict."""
+    moves, not_uploaded = remote_moves(result.renames)
+    write_r2_script(moves)
+    write_sql(result.renames)
+    plan = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "applied_locally": applied,
+        "renames": [asdict(r) for r in result.renames],
+        "unchanged": result.unchanged,
+        "new": result.new,
+        "conflicts": result.conflicts,
+        "r2_moves": moves,
+        "r2_not_uploaded": not_uploaded,
+        "r2_not_managed": local_only_dirs(),
+        "r2_script": str(R2_SCRIPT_PATH),
+        "sql": str(SQL_PATH),
+    }
+    PLAN_PATH.parent.mkdir(parents=True, exist_ok=True)
+    PLAN_PATH.write_text(json.dumps(plan, indent=2, ensure_ascii=False))
+    return plan
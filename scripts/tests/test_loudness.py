@@ -0,0 +1,36 @@
+"""Edge cases of loudness.measure_loudness: silence and zero-length input."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loudness import LOUDNESS_FLOOR, measure_loudness, normalization_gain  # noqa: E402
+
+
+def assert_floor(stats):
+    assert stats.integrated == LOUDNESS_FLOOR
+    assert stats.true_peak == LOUDNESS_FLOOR
+    assert stats.loudness_range == 0.0
+    assert normalization_gain(stats.integrated, stats.true_peak, -14.0, -1.0) == 0.0
+
+
+def test_silence_reports_the_floor():
+    assert_floor(measure_loudness(np.zeros((2, 44100 * 4), dtype=np.float32), 44100))
+
+
+def test_empty_input_reports_the_floor():
+    assert_floor(measure_loudness(np.zeros((2, 0), dtype=np.float32), 44100))
+    assert_floor(measure_loudness(np.zeros(0, dtype=np.float32), 48000))
+
+
+def test_tone_is_measured():
+    rate = 48000
+    t = np.arange(rate * 5) / rate
+    tone = 0.5 * np.sin(2 * np.pi * 1000 * t)
+    stats = measure_loudness(np.stack([tone, tone]), rate)
+    # 1 kHz at -6 dBFS in both channels reads about -6 LUFS (BS.1770 reference).
+    assert abs(stats.integrated - (-6.0)) < 0.5
+    assert abs(stats.true_peak - (-6.02)) < 0.2
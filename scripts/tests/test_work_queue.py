@@ -0,0 +1,78 @@
+"""Rounds of work_queue.WorkQueue against one persistent queue file."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from work_queue import DONE, WorkQueue  # noqa: E402
+
+
+def drain(queue, owner, value):
+    """Claim and complete everything pending in the current round."""
+    while True:
+        ids = queue.claim(owner, 10)
+        if not ids:
+            return
+        for job_id in ids:
+            assert queue.complete(owner, job_id, {"value": value, "id": job_id})
+
+
+def test_second_round_on_same_file_finalizes_and_reuses_results(tmp_path):
+    path = tmp_path / "queue.sqlite"
+
+    first = WorkQueue(path)
+    assert first.enqueue(["a.wav", "b.wav"]) == 2
+    drain(first, "w1", "dry-run")
+    assert first.finalize("w1")
+    assert not first.finalize("w2")  # exactly one winner per round
+    assert set(first.results()) == {"a.wav", "b.wav"}
+    round_one = first.round
+    first.close()
+
+    # The same files again (e.g. the --apply rerun): a new round that merges
+    # the finished jobs without claiming them again.
+    second = WorkQueue(path)
+    assert second.enqueue(["a.wav", "b.wav"]) == 2
+    assert second.round == round_one + 1
+    assert second.claim("w1", 10) == []
+    assert second.counts()[DONE] == 2
+    assert second.finalize("w1")
+    assert {k: v["value"] for k, v in second.results().items()} == {"a.wav": "dry-run", "b.wav": "dry-run"}
+    second.close()
+
+
+def test_round_only_merges_its_own_jobs(tmp_path):
+    path = tmp_path / "queue.sqlite"
+
+    first = WorkQueue(path)
+    first.enqueue(["a.wav", "b.wav"])
+    drain(first, "w1", "one")
+    assert first.finalize("w1")
+    first.close()
+
+    second = WorkQueue(path)
+    second.enqueue(["b.wav", "c.wav"])
+    assert second.claim("w1", 10) == ["c.wav"]
+    assert not second.finalize("w1")  # c.wav is still claimed
+    assert second.complete("w1", "c.wav", {"value": "two"})
+    assert second.finalize("w1")
+    assert set(second.results()) == {"b.wav", "c.wav"}
+    second.close()
+
+
+def test_workers_joining_an_open_round_share_it(tmp_path):
+    path = tmp_path / "queue.sqlite"
+    a, b = WorkQueue(path), WorkQueue(path)
+    a.enqueue(["x.wav", "y.wav"])
+    b.enqueue(["x.wav", "y.wav"])
+    assert a.round == b.round
+
+    assert a.claim("a", 1) == ["x.wav"]
+    assert b.claim("b", 1) == ["y.wav"]
+    a.complete("a", "x.wav", {})
+    assert not a.finalize("a")  # y.wav still leased to b
+    b.complete("b", "y.wav", {})
+    assert [a.finalize("a"), b.finalize("b")].count(True) == 1
+    a.close()
+    b.close()
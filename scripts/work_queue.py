@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed claim queue so several processes (or hosts sharing a volume)
+can drain server/public/assets/beats/new together (process_new_beats.py --queue).
+
+Each job is one source WAV. Workers claim jobs under a lease and renew it
+with heartbeats while they work; a job whose lease expires (worker crashed,
+host went away) becomes claimable again. Failures are retried up to
+max_attempts, after which the job is parked in the dead-letter state with its
+last error instead of being retried forever.
+
+Results (the JSON analysis) are stored on the job row, so whichever worker
+finishes last can merge every result into one plan and run the collision check
+once (finalize()). Only one worker wins finalize; the rest just exit.
+
+The queue file outlives a run, so work is grouped into rounds. enqueue() joins
+the open round, or opens a new one once the last round was finalized, and
+moves the given jobs into it; everything else (claims, counts, results,
+finalize) only sees the current round's jobs. A job that already finished in an
+earlier round keeps its result, so rerunning a dry run with --apply merges it
+without analyzing it again, and results of files that aren't part of this run
+are never merged.
+
+All state changes run in BEGIN IMMEDIATE transactions, which take SQLite's
+write lock up front, so two workers can never claim the same job. The queue
+uses a rollback journal (journal_mode=DELETE), not WAL: WAL coordinates
+through a shared-memory -shm file that only works between processes on the
+same host, so workers on different hosts sharing the file over NFS/SMB could
+lose or corrupt updates. The rollback journal relies on the filesystem's
+file locking alone; NFS without working locks is still not safe, so use a
+volume with proper POSIX locks.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+DEAD = "dead"
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path: Path, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE.
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None,
+                                    check_same_thread=False)
+        self.lock = threading.Lock()
+        # No WAL: its -shm index doesn't work across hosts (see module docstring).
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " lease_owner TEXT,"
+            " lease_expires REAL,"
+            " result TEXT,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if "round" not in columns:
+            # Queue files from before rounds: their jobs join the next round enqueued.
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN round INTEGER")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_round ON jobs (round, status)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Round this handle works on, set by enqueue() (or join_round()).
+        self.round: Optional[int] = None
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # -- producer ----------------------------------------------------------
+
+    @staticmethod
+    def _round_meta(c: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+        row = c.execute("SELECT value FROM meta WHERE key = 'round'").fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def enqueue(self, job_ids: Iterable[str]) -> int:
+        """
+        Join the open round (or open the next one) and move `job_ids` into it.
+        Jobs new to the queue start pending; jobs from earlier rounds keep their
+        state, so finished ones aren't redone. Returns how many jobs joined the
+        round (re-enqueueing within a round is a no-op).
+        """
+        now = time.time()
+        job_ids = list(job_ids)
+        with self._tx() as c:
+            meta = self._round_meta(c)
+            if meta is None or meta.get("finalized"):
+                meta = {"id": (meta["id"] + 1) if meta else 1, "opened_at": now, "finalized": None}
+                c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('round', ?)", (json.dumps(meta),))
+            self.round = meta["id"]
+            before = c.total_changes
+            c.executemany(
+                "INSERT OR IGNORE INTO jobs (id, status, round, updated_at) VALUES (?, ?, ?, ?)",
+                [(job_id, PENDING, self.round, now) for job_id in job_ids],
+            )
+            c.executemany(
+                "UPDATE jobs SET round = ?, updated_at = ? WHERE id = ? AND round IS NOT ?",
+                [(self.round, now, job_id, self.round) for job_id in job_ids],
+            )
+            return c.total_changes - before
+
+    def join_round(self) -> Optional[int]:
+        """Work on the queue's current round without enqueueing anything. Returns its id."""
+        with self._tx() as c:
+            meta = self._round_meta(c)
+        self.round = meta["id"] if meta else None
+        return self.round
+
+    # -- consumer ----------------------------------------------------------
+
+    def _expire_leases(self, c: sqlite3.Connection, now: float) -> None:
+        """Expired claims go back to pending, or to dead once out of attempts."""
+        c.execute(
+            "UPDATE jobs SET status = ?, error = COALESCE(error, 'lease expired'), lease_owner = NULL,"
+            " lease_expires = NULL, updated_at = ?"
+            " WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (DEAD, now, CLAIMED, now, self.max_attempts),
+        )
+        c.execute(
+            "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE status = ? AND lease_expires < ?",
+            (PENDING, now, CLAIMED, now),
+        )
+
+    def claim(self, owner: str, limit: int = 1) -> List[str]:
+        """Lease up to `limit` pending jobs to `owner`."""
+        now = time.time()
+        with self._tx() as c:
+            self._expire_leases(c, now)
+            ids = [row[0] for row in c.execute(
+                "SELECT id FROM jobs WHERE status = ? AND round = ? ORDER BY attempts, id LIMIT ?",
+                (PENDING, self.round, limit),
+            )]
+            c.executemany(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?,"
+                " updated_at = ? WHERE id = ?",
+                [(CLAIMED, owner, now + self.lease_seconds, now, job_id) for job_id in ids],
+            )
+        return ids
+
+    def heartbeat(self, owner: str, job_ids: Iterable[str]) -> int:
+        """Extend the leases `owner` still holds. Returns how many were renewed."""
+        now = time.time()
+        with self._tx() as c:
+            before = c.total_changes
+            c.executemany(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                [(now + self.lease_seconds, now, job_id, CLAIMED, owner) for job_id in job_ids],
+            )
+            return c.total_changes - before
+
+    def complete(self, owner: str, job_id: str, result: Any) -> bool:
+        """Store a result. False if the lease was lost (another worker may redo the job)."""
+        now = time.time()
+        with self._tx() as c:
+            cur = c.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL,"
+                " updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (DONE, json.dumps(result), now, job_id, CLAIMED, owner),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, owner: str, job_id: str, error: str) -> str:
+        """Record a failure: back to pending for a retry, or dead once out of attempts."""
+        now = time.time()
+        with self._tx() as c:
+            row = c.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?", (job_id, CLAIMED, owner)
+            ).fetchone()
+            if row is None:
+                return ""
+            status = DEAD if row[0] >= self.max_attempts else PENDING
+            c.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (status, error, now, job_id),
+            )
+            return status
+
+    def requeue_dead(self) -> int:
+        """Give dead-lettered jobs a fresh set of attempts (after fixing the cause)."""
+        with self._tx() as c:
+            cur = c.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, updated_at = ? WHERE status = ?", (PENDING, time.time(), DEAD)
+            )
+            return cur.rowcount
+
+    # -- results -----------------------------------------------------------
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs per status in the current round."""
+        with self._tx() as c:
+            self._expire_leases(c, time.time())
+            rows = c.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE round = ? GROUP BY status", (self.round,)
+            ).fetchall()
+        out = {PENDING: 0, CLAIMED: 0, DONE: 0, DEAD: 0}
+        out.update(dict(rows))
+        return out
+
+    def results(self) -> Dict[str, Any]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, result FROM jobs WHERE status = ? AND round = ?", (DONE, self.round)
+            ).fetchall()
+        return {job_id: json.loads(result) for job_id, result in rows}
+
+    def dead_letters(self) -> Dict[str, str]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, error FROM jobs WHERE status = ? AND round = ?", (DEAD, self.round)
+            ).fetchall()
+        return dict(rows)
+
+    def finalize(self, owner: str) -> bool:
+        """
+        True for exactly one caller once nothing in the current round is pending
+        or claimed: that worker merges the round's results. The round is then
+        closed, and the next enqueue() opens a new one.
+        """
+        with self._tx() as c:
+            self._expire_leases(c, time.time())
+            meta = self._round_meta(c)
+            if meta is None or meta["id"] != self.round or meta.get("finalized"):
+                return False
+            open_jobs = c.execute(
+                "SELECT COUNT(*) FROM jobs WHERE round = ? AND status IN (?, ?)", (self.round, PENDING, CLAIMED)
+            ).fetchone()[0]
+            if open_jobs:
+                return False
+            done = c.execute(
+                "SELECT COUNT(*) FROM jobs WHERE round = ? AND status IN (?, ?)", (self.round, DONE, DEAD)
+            ).fetchone()[0]
+            meta["finalized"] = {"owner": owner, "jobs": done, "at": time.time()}
+            c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('round', ?)", (json.dumps(meta),))
+            return True
+
+
+class Heartbeat:
+    """Background thread renewing `owner`'s leases on `job_ids` until stopped."""
+
+    def __init__(self, queue: WorkQueue, owner: str, job_ids: List[str], interval: Optional[float] = None):
+        self.queue = queue
+        self.owner = owner
+        self.job_ids = list(job_ids)
+        self.interval = interval or max(1.0, queue.lease_seconds / 3)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.owner, self.job_ids)
+            except sqlite3.OperationalError:
+                pass  # busy; the next beat will retry well within the lease
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        self._thread.join()
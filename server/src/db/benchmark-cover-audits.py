@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Benchmark find-near-duplicates.py and find-artist-mismatches.py against a
+synthetic cover corpus with known ground truth.
+
+For each corpus size this generates (once, then reused) a set of "artist"
+folders. Each artist has its own palette, brightness and shapes, and each
+folder holds:
+
+- base covers drawn in that artist's style
+- controlled near-duplicates of some bases: recompression, resize, crop and
+  color shift (ground truth: one group per base)
+- a few planted off-style outliers drawn from a different palette
+  (ground truth: the outlier file names)
+
+It then runs the scripts' core functions on the corpus, uncached so decode
+cost is included:
+
+- near-duplicates: get_image_signature() via find_near_duplicates(), per folder
+- mismatches:      get_image_features() via extract_folder_features(), then find_outliers()
+
+For each stage it reports images/sec, wall time, peak resident memory and
+precision/recall. Near-duplicates are scored on pairs; outliers on files.
+Timing comes from an uninstrumented pass; memory from a second pass in a
+child process (peak RSS, so Pillow's and numpy's C buffers count;
+the child's RSS after imports is reported alongside as the floor).
+
+Every run is appended to server/bench/cover-audits/results.jsonl with the git
+commit, and compared with the previous run of the same size and seed.
+
+Usage:
+  python3 server/src/db/benchmark-cover-audits.py                     # sizes 100,1000
+  python3 server/src/db/benchmark-cover-audits.py --sizes 100,1000,10000 --artists 20
+  python3 server/src/db/benchmark-cover-audits.py --skip near-duplicates
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import itertools
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from cover_features import PROJECT_ROOT, Image
+
+from PIL import ImageDraw, ImageEnhance
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BENCH_DIR = PROJECT_ROOT / 'server' / 'bench' / 'cover-audits'
+RESULTS_FILE = 'results.jsonl'
+CORPUS_VERSION = 2
+
+COVER_SIZE = (512, 512)
+# Background color field: BACKGROUND_GRID x BACKGROUND_GRID random palette cells, upscaled.
+BACKGROUND_GRID = 4
+# Share of base covers that get near-duplicate variants, and of each folder that is planted outliers.
+DUPLICATE_SHARE = 0.15
+OUTLIER_SHARE = 0.05
+VARIANTS = ('recompress', 'resize', 'crop', 'colorshift')
+
+DEFAULT_SIZES = (100, 1000)
+DEFAULT_ARTISTS = 10
+DEFAULT_DUP_THRESHOLD = 0.85
+
+# Audit script each stage exercises: (file, module name).
+STAGE_SCRIPTS = {
+    'near-duplicates': ('find-near-duplicates.py', 'find_near_duplicates'),
+    'mismatches': ('find-artist-mismatches.py', 'find_artist_mismatches'),
+}
+
+
+def load_script(filename, module_name):
+    """Import one of the hyphenated audit scripts as a module."""
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def artist_style(rng):
+    """A palette, brightness bias and shape vocabulary that make a folder visually coherent."""
+    hue = rng.random()
+    dark = rng.random() < 0.5
+    return {'hue': hue, 'dark': dark, 'palette': style_palette(hue, dark, rng),
+            'shapes': rng.choice(['ellipse', 'rectangle', 'polygon'])}
+
+
+def style_palette(hue, dark, rng):
+    """
+    Four tones of one hue family from shade to tint. The lighter tones are
+    desaturated so the luminance range is wide for every hue (the
+    near-duplicate signature is grayscale, and saturated blue is dark even at
+    full value); dark styles sit lower on the value scale than light ones.
+    """
+    tones = (((0.05, 0.9), (0.3, 0.8), (0.55, 0.55), (0.85, 0.2)) if dark
+             else ((0.35, 0.85), (0.6, 0.65), (0.85, 0.35), (1.0, 0.1)))
+    palette = []
+    for v, s in tones:
+        h = (hue + rng.uniform(-0.06, 0.06)) % 1.0
+        s = min(1.0, s * rng.uniform(0.85, 1.15))
+        palette.append(tuple(int(c * 255) for c in _hsv_to_rgb(h, s, v)))
+    return palette
+
+
+def off_style(style, rng):
+    """Opposite-looking style for planted outliers (complementary hue, inverted brightness)."""
+    return {'hue': (style['hue'] + 0.5) % 1.0, 'dark': not style['dark'],
+            'palette': style_palette((style['hue'] + 0.5) % 1.0, not style['dark'], rng),
+            'shapes': 'rectangle' if style['shapes'] != 'rectangle' else 'ellipse'}
+
+
+def _hsv_to_rgb(h, s, v):
+    i = int(h * 6) % 6
+    f = h * 6 - int(h * 6)
+    p, q, t = v * (1 - s), v * (1 - f * s), v * (1 - (1 - f) * s)
+    return [(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)][i]
+
+
+def draw_cover(style, rng):
+    """
+    Soft color-field background plus random shapes, all in the style's palette.
+    The background is a coarse grid of the palette colors in random cells,
+    blown up smoothly, so covers of one style share their overall color but
+    not their light/dark layout (what the grayscale near-duplicate signature
+    sees).
+    """
+    w, h = COVER_SIZE
+    field = Image.new('RGB', (BACKGROUND_GRID, BACKGROUND_GRID))
+    cells = BACKGROUND_GRID * BACKGROUND_GRID
+    colors = (style['palette'] * cells)[:cells]  # every palette color equally often
+    rng.shuffle(colors)
+    field.putdata(colors)
+    img = field.resize(COVER_SIZE, Image.Resampling.BICUBIC)
+    draw = ImageDraw.Draw(img)
+    for _ in range(rng.randint(6, 16)):
+        color = rng.choice(style['palette'])
+        x0, y0 = rng.randrange(w), rng.randrange(h)
+        x1, y1 = x0 + rng.randint(20, w // 4), y0 + rng.randint(20, h // 4)
+        if style['shapes'] == 'ellipse':
+            draw.ellipse([x0, y0, x1, y1], fill=color)
+        elif style['shapes'] == 'rectangle':
+            draw.rectangle([x0, y0, x1, y1], fill=color)
+        else:
+            draw.polygon([(x0, y0), (x1, y0 + rng.randint(0, 80)), (x0 + rng.randint(0, 80), y1)], fill=color)
+    return img
+
+
+def make_variant(img, kind, rng):
+    """A controlled near-duplicate of img."""
+    if kind == 'recompress':
+        buf = io.BytesIO()
+        img.save(buf, 'WEBP', quality=rng.randint(20, 40))
+        return Image.open(io.BytesIO(buf.getvalue())).convert('RGB')
+    if kind == 'resize':
+        scale = rng.uniform(0.4, 0.7)
+        return img.resize((int(img.width * scale), int(img.height * scale)), Image.Resampling.LANCZOS)
+    if kind == 'crop':
+        margin = int(img.width * rng.uniform(0.03, 0.08))
+        return img.crop((margin, margin, img.width - margin, img.height - margin)).resize(img.size)
+    # colorshift
+    return ImageEnhance.Color(ImageEnhance.Brightness(img).enhance(rng.uniform(0.9, 1.1))).enhance(
+        rng.uniform(0.85, 1.15))
+
+
+def build_corpus(out_dir, size, artists, seed):
+    """
+    Write `size` covers across `artists` folders and return the ground truth:
+    {'duplicates': {artist: [[file, ...], ...]}, 'outliers': {artist: [file, ...]}}.
+    Reuses an existing corpus with the same parameters.
+    """
+    truth_path = out_dir / 'truth.json'
+    params = {'version': CORPUS_VERSION, 'size': size, 'artists': artists, 'seed': seed}
+    if truth_path.exists():
+        truth = json.loads(truth_path.read_text())
+        if truth.get('params') == params:
+            return truth
+
+    rng = random.Random(seed)
+    per_folder = [size // artists + (1 if i < size % artists else 0) for i in range(artists)]
+    truth = {'params': params, 'duplicates': {}, 'outliers': {}}
+    for a, count in enumerate(per_folder):
+        artist = f'artist_{a:02d}'
+        folder = out_dir / artist
+        folder.mkdir(parents=True, exist_ok=True)
+        for stale in folder.glob('*.webp'):
+            stale.unlink()
+        style = artist_style(rng)
+
+        n_outliers = max(1, round(count * OUTLIER_SHARE)) if count >= 10 else 0
+        remaining = count - n_outliers
+        groups, outliers = [], []
+        i = 0
+        while remaining > 0:
+            base = draw_cover(style, rng)
+            name = f'{artist}_{i:05d}.webp'
+            base.save(folder / name, 'WEBP', quality=85)
+            remaining -= 1
+            group = [name]
+            if remaining > 0 and rng.random() < DUPLICATE_SHARE:
+                for kind in rng.sample(VARIANTS, min(remaining, rng.randint(1, 3))):
+                    variant_name = f'{artist}_{i:05d}_{kind}.webp'
+                    make_variant(base, kind, rng).save(folder / variant_name, 'WEBP', quality=85)
+                    group.append(variant_name)
+                    remaining -= 1
+            if len(group) > 1:
+                groups.append(group)
+            i += 1
+
+        foreign = off_style(style, rng)
+        for j in range(n_outliers):
+            name = f'{artist}_x{j:04d}.webp'
+            draw_cover(foreign, rng).save(folder / name, 'WEBP', quality=85)
+            outliers.append(name)
+
+        truth['duplicates'][artist] = groups
+        truth['outliers'][artist] = outliers
+
+    truth_path.write_text(json.dumps(truth, indent=2))
+    return truth
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+def precision_recall(predicted, actual):
+    tp = len(predicted & actual)
+    precision = tp / len(predicted) if predicted else (1.0 if not actual else 0.0)
+    recall = tp / len(actual) if actual else 1.0
+    return precision, recall
+
+
+def group_pairs(artist, groups):
+    """Unordered (artist, a, b) pairs within each group."""
+    return {(artist, *sorted(pair)) for group in groups for pair in itertools.combinations(group, 2)}
+
+
+@contextlib.contextmanager
+def measured():
+    """Wall time for the enclosed block."""
+    stats = {}
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats['seconds'] = time.perf_counter() - start
+
+
+def max_rss_mb():
+    """
+    Peak resident set size of this process so far, in MB. Linux keeps
+    ru_maxrss across exec (a child would start at the parent's peak), so
+    there VmHWM from /proc is used; elsewhere ru_maxrss (bytes on macOS).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_near_duplicates(dupes, corpus_dir, truth, threshold):
+    """One uncached pass over every folder. Returns (predicted pairs, images)."""
+    predicted = set()
+    images = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for artist in sorted(truth['duplicates']):
+            folder = corpus_dir / artist
+            images += len(list(folder.glob('*.webp')))
+            groups = dupes.find_near_duplicates(str(folder), threshold, cache=None)
+            # find_near_duplicates returns [reference, (file, similarity), ...] per group
+            flat = [[g[0]] + [item[0] for item in g[1:]] for g in groups]
+            predicted |= group_pairs(artist, flat)
+    return predicted, images
+
+
+def run_mismatches(mismatches, corpus_dir, truth):
+    """One uncached pass over every folder. Returns (predicted outliers, images, extract seconds)."""
+    predicted = set()
+    images = 0
+    extract_seconds = 0.0
+    for artist in sorted(truth['outliers']):
+        folder = str(corpus_dir / artist)
+        files = mismatches.list_folder_images(folder)
+        images += len(files)
+        t0 = time.perf_counter()
+        features_list = mismatches.extract_folder_features(folder, files, cache=None)
+        extract_seconds += time.perf_counter() - t0
+        for outlier in mismatches.folder_outliers(features_list):
+            predicted.add((artist, outlier['file']))
+    return predicted, images, extract_seconds
+
+
+def memory_probe(stage, corpus_dir, threshold):
+    """Child-process side of peak_memory(): run one pass of a stage and report ru_maxrss."""
+    corpus_dir = Path(corpus_dir)
+    truth = json.loads((corpus_dir / 'truth.json').read_text())
+    module = load_script(*STAGE_SCRIPTS[stage])
+    baseline = max_rss_mb()
+    if stage == 'near-duplicates':
+        run_near_duplicates(module, corpus_dir, truth, threshold)
+    else:
+        run_mismatches(module, corpus_dir, truth)
+    return {'baseline_rss_mb': baseline, 'peak_rss_mb': max_rss_mb()}
+
+
+def peak_memory(stage, corpus_dir, threshold):
+    """
+    Peak RSS of one pass of `stage`, measured in a fresh process so earlier
+    stages and corpus generation don't set the high-water mark.
+    """
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--memory-probe', stage,
+         '--corpus', str(corpus_dir), '--threshold', str(threshold)],
+        capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_near_duplicates(corpus_dir, truth, threshold):
+    dupes = load_script(*STAGE_SCRIPTS['near-duplicates'])
+    with measured() as m:
+        predicted, images = run_near_duplicates(dupes, corpus_dir, truth, threshold)
+    actual = set()
+    for artist, groups in truth['duplicates'].items():
+        actual |= group_pairs(artist, groups)
+    precision, recall = precision_recall(predicted, actual)
+    return {
+        'images': images, **m, **peak_memory('near-duplicates', corpus_dir, threshold),
+        'images_per_sec': images / m['seconds'] if m['seconds'] else 0.0,
+        'precision': precision, 'recall': recall,
+        'predicted': len(predicted), 'actual': len(actual),
+    }
+
+
+def bench_mismatches(corpus_dir, truth):
+    mismatches = load_script(*STAGE_SCRIPTS['mismatches'])
+    with measured() as m:
+        predicted, images, extract_seconds = run_mismatches(mismatches, corpus_dir, truth)
+    actual = set()
+    for artist, files in truth['outliers'].items():
+        actual |= {(artist, f) for f in files}
+    precision, recall = precision_recall(predicted, actual)
+    return {
+        'images': images, **m, **peak_memory('mismatches', corpus_dir, DEFAULT_DUP_THRESHOLD),
+        'extract_seconds': extract_seconds,
+        'score_seconds': m['seconds'] - extract_seconds,
+        'images_per_sec': images / m['seconds'] if m['seconds'] else 0.0,
+        'precision': precision, 'recall': recall,
+        'predicted': len(predicted), 'actual': len(actual),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def previous_result(results_path, stage, size, seed, artists):
+    if not results_path.exists():
+        return None
+    last = None
+    for line in results_path.read_text().splitlines():
+        row = json.loads(line)
+        if (row['stage'], row['size'], row['seed'], row['artists']) == (stage, size, seed, artists):
+            last = row
+    return last
+
+
+def print_result(stage, result, previous):
+    def delta(field, higher_is_better=True):
+        if not previous or not previous.get(field):
+            return ''
+        change = (result[field] - previous[field]) / previous[field] * 100
+        good = (change >= 0) == higher_is_better
+        return f" ({'+' if change >= 0 else ''}{change:.1f}% {'✅' if good else '⚠️'})"
+
+    print(f"   {stage}:")
+    print(f"     {result['images']} images in {result['seconds']:.2f}s -> "
+          f"{result['images_per_sec']:.1f} img/s{delta('images_per_sec')}")
+    print(f"     Peak RSS: {result['peak_rss_mb']:.1f} MB{delta('peak_rss_mb', higher_is_better=False)} "
+          f"(after imports: {result['baseline_rss_mb']:.1f} MB)")
+    print(f"     Precision: {result['precision']:.3f}{delta('precision')} | "
+          f"Recall: {result['recall']:.3f}{delta('recall')} "
+          f"({result['predicted']} predicted / {result['actual']} actual)")
+    if 'extract_seconds' in result:
+        print(f"     Extract: {result['extract_seconds']:.2f}s | Score: {result['score_seconds']:.2f}s")
+
+
+def main(sizes=DEFAULT_SIZES, artists=DEFAULT_ARTISTS, seed=1337, threshold=DEFAULT_DUP_THRESHOLD,
+         skip=(), out_dir=BENCH_DIR):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results_path = out_dir / RESULTS_FILE
+    commit = git_commit()
+
+    print("=" * 80)
+    print("⏱️  COVER AUDIT BENCHMARK")
+    print("=" * 80)
+    print(f"   Sizes: {', '.join(str(s) for s in sizes)} | Artists: {artists} | Seed: {seed} | Commit: {commit}")
+
+    for size in sizes:
+        corpus_dir = out_dir / f'corpus-{size}-{artists}-{seed}'
+        print(f"\n📁 Corpus: {size} images ({corpus_dir})")
+        t0 = time.perf_counter()
+        truth = build_corpus(corpus_dir, size, artists, seed)
+        print(f"   Ready in {time.perf_counter() - t0:.1f}s")
+
+        stages = []
+        if 'near-duplicates' not in skip:
+            stages.append(('near-duplicates', lambda: bench_near_duplicates(corpus_dir, truth, threshold)))
+        if 'mismatches' not in skip:
+            stages.append(('mismatches', lambda: bench_mismatches(corpus_dir, truth)))
+
+        for stage, run in stages:
+            result = run()
+            previous = previous_result(results_path, stage, size, seed, artists)
+            print_result(stage, result, previous)
+            row = {
+                'stage': stage, 'size': size, 'artists': artists, 'seed': seed,
+                'threshold': threshold if stage == 'near-duplicates' else None,
+                'commit': commit, 'at': datetime.now(timezone.utc).isoformat(),
+                **{k: round(v, 6) if isinstance(v, float) else v for k, v in result.items()},
+            }
+            with open(results_path, 'a') as f:
+                f.write(json.dumps(row) + '\n')
+
+    print(f"\n📝 Results appended to: {results_path}")
+    print("=" * 80)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmark the cover audit scripts on a synthetic ground-truth corpus.')
+    ap.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                    help='Comma-separated corpus sizes (default: 100,1000).')
+    ap.add_argument('--artists', type=int, default=DEFAULT_ARTISTS, help='Artist folders per corpus.')
+    ap.add_argument('--seed', type=int, default=1337)
+    ap.add_argument('--threshold', type=float, default=DEFAULT_DUP_THRESHOLD,
+                    help='Near-duplicate similarity threshold (as find-near-duplicates.py).')
+    ap.add_argument('--skip', action='append', default=[], choices=['near-duplicates', 'mismatches'],
+                    help='Skip a stage (repeatable).')
+    ap.add_argument('--out', default=str(BENCH_DIR), help='Corpus + results directory.')
+    # Internal: one memory-measurement pass, run by peak_memory() in a child process.
+    ap.add_argument('--memory-probe', choices=sorted(STAGE_SCRIPTS), help=argparse.SUPPRESS)
+    ap.add_argument('--corpus', help=argparse.SUPPRESS)
+    return ap.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.memory_probe:
+        print(json.dumps(memory_probe(args.memory_probe, args.corpus, args.threshold)))
+        sys.exit(0)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if any(s <= 0 for s in sizes) or args.artists <= 0:
+        print("❌ Sizes and --artists must be positive.")
+        sys.exit(1)
+    main(sizes=sizes, artists=args.artists, seed=args.seed, threshold=args.threshold,
+         skip=set(args.skip), out_dir=args.out)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Build responsive cover variants for the store.
+
+For every covers/<beat_id>.webp this writes a width ladder
+(VARIANT_WIDTHS, never upscaled: a source narrower than every rung gets a
+single variant at its own width) in WebP, plus AVIF when this Pillow build
+can encode it, into covers/variants/:
+
+    covers/variants/<beat_id>-<width>.webp
+    covers/variants/<beat_id>-<width>.avif
+
+Each variant is encoded at the highest quality that still fits the byte
+budget for its width (binary search over encoder quality), so small card
+thumbnails stay tiny while the 1024px art keeps its detail.
+
+A tiny blurred WebP placeholder (LQIP) is stored per beat as a data URI in
+covers/variants/manifest.json, next to the variant list, so cards can paint
+something immediately and srcset can pick the right size.
+
+The source is decoded once per beat (via the same Pillow setup as
+cover_features.py); beats are processed in parallel (--workers) and a beat
+is skipped when its source content hash and encoder settings match the
+manifest and its variant files are still on disk (--force to rebuild).
+Variant files of removed beats, and rungs a rebuilt beat no longer has, are
+deleted.
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+from cover_features import PROJECT_ROOT, Image, content_hash
+
+try:
+    import pillow_avif  # noqa: F401  (registers AVIF on Pillow < 11.3)
+except ImportError:
+    pass
+from PIL import features as pil_features
+
+
+COVERS_DIR = PROJECT_ROOT / 'server' / 'public' / 'assets' / 'images' / 'covers'
+VARIANTS_DIR = COVERS_DIR / 'variants'
+MANIFEST_FILE = 'manifest.json'
+PUBLIC_PREFIX = '/assets/images/covers/variants'
+
+# Bump when widths, budgets or encoder settings change so every beat is rebuilt.
+VARIANT_VERSION = 2
+
+VARIANT_WIDTHS = (128, 256, 512, 1024)
+
+# Per-width byte budgets for WebP; AVIF gets AVIF_BUDGET_RATIO of that.
+BYTE_BUDGETS = {128: 6_000, 256: 16_000, 512: 48_000, 1024: 140_000}
+AVIF_BUDGET_RATIO = 0.75
+
+# Quality search bounds: never go above MAX_QUALITY, never below MIN_QUALITY
+# (if even MIN_QUALITY overshoots the budget, that encode is kept anyway).
+MIN_QUALITY = 30
+MAX_QUALITY = 90
+
+# Low-quality image placeholder: LQIP_WIDTH px wide, blurred on the client.
+LQIP_WIDTH = 16
+LQIP_QUALITY = 30
+
+ENCODER_OPTIONS = {
+    'webp': {'format': 'WEBP', 'method': 6},
+    'avif': {'format': 'AVIF', 'speed': 6},
+}
+
+
+def available_formats():
+    """WebP always; AVIF only when this Pillow build has an encoder for it."""
+    formats = ['webp']
+    if pil_features.check('avif'):
+        formats.append('avif')
+    return formats
+
+
+def encode(image, fmt, quality):
+    buf = io.BytesIO()
+    image.save(buf, quality=quality, **ENCODER_OPTIONS[fmt])
+    return buf.getvalue()
+
+
+def encode_within_budget(image, fmt, budget):
+    """
+    Highest quality in [MIN_QUALITY, MAX_QUALITY] whose encode fits `budget`
+    bytes. File size grows monotonically (enough) with quality, so a binary
+    search needs ~6 encodes instead of one per quality step.
+    Returns (data, quality).
+    """
+    # Small rungs usually fit at full quality: one encode and done.
+    data = encode(image, fmt, MAX_QUALITY)
+    if len(data) <= budget:
+        return data, MAX_QUALITY
+
+    best = None
+    lo, hi = MIN_QUALITY, MAX_QUALITY - 1
+    while lo <= hi:
+        quality = (lo + hi) // 2
+        data = encode(image, fmt, quality)
+        if len(data) <= budget:
+            best = (data, quality)
+            lo = quality + 1
+        else:
+            hi = quality - 1
+    if best is None:
+        best = (encode(image, fmt, MIN_QUALITY), MIN_QUALITY)
+    return best
+
+
+def make_lqip(image):
+    """Tiny WebP thumbnail as a data URI (a few hundred bytes)."""
+    height = max(1, round(image.height * LQIP_WIDTH / image.width))
+    thumb = image.resize((LQIP_WIDTH, height), Image.Resampling.BOX)
+    data = encode(thumb, 'webp', LQIP_QUALITY)
+    return 'data:image/webp;base64,' + base64.b64encode(data).decode('ascii')
+
+
+def ladder_widths(source_width):
+    """Ladder widths up to the source width (just the source width if it is below every rung)."""
+    widths = [w for w in VARIANT_WIDTHS if w <= source_width]
+    return widths or [source_width]
+
+
+def byte_budget(width, fmt):
+    """WebP budget for a rung (off-ladder widths get the smallest rung's), scaled for AVIF."""
+    budget = BYTE_BUDGETS.get(width, BYTE_BUDGETS[VARIANT_WIDTHS[0]])
+    if fmt == 'avif':
+        budget = int(budget * AVIF_BUDGET_RATIO)
+    return budget
+
+
+def variant_name(beat_id, width, fmt):
+    return f'{beat_id}-{width}.{fmt}'
+
+
+def build_variants(source_path, out_dir, formats):
+    """
+    Process-pool worker: decode one cover and write its whole ladder.
+    Returns the manifest entry for the beat (or an 'error' entry).
+    """
+    source_path = Path(source_path)
+    out_dir = Path(out_dir)
+    beat_id = source_path.stem
+    try:
+        data = source_path.read_bytes()
+        img = Image.open(io.BytesIO(data))
+        img.load()
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+        variants = []
+        # Largest first, each rung resized from the previous one: cheaper than
+        # resizing the full-size source every time, and visually equivalent.
+        current = img
+        for width in sorted(ladder_widths(img.width), reverse=True):
+            height = max(1, round(img.height * width / img.width))
+            if current.width != width:
+                current = current.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                budget = byte_budget(width, fmt)
+                encoded, quality = encode_within_budget(current, fmt, budget)
+                name = variant_name(beat_id, width, fmt)
+                tmp = out_dir / (name + '.tmp')
+                tmp.write_bytes(encoded)
+                os.replace(tmp, out_dir / name)
+                variants.append({
+                    'width': width,
+                    'height': height,
+                    'format': fmt,
+                    'bytes': len(encoded),
+                    'quality': quality,
+                    'over_budget': len(encoded) > budget,
+                    'path': f'{PUBLIC_PREFIX}/{name}',
+                })
+
+        return {
+            'beat_id': beat_id,
+            'source_hash': content_hash(data),
+            'source_bytes': len(data),
+            'width': img.width,
+            'height': img.height,
+            'version': VARIANT_VERSION,
+            'formats': formats,
+            'lqip': make_lqip(img),
+            'variants': sorted(variants, key=lambda v: (v['format'], v['width'])),
+        }
+    except Exception as e:
+        return {'beat_id': beat_id, 'error': str(e)}
+
+
+def is_up_to_date(entry, source_path, out_dir, formats):
+    """True when the manifest entry was built from these exact bytes and settings."""
+    if not entry or entry.get('version') != VARIANT_VERSION or entry.get('formats') != formats:
+        return False
+    if entry.get('source_bytes') != source_path.stat().st_size:
+        return False
+    if any(not (out_dir / Path(v['path']).name).exists() for v in entry.get('variants', [])):
+        return False
+    return entry.get('source_hash') == content_hash(source_path.read_bytes())
+
+
+def remove_variant_files(entry, out_dir, keep=()):
+    """Delete the variant files listed in a manifest entry (except `keep` names). Returns the count."""
+    removed = 0
+    for v in (entry or {}).get('variants', []):
+        name = Path(v['path']).name
+        if name in keep:
+            continue
+        try:
+            (out_dir / name).unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def load_manifest(out_dir):
+    path = out_dir / MANIFEST_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text()).get('beats', {})
+
+
+def write_manifest(out_dir, beats):
+    path = out_dir / MANIFEST_FILE
+    tmp = path.with_suffix('.json.tmp')
+    tmp.write_text(json.dumps({
+        'version': VARIANT_VERSION,
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'widths': list(VARIANT_WIDTHS),
+        'beats': dict(sorted(beats.items())),
+    }, indent=2))
+    os.replace(tmp, path)
+    return path
+
+
+def main(src_dir=COVERS_DIR, out_dir=VARIANTS_DIR, workers=None, force=False, limit=0):
+    src_dir = Path(src_dir)
+    out_dir = Path(out_dir)
+    if not src_dir.exists():
+        print(f"❌ Directory not found: {src_dir}")
+        sys.exit(1)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    formats = available_formats()
+    manifest = load_manifest(out_dir)
+
+    sources = sorted(src_dir.glob('*.webp'))
+    if limit:
+        sources = sources[:limit]
+    todo = [p for p in sources if force or not is_up_to_date(manifest.get(p.stem), p, out_dir, formats)]
+
+    print("🖼️  Building responsive cover variants...")
+    print(f"   Source: {src_dir}")
+    print(f"   Output: {out_dir}")
+    print(f"   Widths: {', '.join(str(w) for w in VARIANT_WIDTHS)} | Formats: {', '.join(formats)}")
+    if 'avif' not in formats:
+        print("   ⚠️  AVIF encoder not available in this Pillow build (pip3 install pillow-avif-plugin); WebP only")
+    print(f"   Covers: {len(sources)} ({len(sources) - len(todo)} unchanged, {len(todo)} to build) | Workers: {workers}\n")
+
+    built = failed = removed = 0
+    source_bytes = variant_bytes = variant_beats = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(build_variants, str(p), str(out_dir), formats) for p in todo]
+            for future in as_completed(futures):
+                entry = future.result()
+                if 'error' in entry:
+                    failed += 1
+                    print(f"   ⚠️  Error processing {entry['beat_id']}: {entry['error']}")
+                    continue
+                keep = {Path(v['path']).name for v in entry['variants']}
+                removed += remove_variant_files(manifest.get(entry['beat_id']), out_dir, keep)
+                manifest[entry['beat_id']] = entry
+                built += 1
+                source_bytes += entry['source_bytes']
+                rung = [v['bytes'] for v in entry['variants'] if v['width'] == 256]
+                if rung:
+                    variant_beats += 1
+                    variant_bytes += sum(rung)
+                if built % 50 == 0:
+                    print(f"     Built {built}/{len(todo)}...")
+
+    # Forget beats whose source cover no longer exists, and delete their variants.
+    present = {p.stem for p in src_dir.glob('*.webp')}
+    for beat_id in [b for b in manifest if b not in present]:
+        removed += remove_variant_files(manifest.pop(beat_id), out_dir)
+
+    manifest_path = write_manifest(out_dir, manifest)
+
+    print(f"\n✅ Built {built} covers ({failed} failed)")
+    if removed:
+        print(f"   🧹 Removed {removed} stale variant files")
+    if built:
+        per_format = max(1, len(formats))
+        avg_256 = (f"{variant_bytes / variant_beats / per_format / 1024:.1f} KB"
+                   if variant_beats else "n/a (no source >= 256px)")
+        print(f"   Avg source: {source_bytes / built / 1024:.1f} KB | avg 256px variant: {avg_256}")
+    over = sum(1 for e in manifest.values() for v in e['variants'] if v['over_budget'])
+    if over:
+        print(f"   ⚠️  {over} variants exceed their byte budget even at quality {MIN_QUALITY}")
+    print(f"📝 Manifest: {manifest_path}")
+    print("\n💡 Upload covers/variants/ to R2 alongside covers/ (images/covers/variants/).")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description='Build responsive WebP/AVIF cover variants with LQIP placeholders.')
+    ap.add_argument('--src', default=str(COVERS_DIR), help='Directory of <beat_id>.webp covers.')
+    ap.add_argument('--out', default=str(VARIANTS_DIR), help='Output directory for variants + manifest.')
+    ap.add_argument('--workers', '-j', type=int, default=0, help='Worker processes (0 = one per CPU).')
+    ap.add_argument('--force', action='store_true', help='Rebuild every cover even if unchanged.')
+    ap.add_argument('--limit', type=int, default=0, help='Only process the first N covers (0 = all).')
+    return ap.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(src_dir=args.src, out_dir=args.out, workers=args.workers, force=args.force, limit=args.limit)
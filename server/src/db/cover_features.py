@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Shared single-pass feature extraction for the cover audit scripts.
+
+find-near-duplicates.py and find-artist-mismatches.py both read the same
+WebP covers. This module decodes each image once and derives everything
+either script needs from that one decode:
+
+- dimensions, mode and file size
+- the 16x16 grayscale signature used for near-duplicate matching
+- a 64-bit difference hash (dHash) as a compact perceptual hash
+- dominant colors, brightness, saturation and a coarse RGB histogram
+- a fixed-length float feature vector (layout in FEATURE_NAMES)
+
+Results are stored in a SQLite cache keyed by the file's content hash, so
+running both audits back to back costs one decode per image in total, and
+renaming or moving a cover never invalidates its entry.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageStat
+except ImportError:
+    print("❌ Error: PIL/Pillow is required.")
+    print("   Install with: pip3 install pillow")
+    sys.exit(1)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+# Bump whenever the extracted features change so stale cache rows are ignored.
+FEATURE_VERSION = 2
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent
+DEFAULT_CACHE_PATH = PROJECT_ROOT / '.cache' / 'cover-features.sqlite'
+
+# Near-duplicate signature: grayscale thumbnail quantized to 16 levels.
+SIGNATURE_SIZE = (16, 16)
+SIGNATURE_LEVELS = 16
+
+# dHash: compare horizontally adjacent pixels of a 9x8 grayscale thumbnail.
+DHASH_SIZE = (9, 8)
+
+# Downsampled working size: every color feature is computed from one array this size.
+SAMPLE_SIZE = (150, 150)
+
+# Dominant colors: 8 levels per channel (c // 32 * 32), packed as r<<6 | g<<3 | b.
+COLOR_SHIFT = 5
+COLOR_BINS = 1 << (3 * (8 - COLOR_SHIFT))
+# ...counted over every 10th pixel of the downsample, as find-artist-mismatches.py
+# always has: the outlier / duplicate thresholds were tuned on those values.
+DOMINANT_SAMPLE_STEP = 10
+
+# Coarse joint RGB histogram used in the feature vector: 4 levels per channel.
+HIST_SHIFT = 6
+HIST_BINS = 1 << (3 * (8 - HIST_SHIFT))
+
+# Layout of the fixed-length vector returned in features['vector'].
+FEATURE_NAMES = (
+    ['aspect_ratio', 'avg_r', 'avg_g', 'avg_b', 'brightness', 'saturation']
+    + [f'hist_{i}' for i in range(HIST_BINS)]
+)
+FEATURE_VECTOR_LEN = len(FEATURE_NAMES)
+
+# ITU-R 601 luma weights (what Image.convert('L') uses).
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+def content_hash(data):
+    """SHA-1 of the raw file bytes; the cache key for an image."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def _packed_counts(image, shift):
+    """
+    Count pixels per quantized RGB cell (each channel keeps its top 8 - shift bits).
+    Returns 2**(3 * (8 - shift)) counts indexed by the packed (r, g, b) cell.
+    """
+    bits = 8 - shift
+    size = 1 << (3 * bits)
+    if HAS_NUMPY:
+        pixels = np.asarray(image, dtype=np.uint8).reshape(-1, 3) >> shift
+        codes = (pixels[:, 0].astype(np.intp) << (2 * bits)) | (pixels[:, 1] << bits) | pixels[:, 2]
+        return np.bincount(codes, minlength=size)
+
+    # Pillow fallback: quantize with a C lookup table and let getcolors() count.
+    quantized = image.point(lambda v: v >> shift)
+    counts = [0] * size
+    for count, (r, g, b) in quantized.getcolors(maxcolors=size):
+        counts[(r << (2 * bits)) | (g << bits) | b] = count
+    return counts
+
+
+def _unpack_color(code, shift):
+    """Turn a packed cell index back into its quantized RGB tuple."""
+    bits = 8 - shift
+    mask = (1 << bits) - 1
+    return tuple(((code >> (bits * i)) & mask) << shift for i in (2, 1, 0))
+
+
+def get_dominant_colors(image, num_colors=5):
+    """
+    Extract dominant colors from an image: the most frequent quantized colors
+    among every DOMINANT_SAMPLE_STEP-th pixel of its SAMPLE_SIZE downsample
+    (ties go to the color seen first).
+    """
+    if image.size != SAMPLE_SIZE or image.mode != 'RGB':
+        image = image.resize(SAMPLE_SIZE).convert('RGB')
+
+    if HAS_NUMPY:
+        bits = 8 - COLOR_SHIFT
+        pixels = np.asarray(image, dtype=np.uint8).reshape(-1, 3)[::DOMINANT_SAMPLE_STEP] >> COLOR_SHIFT
+        codes = (pixels[:, 0].astype(np.intp) << (2 * bits)) | (pixels[:, 1] << bits) | pixels[:, 2]
+        counts = np.bincount(codes, minlength=COLOR_BINS)
+        first_seen = np.full(COLOR_BINS, len(codes))
+        np.minimum.at(first_seen, codes, np.arange(len(codes)))
+        order = np.lexsort((first_seen, -counts))  # most frequent, then first seen
+        return [_unpack_color(int(code), COLOR_SHIFT) for code in order[:num_colors] if counts[code] > 0]
+
+    # Without NumPy, sample a grid every DOMINANT_SAMPLE_STEP pixels.
+    counts = {}
+    width, height = image.size
+    for y in range(0, height, DOMINANT_SAMPLE_STEP):
+        for x in range(0, width, DOMINANT_SAMPLE_STEP):
+            color = tuple(c >> COLOR_SHIFT << COLOR_SHIFT for c in image.getpixel((x, y)))
+            counts[color] = counts.get(color, 0) + 1
+    return sorted(counts, key=lambda color: -counts[color])[:num_colors]
+
+
+def get_brightness(image):
+    """Mean grayscale value of the full-resolution image (any mode)."""
+    gray = image.convert('L')
+    if HAS_NUMPY:
+        return float(np.asarray(gray, dtype=np.float64).mean())
+    return ImageStat.Stat(gray).mean[0]
+
+
+def get_color_stats(image):
+    """
+    Compute saturation and the coarse joint RGB histogram from an already
+    downsampled RGB image.
+    """
+    if HAS_NUMPY:
+        pixels = np.asarray(image, dtype=np.float32).reshape(-1, 3)
+        high = pixels.max(axis=1)
+        low = pixels.min(axis=1)
+        saturation = float(np.mean(np.where(high > 0, (high - low) / np.maximum(high, 1.0), 0.0)))
+        hist = _packed_counts(image, HIST_SHIFT).astype(np.float32)
+        hist /= max(float(hist.sum()), 1.0)
+        return saturation, hist
+
+    # Pillow fallback: ImageStat and getcolors() both run in C.
+    saturation = ImageStat.Stat(image.convert('HSV').getchannel('S')).mean[0] / 255.0
+    counts = _packed_counts(image, HIST_SHIFT)
+    total = float(sum(counts)) or 1.0
+    return saturation, [c / total for c in counts]
+
+
+def get_signature(image):
+    """16x16 grayscale thumbnail quantized to 16 levels, as a flat tuple."""
+    thumb = image.resize(SIGNATURE_SIZE, Image.Resampling.LANCZOS).convert('L')
+    step = 256 // SIGNATURE_LEVELS
+    return tuple(p // step for p in thumb.getdata())
+
+
+def get_dhash(image):
+    """64-bit difference hash as a 16-char hex string."""
+    thumb = image.convert('L').resize(DHASH_SIZE, Image.Resampling.LANCZOS)
+    width, height = DHASH_SIZE
+    pixels = list(thumb.getdata())
+    bits = 0
+    for y in range(height):
+        row = pixels[y * width:(y + 1) * width]
+        for x in range(width - 1):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return f'{bits:016x}'
+
+
+def feature_vector(features):
+    """
+    Flatten a features dict into a fixed-length float vector (see FEATURE_NAMES),
+    so later stages can stack a folder into a matrix instead of walking dicts.
+    """
+    head = [
+        float(features['aspect_ratio']),
+        *(float(c) for c in features['avg_color']),
+        float(features['brightness']),
+        float(features['saturation']),
+    ]
+    if HAS_NUMPY:
+        return np.concatenate([np.array(head, dtype=np.float32),
+                               np.asarray(features['color_histogram'], dtype=np.float32)])
+    return head + [float(h) for h in features['color_histogram']]
+
+
+def compute_features(data, size_bytes=None):
+    """Decode image bytes once and derive every cover feature from that decode."""
+    img = Image.open(io.BytesIO(data))
+    img.load()
+
+    features = {
+        'width': img.width,
+        'height': img.height,
+        'aspect_ratio': img.width / img.height if img.height > 0 else 0,
+        'size_bytes': size_bytes if size_bytes is not None else len(data),
+        'mode': img.mode,
+        'signature': get_signature(img),
+        'dhash': get_dhash(img),
+    }
+
+    small = img.resize(SAMPLE_SIZE).convert('RGB')
+
+    dominant_colors = get_dominant_colors(small)
+    features['dominant_colors'] = dominant_colors
+    # Average color
+    if dominant_colors:
+        features['avg_color'] = [sum(c[i] for c in dominant_colors) / len(dominant_colors)
+                                 for i in range(3)]
+    else:
+        features['avg_color'] = [0, 0, 0]
+
+    saturation, hist = get_color_stats(small)
+    features['brightness'] = get_brightness(img)
+    features['saturation'] = saturation
+    features['color_histogram'] = hist
+    features['vector'] = feature_vector(features)
+    return features
+
+
+def _to_json(features):
+    """Make a features dict JSON-serializable (NumPy arrays -> lists)."""
+    out = dict(features)
+    for name in ('color_histogram', 'vector'):
+        out[name] = [float(v) for v in out[name]]
+    return json.dumps(out)
+
+
+def _from_json(text):
+    """Inverse of _to_json, restoring tuples and NumPy arrays."""
+    features = json.loads(text)
+    features['signature'] = tuple(features['signature'])
+    features['dominant_colors'] = [tuple(c) for c in features['dominant_colors']]
+    if HAS_NUMPY:
+        features['color_histogram'] = np.asarray(features['color_histogram'], dtype=np.float32)
+        features['vector'] = np.asarray(features['vector'], dtype=np.float32)
+    return features
+
+
+class FeatureCache:
+    """
+    SQLite-backed feature cache keyed by content hash.
+
+    Safe to share between the cover scripts (and between runs); rows from an
+    older FEATURE_VERSION are treated as misses.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        # WAL lets parallel workers read while another one writes.
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS features ('
+            ' content_hash TEXT PRIMARY KEY,'
+            ' version INTEGER NOT NULL,'
+            ' data TEXT NOT NULL)'
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute(
+            'SELECT data FROM features WHERE content_hash = ? AND version = ?',
+            (key, FEATURE_VERSION),
+        ).fetchone()
+        return _from_json(row[0]) if row else None
+
+    def put(self, key, features):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO features (content_hash, version, data) VALUES (?, ?, ?)',
+            (key, FEATURE_VERSION, _to_json(features)),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def extract_features(image_path, cache=None):
+    """
+    Features for one image file, served from cache when its bytes are unchanged.
+    Returns None (after printing a warning) if the image cannot be read.
+    """
+    try:
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        key = content_hash(data)
+
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        features = compute_features(data, size_bytes=os.path.getsize(image_path))
+        features['content_hash'] = key
+        if cache is not None:
+            cache.put(key, features)
+        return features
+    except Exception as e:
+        print(f"   ⚠️  Error processing {image_path}: {e}")
+        return None
+
+
+def open_cache(enabled=True, path=DEFAULT_CACHE_PATH):
+    """Return a FeatureCache, or None when caching is disabled (--no-cache)."""
+    return FeatureCache(path) if enabled else None
@@ -8,107 +8,58 @@ This script:
 2. Extracts visual features (colors, composition, etc.)
 3. Identifies outliers that are significantly different from the majority
 4. Reports them for review/deletion
+
+Features come from cover_features.py and are cached by content hash in
+.cache/cover-features.sqlite (shared with find-near-duplicates.py).
+Pass --no-cache to always re-decode.
+
+Folders (and chunks of large folders) are analyzed in parallel, largest
+first (--workers). Results stream as each folder completes and are appended
+to a JSON Lines or CSV report (--report) as they arrive.
+
+With --suggest-folders, every image is also scored against a compact model
+(centroid + spread) of every artist folder in one matrix pass, and images
+that fit another artist better than their own are reported with a margin.
+
+--trace PATH records extraction / scoring spans per folder and worker plus
+the pending-chunk depth, and writes a Chrome/Perfetto trace with a
+utilization summary (scripts/pipeline_trace.py).
 """
 
+import argparse
+import csv
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from collections import defaultdict
 import statistics
 
-try:
-    from PIL import Image
+from cover_features import DEFAULT_CACHE_PATH, FEATURE_NAMES, HAS_NUMPY, PROJECT_ROOT, FeatureCache, extract_features
+
+# Shared pipeline telemetry lives with the Python pipeline scripts.
+sys.path.insert(0, str(PROJECT_ROOT / 'scripts'))
+from pipeline_trace import counter, span  # noqa: E402
+from pipeline_trace import enable as enable_trace, finish as finish_trace  # noqa: E402
+
+if HAS_NUMPY:
     import numpy as np
-    HAS_NUMPY = True
-except ImportError:
-    try:
-        from PIL import Image
-        HAS_NUMPY = False
-    except ImportError:
-        print("❌ Error: PIL/Pillow is required.")
-        print("   Install with: pip3 install pillow")
-        sys.exit(1)
 
 
-def get_dominant_colors(image, num_colors=5):
-    """Extract dominant colors from an image."""
-    # Resize for faster processing
-    img = image.resize((150, 150))
-    img = img.convert('RGB')
-    
-    # Get color data
-    if HAS_NUMPY:
-        pixels = np.array(img)
-        pixels = pixels.reshape(-1, 3)
-        pixel_list = [tuple(pixels[i]) for i in range(0, len(pixels), 10)]
-    else:
-        # Without numpy, sample pixels manually
-        pixel_list = []
-        width, height = img.size
-        for y in range(0, height, 10):
-            for x in range(0, width, 10):
-                pixel_list.append(img.getpixel((x, y)))
-    
-    # Count color frequencies
-    color_counts = defaultdict(int)
-    for color in pixel_list:
-        # Quantize colors to reduce noise
-        quantized = tuple(c // 32 * 32 for c in color)
-        color_counts[quantized] += 1
-    
-    # Get top colors
-    top_colors = sorted(color_counts.items(), key=lambda x: x[1], reverse=True)[:num_colors]
-    return [color for color, count in top_colors]
+def get_image_features(image_path, cache=None):
+    """Extract features from an image (decoded once, shared via the feature cache)."""
+    return extract_features(image_path, cache=cache)
 
 
-def get_image_features(image_path):
-    """Extract features from an image."""
-    try:
-        img = Image.open(image_path)
-        
-        features = {
-            'width': img.width,
-            'height': img.height,
-            'aspect_ratio': img.width / img.height if img.height > 0 else 0,
-            'size_bytes': os.path.getsize(image_path),
-            'mode': img.mode,
-        }
-        
-        # Get dominant colors
-        try:
-            dominant_colors = get_dominant_colors(img)
-            features['dominant_colors'] = dominant_colors
-            # Average color
-            avg_color = [sum(c[i] for c in dominant_colors) / len(dominant_colors) 
-                        for i in range(3)]
-            features['avg_color'] = avg_color
-        except Exception as e:
-            features['dominant_colors'] = []
-            features['avg_color'] = [0, 0, 0]
-        
-        # Brightness estimate
-        if img.mode == 'RGB':
-            gray = img.convert('L')
-            if HAS_NUMPY:
-                pixels = np.array(gray)
-                features['brightness'] = float(np.mean(pixels))
-            else:
-                # Calculate average brightness manually
-                width, height = gray.size
-                total = 0
-                count = 0
-                for y in range(height):
-                    for x in range(width):
-                        total += gray.getpixel((x, y))
-                        count += 1
-                features['brightness'] = total / count if count > 0 else 128.0
-        else:
-            features['brightness'] = 128.0
-        
-        return features
-    except Exception as e:
-        print(f"   ⚠️  Error processing {image_path}: {e}")
-        return None
+# Similarity weights (see calculate_similarity) and the vector columns they read.
+SIM_WEIGHTS = {'aspect': 0.2, 'color': 0.5, 'brightness': 0.3}
+ASPECT_COL = FEATURE_NAMES.index('aspect_ratio')
+COLOR_COLS = slice(FEATURE_NAMES.index('avg_r'), FEATURE_NAMES.index('avg_b') + 1)
+BRIGHTNESS_COL = FEATURE_NAMES.index('brightness')
+
+# Upper bound on pairwise cells held in memory at once (rows per block = this // n).
+SIM_BLOCK_CELLS = 4_000_000
 
 
 def calculate_similarity(features1, features2):
@@ -130,25 +81,64 @@ def calculate_similarity(features1, features2):
     brightness_sim = 1.0 / (1.0 + brightness_diff / 255.0)
     
     # Weighted average
-    similarity = (aspect_sim * 0.2 + color_sim * 0.5 + brightness_sim * 0.3)
+    similarity = (aspect_sim * SIM_WEIGHTS['aspect']
+                  + color_sim * SIM_WEIGHTS['color']
+                  + brightness_sim * SIM_WEIGHTS['brightness'])
     return similarity
 
 
+def mean_similarities(matrix, block_cells=SIM_BLOCK_CELLS):
+    """
+    Mean calculate_similarity() of each row against every other row of a
+    feature matrix (one row per image, columns per FEATURE_NAMES).
+
+    Works through row blocks of at most block_cells pairwise cells, so the
+    full n x n similarity matrix is never materialized.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(matrix)
+    aspect = matrix[:, ASPECT_COL]
+    colors = matrix[:, COLOR_COLS]
+    brightness = matrix[:, BRIGHTNESS_COL]
+    color_sq = np.einsum('ij,ij->i', colors, colors)
+
+    sums = np.empty(n)
+    rows = max(1, block_cells // max(n, 1))
+    for start in range(0, n, rows):
+        stop = min(start + rows, n)
+        aspect_sim = 1.0 / (1.0 + np.abs(aspect[start:stop, None] - aspect[None, :]))
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, clipped against rounding below zero
+        color_dist = color_sq[start:stop, None] + color_sq[None, :] - 2.0 * colors[start:stop] @ colors.T
+        color_sim = 1.0 / (1.0 + np.sqrt(np.maximum(color_dist, 0.0)) / 255.0)
+        brightness_sim = 1.0 / (1.0 + np.abs(brightness[start:stop, None] - brightness[None, :]) / 255.0)
+        block = (SIM_WEIGHTS['aspect'] * aspect_sim
+                 + SIM_WEIGHTS['color'] * color_sim
+                 + SIM_WEIGHTS['brightness'] * brightness_sim)
+        sums[start:stop] = block.sum(axis=1)
+
+    # Each row's self-similarity is exactly 1.0; drop it from the mean.
+    return (sums - 1.0) / (n - 1)
+
+
 def find_outliers(features_list, threshold=0.3):
     """Find images that are outliers (low similarity to others)."""
     if len(features_list) < 3:
         return []  # Need at least 3 images to find outliers
     
     # Calculate average similarity for each image
-    similarities = []
-    for i, feat1 in enumerate(features_list):
-        sims = []
-        for j, feat2 in enumerate(features_list):
-            if i != j:
-                sim = calculate_similarity(feat1['features'], feat2['features'])
-                sims.append(sim)
-        avg_sim = statistics.mean(sims) if sims else 0.0
-        similarities.append((i, avg_sim))
+    if HAS_NUMPY:
+        matrix = np.stack([item['features']['vector'] for item in features_list])
+        similarities = list(enumerate(mean_similarities(matrix).tolist()))
+    else:
+        similarities = []
+        for i, feat1 in enumerate(features_list):
+            sims = []
+            for j, feat2 in enumerate(features_list):
+                if i != j:
+                    sim = calculate_similarity(feat1['features'], feat2['features'])
+                    sims.append(sim)
+            avg_sim = statistics.mean(sims) if sims else 0.0
+            similarities.append((i, avg_sim))
     
     # Sort by similarity (lowest = most likely outlier)
     similarities.sort(key=lambda x: x[1])
@@ -170,34 +160,25 @@ def find_outliers(features_list, threshold=0.3):
     return outliers
 
 
-def analyze_artist_folder(artist_dir):
-    """Analyze images in an artist folder and find outliers."""
-    artist_name = os.path.basename(artist_dir)
-    image_files = sorted([f for f in os.listdir(artist_dir) 
-                         if f.lower().endswith('.webp')])
-    
-    if len(image_files) < 3:
-        return []  # Need at least 3 images to find outliers
-    
-    print(f"\n   Analyzing {artist_name}/ ({len(image_files)} images)...")
-    
-    # Extract features for all images
-    features_list = []
-    for img_file in image_files:
-        img_path = os.path.join(artist_dir, img_file)
-        features = get_image_features(img_path)
-        if features:
-            features_list.append({
-                'file': img_file,
-                'path': img_path,
-                'features': features
-            })
-    
+OUTLIER_THRESHOLD = 0.25
+
+# Large folders are split into chunks of this many images for feature extraction.
+DEFAULT_CHUNK_SIZE = 256
+
+
+def list_folder_images(artist_dir):
+    """Sorted .webp file names in an artist folder."""
+    return sorted([f for f in os.listdir(artist_dir)
+                   if f.lower().endswith('.webp')])
+
+
+def folder_outliers(features_list):
+    """Score an already-extracted folder and return its outlier entries."""
     if len(features_list) < 3:
         return []
     
     # Find outliers
-    outliers = find_outliers(features_list, threshold=0.25)
+    outliers = find_outliers(features_list, threshold=OUTLIER_THRESHOLD)
     
     # Return outlier file names
     result = []
@@ -212,7 +193,246 @@ def analyze_artist_folder(artist_dir):
     return result
 
 
-def main():
+def extract_folder_features(artist_dir, image_files, cache=None):
+    """Extract features for the given files of one folder (skipping unreadable ones)."""
+    features_list = []
+    for img_file in image_files:
+        img_path = os.path.join(artist_dir, img_file)
+        features = get_image_features(img_path, cache=cache)
+        if features:
+            features_list.append({
+                'file': img_file,
+                'path': img_path,
+                'features': features
+            })
+    return features_list
+
+
+def analyze_artist_folder(artist_dir, cache=None):
+    """Analyze images in an artist folder and find outliers."""
+    artist_name = os.path.basename(artist_dir)
+    image_files = list_folder_images(artist_dir)
+    
+    if len(image_files) < 3:
+        return []  # Need at least 3 images to find outliers
+    
+    print(f"\n   Analyzing {artist_name}/ ({len(image_files)} images)...")
+    
+    return folder_outliers(extract_folder_features(artist_dir, image_files, cache=cache))
+
+
+def _extract_chunk(artist_dir, image_files, cache_path):
+    """Process-pool worker: extract features for one chunk of a folder."""
+    cache = FeatureCache(cache_path) if cache_path else None
+    try:
+        with span('extract', os.path.basename(artist_dir), images=len(image_files)):
+            return extract_folder_features(artist_dir, image_files, cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def plan_chunks(unused_dir, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split every analyzable artist folder into extraction chunks.
+    Returns (folder_sizes, chunks) with chunks ordered largest folder first,
+    so the longest-running work starts before the pool fills up with small folders.
+    """
+    folder_sizes = {}
+    folder_files = {}
+    for artist_folder in sorted(os.listdir(unused_dir)):
+        artist_dir = os.path.join(unused_dir, artist_folder)
+        if not os.path.isdir(artist_dir):
+            continue
+        image_files = list_folder_images(artist_dir)
+        if len(image_files) < 3:
+            continue  # Need at least 3 images to find outliers
+        folder_sizes[artist_folder] = len(image_files)
+        folder_files[artist_folder] = image_files
+
+    chunks = []
+    for artist_folder in sorted(folder_sizes, key=lambda a: (-folder_sizes[a], a)):
+        image_files = folder_files[artist_folder]
+        for start in range(0, len(image_files), chunk_size):
+            chunks.append((artist_folder, image_files[start:start + chunk_size]))
+    return folder_sizes, chunks
+
+
+# Per-artist spread is shrunk toward the global spread with this many pseudo-images,
+# so small folders don't get razor-thin (or zero) variances.
+SPREAD_PRIOR_WEIGHT = 5.0
+
+# Minimum distance advantage (in standardized units) before proposing a move.
+DEFAULT_SUGGEST_MARGIN = 0.25
+
+
+def build_artist_models(matrix, labels):
+    """
+    Compact per-artist model over standardized feature vectors.
+
+    Returns (artists, centroids, variances, counts, mean, scale) where
+    centroids/variances are (num_artists, num_features) and mean/scale are the
+    global standardization applied to every vector before modelling.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    mean = matrix.mean(axis=0)
+    scale = matrix.std(axis=0)
+    scale[scale == 0] = 1.0
+    z = (matrix - mean) / scale
+
+    artists, inverse, counts = np.unique(np.asarray(labels), return_inverse=True, return_counts=True)
+    # Sum z and z^2 per artist by scattering rows into their artist's slot: O(n x d)
+    inverse = inverse.reshape(-1)
+    sums = np.zeros((len(artists), z.shape[1]))
+    sq_sums = np.zeros_like(sums)
+    np.add.at(sums, inverse, z)
+    np.add.at(sq_sums, inverse, z * z)
+    centroids = sums / counts[:, None]
+    variances = sq_sums / counts[:, None] - centroids ** 2
+    # Shrink toward the global variance (1.0 after standardization)
+    variances = (counts[:, None] * np.maximum(variances, 0.0) + SPREAD_PRIOR_WEIGHT) / (counts[:, None] + SPREAD_PRIOR_WEIGHT)
+    return artists, centroids, variances, counts, mean, scale
+
+
+def score_against_artists(matrix, labels, models):
+    """
+    Distance of every image to every artist model in one matrix operation:
+    root-mean-square diagonal Mahalanobis distance, shape (n, num_artists).
+
+    An image's own folder is scored against a leave-one-out centroid so it
+    doesn't get credit for matching itself.
+    """
+    artists, centroids, variances, counts, mean, scale = models
+    z = (np.asarray(matrix, dtype=np.float64) - mean) / scale
+    inv_var = 1.0 / variances
+    d = z.shape[1]
+
+    # sum_j (z_j - mu_aj)^2 / var_aj expanded into three matrix products
+    dist_sq = ((z * z) @ inv_var.T
+               - 2.0 * z @ (centroids * inv_var).T
+               + np.sum(centroids * centroids * inv_var, axis=1)[None, :])
+
+    own = np.searchsorted(artists, np.asarray(labels))
+    rows = np.arange(len(z))
+    own_counts = counts[own].astype(np.float64)
+    loo = np.where(own_counts[:, None] > 1,
+                   (own_counts[:, None] * centroids[own] - z) / np.maximum(own_counts[:, None] - 1, 1.0),
+                   centroids[own])
+    dist_sq[rows, own] = np.sum((z - loo) ** 2 * inv_var[own], axis=1)
+
+    return np.sqrt(np.maximum(dist_sq, 0.0) / d)
+
+
+def suggest_folders(features_by_artist, min_margin=DEFAULT_SUGGEST_MARGIN):
+    """
+    Propose a better folder for images that fit another artist's model
+    noticeably better than their own.
+    features_by_artist: {artist: [{'file', 'path', 'features'}, ...]}
+    Returns suggestion dicts sorted by margin (largest first).
+    """
+    items = [(artist, item) for artist in sorted(features_by_artist)
+             for item in features_by_artist[artist]]
+    if not items or len(features_by_artist) < 2:
+        return []
+
+    labels = [artist for artist, _ in items]
+    matrix = np.stack([item['features']['vector'] for _, item in items])
+    models = build_artist_models(matrix, labels)
+    distances = score_against_artists(matrix, labels, models)
+    artists = models[0]
+
+    own = np.searchsorted(artists, np.asarray(labels))
+    best = np.argmin(distances, axis=1)
+    rows = np.arange(len(items))
+    margins = distances[rows, own] - distances[rows, best]
+
+    suggestions = []
+    for i in np.flatnonzero((best != own) & (margins >= min_margin)):
+        artist, item = items[i]
+        suggestions.append({
+            'artist': artist,
+            'file': item['file'],
+            'path': item['path'],
+            'suggested_artist': str(artists[best[i]]),
+            'current_distance': float(distances[i, own[i]]),
+            'suggested_distance': float(distances[i, best[i]]),
+            'margin': float(margins[i]),
+        })
+    suggestions.sort(key=lambda s: -s['margin'])
+    return suggestions
+
+
+REPORT_FIELDS = ['artist', 'file', 'path', 'similarity', 'width', 'height', 'error']
+SUGGESTION_FIELDS = ['artist', 'file', 'path', 'suggested_artist',
+                     'current_distance', 'suggested_distance', 'margin']
+
+
+class ReportWriter:
+    """
+    Incremental machine-readable report: CSV when the path ends in .csv,
+    otherwise JSON Lines. Rows are flushed per completed folder so partial
+    results survive an interrupted run. Folders whose extraction failed get
+    an error row instead. Folder suggestions go into the same JSON Lines
+    file, or into a sibling <name>-suggestions.csv.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.is_csv = self.path.suffix.lower() == '.csv'
+        self.file = open(self.path, 'w', newline='', encoding='utf-8')
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=REPORT_FIELDS)
+            self.writer.writeheader()
+
+    def write_folder(self, artist, num_images, rows):
+        if self.is_csv:
+            self.writer.writerows(rows)
+        else:
+            self.file.write(json.dumps({'type': 'folder', 'artist': artist,
+                                        'images': num_images, 'outliers': len(rows)}) + '\n')
+            for row in rows:
+                self.file.write(json.dumps({'type': 'outlier', **row}) + '\n')
+        self.file.flush()
+
+    def write_error(self, artist, num_images, error):
+        if self.is_csv:
+            self.writer.writerow({'artist': artist, 'error': error})
+        else:
+            self.file.write(json.dumps({'type': 'error', 'artist': artist,
+                                        'images': num_images, 'error': error}) + '\n')
+        self.file.flush()
+
+    def write_suggestions(self, rows):
+        if self.is_csv:
+            path = self.path.with_name(f'{self.path.stem}-suggestions.csv')
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=SUGGESTION_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+            return path
+        for row in rows:
+            self.file.write(json.dumps({'type': 'suggestion', **row}) + '\n')
+        self.file.flush()
+        return self.path
+
+    def close(self):
+        self.file.close()
+
+
+def main(use_cache=True, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, report_path=None,
+         suggest=False, suggest_margin=DEFAULT_SUGGEST_MARGIN, trace_path=None):
+    if trace_path:
+        enable_trace(Path(trace_path))
+    try:
+        run(use_cache, workers, chunk_size, report_path, suggest, suggest_margin)
+    finally:
+        if trace_path:
+            finish_trace(Path(trace_path))
+
+
+def run(use_cache=True, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, report_path=None,
+        suggest=False, suggest_margin=DEFAULT_SUGGEST_MARGIN):
     # Get paths
     script_dir = Path(__file__).parent
     project_root = script_dir.parent.parent.parent
@@ -222,29 +442,110 @@ def main():
         print(f"❌ Directory not found: {unused_dir}")
         sys.exit(1)
     
+    if suggest and not HAS_NUMPY:
+        print("❌ Error: --suggest-folders requires numpy.")
+        print("   Install with: pip3 install numpy")
+        sys.exit(1)
+    
+    workers = workers or os.cpu_count() or 1
+    report_path = Path(report_path) if report_path else project_root / 'docs' / 'audits' / 'artist-mismatches.jsonl'
+    
     print("🔍 Finding artist-mismatched images...")
-    print(f"   Scanning: {unused_dir}\n")
+    print(f"   Scanning: {unused_dir}")
+    print(f"   Workers: {workers} | Report: {report_path}\n")
     
     all_outliers = []
     
-    # Process each artist folder
-    artist_folders = sorted([d for d in os.listdir(unused_dir) 
-                            if os.path.isdir(os.path.join(unused_dir, d))])
+    # Fan folders (and chunks of large folders) out across processes,
+    # largest first; each folder is scored as soon as its last chunk lands.
+    folder_sizes, chunks = plan_chunks(unused_dir, chunk_size)
+    pending_chunks = defaultdict(int)
+    for artist_folder, _ in chunks:
+        pending_chunks[artist_folder] += 1
+    collected = defaultdict(list)
+    features_by_artist = {}
     
-    for artist_folder in artist_folders:
-        artist_dir = os.path.join(unused_dir, artist_folder)
-        outliers = analyze_artist_folder(artist_dir)
+    cache_path = str(DEFAULT_CACHE_PATH) if use_cache else None
+    if cache_path:
+        FeatureCache(cache_path).close()  # create the schema once before workers start
+    report = ReportWriter(report_path)
+    failed = {}
+    
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        try:
+            futures = {
+                executor.submit(_extract_chunk, str(unused_dir / artist_folder), image_files, cache_path): artist_folder
+                for artist_folder, image_files in chunks
+            }
+            remaining = len(futures)
+            counter('chunks.pending', remaining)
+            for future in as_completed(futures):
+                artist_folder = futures[future]
+                try:
+                    collected[artist_folder].extend(future.result())
+                except Exception as e:
+                    # One bad chunk fails its folder (a partial folder would skew the scores)
+                    failed.setdefault(artist_folder, f"{type(e).__name__}: {e}")
+                remaining -= 1
+                counter('chunks.pending', remaining)
+                pending_chunks[artist_folder] -= 1
+                if pending_chunks[artist_folder]:
+                    continue
+                
+                if artist_folder in failed:
+                    collected.pop(artist_folder, None)
+                    print(f"\n   ❌ Failed {artist_folder}/: {failed[artist_folder]}")
+                    report.write_error(artist_folder, folder_sizes[artist_folder], failed[artist_folder])
+                    continue
+                
+                # Keep the original order within a folder regardless of chunk completion order
+                features_list = sorted(collected.pop(artist_folder), key=lambda item: item['file'])
+                with span('score', artist_folder, images=len(features_list)):
+                    outliers = folder_outliers(features_list)
+                if suggest and len(features_list) >= 3:
+                    features_by_artist[artist_folder] = features_list
+                
+                print(f"\n   Analyzed {artist_folder}/ ({folder_sizes[artist_folder]} images)")
+                rows = []
+                if outliers:
+                    print(f"     ⚠️  Found {len(outliers)} potential outliers:")
+                    for outlier in outliers:
+                        print(f"        - {outlier['file']} (similarity: {outlier['similarity']:.3f})")
+                        all_outliers.append({
+                            'artist': artist_folder,
+                            **outlier
+                        })
+                        rows.append({
+                            'artist': artist_folder,
+                            'file': outlier['file'],
+                            'path': outlier['path'].replace(str(project_root) + '/', ''),
+                            'similarity': round(outlier['similarity'], 6),
+                            'width': outlier['features']['width'],
+                            'height': outlier['features']['height'],
+                        })
+                else:
+                    print(f"     ✅ No obvious outliers found")
+                report.write_folder(artist_folder, folder_sizes[artist_folder], rows)
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print(f"\n⚠️  Interrupted. Partial results written to {report_path}")
+            sys.exit(130)
+        executor.shutdown()
         
-        if outliers:
-            print(f"     ⚠️  Found {len(outliers)} potential outliers:")
-            for outlier in outliers:
-                print(f"        - {outlier['file']} (similarity: {outlier['similarity']:.3f})")
-                all_outliers.append({
-                    'artist': artist_folder,
-                    **outlier
-                })
-        else:
-            print(f"     ✅ No obvious outliers found")
+        suggestions = []
+        if suggest:
+            with span('suggest'):
+                suggestions = suggest_folders(features_by_artist, min_margin=suggest_margin)
+            for suggestion in suggestions:
+                suggestion['path'] = suggestion['path'].replace(str(project_root) + '/', '')
+            suggestions_path = report.write_suggestions(
+                [{k: round(v, 6) if isinstance(v, float) else v for k, v in row.items()} for row in suggestions]
+            )
+    finally:
+        # Also on worker errors or exit: cancel what's left and keep the rows written so far
+        executor.shutdown(wait=False, cancel_futures=True)
+        report.close()
     
     # Generate report
     print("\n" + "=" * 80)
@@ -278,13 +579,52 @@ def main():
         print("\n   To delete outliers, run:")
         print("   python3 server/src/db/find-artist-mismatches.py --delete")
     
+    if suggest:
+        print("\n" + "=" * 80)
+        print("🧭 FOLDER SUGGESTIONS (cross-artist scoring)")
+        print("=" * 80)
+        if not suggestions:
+            print(f"\n✅ No image fits another artist better (margin >= {suggest_margin}).")
+        else:
+            print(f"\n⚠️  {len(suggestions)} images look like they belong in another folder:\n")
+            for suggestion in suggestions:
+                print(f"  - {suggestion['artist']}/{suggestion['file']} -> {suggestion['suggested_artist']}/")
+                print(f"    Distance: {suggestion['current_distance']:.3f} (current) vs "
+                      f"{suggestion['suggested_distance']:.3f} (suggested) | margin {suggestion['margin']:.3f}")
+            print(f"\n   Suggestions written to: {suggestions_path}")
+    
+    if failed:
+        print(f"\n❌ {len(failed)} folders could not be analyzed (error rows in the report):")
+        for artist, error in sorted(failed.items()):
+            print(f"  - {artist}/: {error}")
+    
+    print(f"\n📝 Machine-readable report: {report_path}")
     print("\n" + "=" * 80)
 
 
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Find images that don't match their artist folder.")
+    ap.add_argument('--delete', '-d', action='store_true', help='Delete identified outliers (not yet implemented).')
+    ap.add_argument('--no-cache', action='store_true', help='Ignore the shared feature cache and re-decode every image.')
+    ap.add_argument('--workers', '-j', type=int, default=0, help='Worker processes (0 = one per CPU).')
+    ap.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                    help=f'Images per extraction task for large folders (default: {DEFAULT_CHUNK_SIZE}).')
+    ap.add_argument('--report', default=None,
+                    help='Report path; .csv for CSV, anything else for JSON Lines '
+                         '(default: docs/audits/artist-mismatches.jsonl).')
+    ap.add_argument('--suggest-folders', action='store_true',
+                    help='Score every image against every artist model and propose a better folder.')
+    ap.add_argument('--suggest-margin', type=float, default=DEFAULT_SUGGEST_MARGIN,
+                    help=f'Minimum distance advantage before proposing a move (default: {DEFAULT_SUGGEST_MARGIN}).')
+    ap.add_argument('--trace', default=None,
+                    help='Write a Chrome/Perfetto trace of extraction and scoring to this JSON file.')
+    return ap.parse_args(argv)
+
+
 if __name__ == '__main__':
-    delete_mode = '--delete' in sys.argv or '-d' in sys.argv
+    args = parse_args()
     
-    if delete_mode:
+    if args.delete:
         print("⚠️  DELETE MODE: This will remove identified outliers!")
         response = input("   Are you sure? Type 'yes' to continue: ")
         if response.lower() != 'yes':
@@ -296,5 +636,6 @@ if __name__ == '__main__':
         print("   Delete mode not yet implemented. Please review and delete manually.")
         sys.exit(0)
     
-    main()
-
+    main(use_cache=not args.no_cache, workers=args.workers,
+         chunk_size=max(1, args.chunk_size), report_path=args.report,
+         suggest=args.suggest_folders, suggest_margin=args.suggest_margin, trace_path=args.trace)
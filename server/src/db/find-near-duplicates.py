@@ -3,43 +3,42 @@
 Find near-duplicate images (visually similar but not identical) in an artist folder.
 Uses image comparison to identify images that are very similar but may have
 different compression, slight edits, or minor differences.
+
+Signatures come from cover_features.py and are cached by content hash in
+.cache/cover-features.sqlite (shared with find-artist-mismatches.py).
+Pass --no-cache to always re-decode.
+
+--trace PATH writes a Chrome/Perfetto trace of the signature and compare
+stages with a summary (scripts/pipeline_trace.py).
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
 from collections import defaultdict
 
-try:
-    from PIL import Image
-except ImportError:
-    print("❌ Error: PIL/Pillow is required.")
-    print("   Install with: pip3 install pillow")
-    sys.exit(1)
+from cover_features import PROJECT_ROOT, extract_features, open_cache
+
+# Shared pipeline telemetry lives with the Python pipeline scripts.
+sys.path.insert(0, str(PROJECT_ROOT / 'scripts'))
+from pipeline_trace import span  # noqa: E402
+from pipeline_trace import enable as enable_trace, finish as finish_trace  # noqa: E402
 
 
-def get_image_signature(image_path, size=(16, 16)):
+def get_image_signature(image_path, cache=None):
     """
     Create a simple signature for an image by:
-    1. Resizing to small size
+    1. Resizing to 16x16
     2. Converting to grayscale
-    3. Quantizing colors
-    4. Returning a hash-like string
+    3. Quantizing to 16 levels
+    4. Returning the values as a tuple
+
+    The work happens in cover_features.extract_features(), which decodes the
+    image once and caches the result (with its dimensions) by content hash.
     """
-    try:
-        img = Image.open(image_path)
-        # Resize to small size for comparison
-        img = img.resize(size, Image.Resampling.LANCZOS)
-        # Convert to grayscale
-        img = img.convert('L')
-        # Get pixel values
-        pixels = list(img.getdata())
-        # Quantize to reduce noise
-        quantized = [p // 16 for p in pixels]  # 16 levels
-        return tuple(quantized)
-    except Exception as e:
-        print(f"   ⚠️  Error processing {image_path}: {e}")
-        return None
+    features = extract_features(image_path, cache=cache)
+    return features['signature'] if features else None
 
 
 def calculate_similarity(sig1, sig2):
@@ -62,13 +61,15 @@ def calculate_similarity(sig1, sig2):
     return similarity
 
 
-def find_near_duplicates(artist_dir, threshold=0.85):
+def find_near_duplicates(artist_dir, threshold=0.85, cache=None, features_out=None):
     """
     Find near-duplicate images in an artist folder.
     threshold: Minimum similarity to consider images similar (0-1)
                0.85 = 85% similar (strict)
                0.80 = 80% similar (moderate)
                0.75 = 75% similar (lenient)
+    features_out: optional dict filled with {file: features} so the caller
+                  can report dimensions without re-opening images.
     """
     artist_name = os.path.basename(artist_dir)
     image_files = sorted([f for f in os.listdir(artist_dir) 
@@ -86,9 +87,12 @@ def find_near_duplicates(artist_dir, threshold=0.85):
     image_signatures = {}
     for i, img_file in enumerate(image_files):
         img_path = os.path.join(artist_dir, img_file)
-        sig = get_image_signature(img_path)
-        if sig:
-            image_signatures[img_file] = sig
+        with span('signature', img_file):
+            features = extract_features(img_path, cache=cache)
+        if features:
+            image_signatures[img_file] = features['signature']
+            if features_out is not None:
+                features_out[img_file] = features
         if (i + 1) % 10 == 0:
             print(f"     Processed {i + 1}/{len(image_files)}...")
     
@@ -96,6 +100,12 @@ def find_near_duplicates(artist_dir, threshold=0.85):
     
     # Compare all pairs
     print("   Comparing images...")
+    with span('compare', artist_name, images=len(image_signatures)):
+        return group_similar(image_signatures, threshold)
+
+
+def group_similar(image_signatures, threshold):
+    """Greedy grouping: each unassigned image collects every unassigned match >= threshold."""
     similar_groups = []
     processed = set()
     
@@ -124,14 +134,7 @@ def find_near_duplicates(artist_dir, threshold=0.85):
     return similar_groups
 
 
-def main():
-    if len(sys.argv) > 1:
-        artist_name = sys.argv[1]
-        threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.85
-    else:
-        artist_name = 'tay-k'
-        threshold = 0.85
-    
+def main(artist_name='tay-k', threshold=0.85, use_cache=True, trace_path=None):
     # Get paths
     script_dir = Path(__file__).parent
     project_root = script_dir.parent.parent.parent
@@ -151,7 +154,20 @@ def main():
     print(f"Path: {artist_dir}\n")
     
     # Find near-duplicates
-    similar_groups = find_near_duplicates(str(artist_dir), threshold)
+    if trace_path:
+        enable_trace(Path(trace_path))
+    try:
+        cache = open_cache(use_cache)
+        image_features = {}
+        try:
+            similar_groups = find_near_duplicates(str(artist_dir), threshold,
+                                                  cache=cache, features_out=image_features)
+        finally:
+            if cache is not None:
+                cache.close()
+    finally:
+        if trace_path:
+            finish_trace(Path(trace_path))
     
     # Report results
     print("\n" + "=" * 80)
@@ -179,14 +195,10 @@ def main():
                     img_file = item
                     sim_str = " (reference)"
                 
-                img_path = os.path.join(artist_dir, img_file)
-                try:
-                    img = Image.open(img_path)
-                    size = os.path.getsize(img_path)
-                    print(f"  - {img_file}{sim_str}")
-                    print(f"    Size: {img.size[0]}x{img.size[1]} | File size: {size/1024:.1f} KB")
-                except Exception as e:
-                    print(f"  - {img_file}{sim_str} (error reading: {e})")
+                features = image_features[img_file]
+                print(f"  - {img_file}{sim_str}")
+                print(f"    Size: {features['width']}x{features['height']} | "
+                      f"File size: {features['size_bytes']/1024:.1f} KB")
             
             print()
         
@@ -204,5 +216,19 @@ def main():
     print("   Higher = stricter (fewer matches), Lower = more lenient (more matches)")
 
 
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description='Find near-duplicate images in an artist folder.')
+    ap.add_argument('artist_name', nargs='?', default='tay-k',
+                    help='Folder under covers/unused_copy/ to scan (default: tay-k).')
+    ap.add_argument('threshold', nargs='?', type=float, default=0.85,
+                    help='Minimum similarity, 0.85 (strict) to 0.75 (lenient) (default: 0.85).')
+    ap.add_argument('--no-cache', action='store_true', help='Ignore the shared feature cache and re-decode every image.')
+    ap.add_argument('--trace', default=None,
+                    help='Write a Chrome/Perfetto trace of the signature and compare stages to this JSON file.')
+    return ap.parse_args(argv)
+
+
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    main(artist_name=args.artist_name, threshold=args.threshold,
+         use_cache=not args.no_cache, trace_path=args.trace)